@@ -0,0 +1,133 @@
+import os, sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import Dict, List
+
+from RawArchive import open_archive
+
+'''
+    Повторный разбор истории по архиву сырых страниц (RawArchive или SegmentArchive).
+
+    После исправления парсера прогнозы за любой период можно пересчитать без обращения к источникам:
+        python Backfill.py --raw raw --out reparsed --providers rp5 yandex --since 2023-01-01 --workers 8
+
+    Записи архива разбираются параллельно на всех ядрах, результаты сразу сохраняются в хранилище
+    (<out>/<location>/<provider>/ddmmYYYY_HHMM.csv; записи без населенного пункта - <out>/<provider>/...).
+    Обработанные записи (provider|location|issue_time) отмечаются в <out>/.backfill_done,
+    поэтому прерванный запуск продолжается с места остановки; записи, которые не удалось разобрать,
+    разбираются повторно при следующем запуске (после исправления парсера).
+'''
+
+CHECKPOINT = '.backfill_done'
+
+_worker: Dict = {}
+
+
+def _init_worker(raw: str, out: str, verbose: bool) -> None:
+    # инициализация процесса: архив и провайдеры создаются один раз на процесс
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+    _worker['archive'] = open_archive(raw)
+    _worker['out'] = out
+    _worker['providers'] = {}
+
+
+def _get_provider(name: str):
+    providers = _worker['providers']
+    if name not in providers:
+        from ProviderRegistry import get_provider
+        providers[name] = get_provider(name)
+    return providers[name]
+
+
+def _reparse(entry: dict) -> tuple:
+    # разбор одной записи архива; возвращает (ключ записи, количество страниц, успех)
+    key = entry_key(entry)
+    try:
+        provider = _get_provider(entry['provider'])
+        pages = _worker['archive'].pages(entry)
+        # страницы сопоставляются с адресами, по которым они загружены (адреса могли быть заданы в config.json)
+        provider.configure({'urls': [url for url, _ in pages]})
+        data = provider.get_data(pages=pages, issue_time=datetime.fromisoformat(entry['issue_time']))
+        if data is not None:
+            # выпуски разных населенных пунктов в одно время не перезаписывают друг друга
+            location = entry.get('location')
+            provider.save_data(root=os.path.join(_worker['out'], location) if location else _worker['out'])
+        return key, len(entry['pages']), data is not None
+    except Exception as e:
+        print(f"{key} failed: {e}")
+        return key, len(entry['pages']), False
+
+
+def entry_key(entry: dict) -> str:
+    return f"{entry['provider']}|{entry.get('location', '')}|{entry['issue_time']}"
+
+
+def load_checkpoint(out: str) -> set:
+    # успешно разобранные записи; записи, которые не разобрались, повторяются (например, после исправления парсера)
+    filename = os.path.join(out, CHECKPOINT)
+    if not os.path.exists(filename):
+        return set()
+    status = {}
+    with open(filename, encoding='utf-8') as f:
+        for line in f:
+            if line.endswith('\n'):
+                key, _, result = line[:-1].partition('\t')
+                status[key] = result  # последний результат записи
+    return {key for key, result in status.items() if result == 'ok'}
+
+
+def backfill(raw: str = 'raw', out: str = 'reparsed', providers: List[str] = None, since: datetime = None,
+             until: datetime = None, workers: int = None, verbose: bool = False,
+             report_every: float = 10) -> dict:
+    archive = open_archive(raw)
+    os.makedirs(out, exist_ok=True)
+
+    done = load_checkpoint(out)
+    entries = [e for e in archive.records(providers, since, until) if entry_key(e) not in done]
+    print(f"Backfill: {len(entries)} records to process, {len(done)} already done")
+
+    stats = {'records': 0, 'pages': 0, 'failed': 0}
+    start = last_report = time.perf_counter()
+
+    with open(os.path.join(out, CHECKPOINT), 'a', encoding='utf-8') as checkpoint, \
+         ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(raw, out, verbose)) as executor:
+
+        for key, pages, ok in executor.map(_reparse, entries, chunksize=16):
+            checkpoint.write(f"{key}\t{'ok' if ok else 'failed'}\n")
+            checkpoint.flush()
+
+            stats['records'] += 1
+            stats['pages'] += pages
+            stats['failed'] += not ok
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                print(f"Backfill: {stats['records']}/{len(entries)} records, {stats['pages'] / (now - start):.1f} pages/s")
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = elapsed
+    stats['pages_per_second'] = stats['pages'] / elapsed if elapsed else 0.0
+    print(f"Backfill finished: {stats['records']} records ({stats['failed']} failed), "
+          f"{stats['pages']} pages in {elapsed:.1f}s, {stats['pages_per_second']:.1f} pages/s")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Re-parse archived raw pages')
+    parser.add_argument('--raw', default='raw', help='raw page archive directory')
+    parser.add_argument('--out', default='reparsed', help='output forecast store')
+    parser.add_argument('--providers', nargs='*', help='providers to re-parse (default: all)')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='first issue time (ISO format)')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='issue time to stop at (ISO format)')
+    parser.add_argument('--workers', type=int, help='number of processes (default: all cores)')
+    parser.add_argument('--verbose', action='store_true', help='show parser logs')
+    args = parser.parse_args()
+
+    backfill(args.raw, args.out, args.providers, args.since, args.until, args.workers, args.verbose)
@@ -0,0 +1,206 @@
+import os, json
+import time
+from datetime import datetime
+
+from typing import Dict, Iterable, List, Tuple
+
+'''
+    Журнал заданий сборщиков (write-ahead log) для восстановления после падения или перезапуска.
+
+    Задание - (provider, location, window): опрос провайдера по населенному пункту в окне времени
+    (час выпуска для прогнозов, период сбора для фактических данных). Каждое изменение состояния
+    задания дописывается в журнал одной строкой JSON и сбрасывается на диск (fsync) до того, как сборщик
+    перейдет к следующему шагу:
+        started - задание начато; files - размеры файлов, в которые задание дописывает строки
+        saved   - результат записан (файл прогноза, хэш данных), обработчики обновления еще не выполнены
+        done    - задание выполнено полностью
+        failed  - источник недоступен или страница не разобрана (задание будет повторено после перезапуска)
+
+    После перезапуска:
+        - recover откатывает файлы прерванных заданий к размерам из записи started (строки, дописанные
+          прерванным циклом, не дублируются при повторе), обрезает недописанную последнюю строку CSV
+          и закрывает прерванные задания записью failed;
+        - pending возвращает задания текущего окна, которые еще не выполнены: повторяются только они.
+    Недописанная последняя строка самого журнала отбрасывается при чтении. Журнал периодически
+    переписывается (атомарно) с последними записями заданий за keep секунд.
+
+    Пример:
+        journal = CycleJournal('journal/actual.jsonl')
+        journal.recover()
+        window = journal.window(time.time(), 3600)
+        for provider in journal.pending(['yandex', 'rp5'], 'ekaterinburg', window): ...
+'''
+
+DONE = 'done'
+STARTED = 'started'
+SAVED = 'saved'
+FAILED = 'failed'
+
+WINDOW_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def truncate_partial_line(path: str) -> int:
+    # обрезка недописанной последней строки файла (нет завершающего перевода строки); возвращает отброшенные байты
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return 0
+        # последний перевод строки ищется блоками с конца файла
+        position, block = size, 1 << 16
+        while position > 0:
+            start = max(0, position - block)
+            f.seek(start)
+            chunk = f.read(position - start)
+            end = chunk.rfind(b'\n')
+            if end != -1:
+                keep = start + end + 1
+                break
+            position = start
+        else:
+            keep = 0
+        if keep < size:
+            f.truncate(keep)
+        return size - keep
+
+
+def rollback(path: str, size: int) -> int:
+    # возврат файла к размеру size (строки, дописанные после него, удаляются); 0 - файла не было, он удаляется
+    current = file_size(path)
+    if current <= size:
+        return 0
+    if size == 0:
+        os.remove(path)
+    else:
+        with open(path, 'rb+') as f:
+            f.truncate(size)
+    return current - size
+
+
+class CycleJournal:
+    '''
+    Журнал состояний заданий (JSON Lines).
+
+    Параметры:
+        path        - файл журнала
+        keep        - сколько хранить записи выполненных заданий, с (старые удаляются при сжатии журнала)
+        compact_every - количество дописанных записей, после которого журнал сжимается
+    '''
+    def __init__(self, path: str = 'journal/cycles.jsonl', keep: float = 2 * 24 * 3600, compact_every: int = 1000) -> None:
+        self.path = path
+        self.keep = keep
+        self.compact_every = compact_every
+
+        self.jobs: Dict[Tuple[str, str, str], dict] = {}  # последняя запись каждого задания
+        self._appended = 0
+
+        self.load()
+
+    @staticmethod
+    def window(moment: float = None, period: float = 3600) -> str:
+        # окно задания: начало периода (кратно period от начала суток по местному времени), '%Y-%m-%dT%H:%M:%S'
+        moment = time.time() if moment is None else moment
+        start = datetime.fromtimestamp(moment).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return datetime.fromtimestamp(start + (moment - start) // period * period).strftime(WINDOW_FORMAT)
+
+    @staticmethod
+    def window_start(window: str) -> float:
+        return datetime.strptime(window, WINDOW_FORMAT).timestamp()
+
+    def load(self) -> None:
+        self.jobs = {}
+        if not os.path.exists(self.path):
+            return
+        # недописанная при падении последняя запись отбрасывается
+        if truncate_partial_line(self.path):
+            print(f"Journal {self.path}: incomplete last record discarded")
+
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.jobs[tuple(record['job'])] = record
+                except (ValueError, KeyError, TypeError):
+                    print(f"Journal {self.path}: skipping damaged record {line[:80]!r}")
+
+    def record(self, provider: str, location: str, window: str, state: str, **info) -> dict:
+        # дописывание записи и сброс на диск: запись переживает падение процесса и системы
+        record = {'job': [provider, location, window], 'state': state, 'time': time.time(), **info}
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.jobs[(provider, location, window)] = record
+        self._appended += 1
+        if self._appended >= self.compact_every:
+            self.compact()
+        return record
+
+    def start(self, provider: str, location: str, window: str, files: Iterable[str] = ()) -> dict:
+        # files - файлы, в которые задание дописывает строки: их размеры нужны для отката при восстановлении
+        return self.record(provider, location, window, STARTED, files={path: file_size(path) for path in files})
+
+    def state(self, provider: str, location: str, window: str) -> str:
+        record = self.jobs.get((provider, location, window))
+        return record['state'] if record else None
+
+    def pending(self, providers: Iterable[str], location: str, window: str) -> List[str]:
+        # провайдеры, задания которых в окне window еще не выполнены
+        return [provider for provider in providers if self.state(provider, location, window) != DONE]
+
+    def latest(self, provider: str, location: str, states: Iterable[str] = (SAVED, DONE)) -> dict:
+        # последняя запись задания провайдера в одном из состояний states (по всем окнам)
+        records = [r for (p, l, _), r in self.jobs.items() if p == provider and l == location and r['state'] in states]
+        return max(records, key=lambda r: r['time']) if records else None
+
+    def interrupted(self) -> List[dict]:
+        # задания, начатые, но не завершенные (процесс остановился между started и done/failed)
+        return [record for record in self.jobs.values() if record['state'] == STARTED]
+
+    def recover(self, files: Iterable[str] = ()) -> List[dict]:
+        # откат файлов прерванных заданий и обрезка недописанных строк files; возвращает прерванные задания
+        interrupted = self.interrupted()
+        sizes: Dict[str, int] = {}
+        for record in interrupted:
+            for path, size in record.get('files', {}).items():
+                sizes[path] = min(size, sizes.get(path, size))
+
+        for path, size in sizes.items():
+            removed = rollback(path, size)
+            if removed:
+                print(f"Journal {self.path}: {removed} bytes written by an interrupted cycle removed from {path}")
+        for path in set(files) | set(sizes):
+            removed = truncate_partial_line(path)
+            if removed:
+                print(f"Journal {self.path}: incomplete last line ({removed} bytes) removed from {path}")
+
+        # прерванные задания закрываются: иначе следующий запуск откатил бы файлы и после более поздних заданий
+        for record in interrupted:
+            provider, location, window = record['job']
+            print(f"Journal {self.path}: {provider} {location} {window} was interrupted, will be repeated")
+            self.record(provider, location, window, FAILED, reason='interrupted')
+        return interrupted
+
+    def compact(self) -> None:
+        # перезапись журнала: последние записи заданий за keep секунд (и все незавершенные задания)
+        threshold = time.time() - self.keep
+        self.jobs = {job: record for job, record in self.jobs.items()
+                     if record['time'] >= threshold or record['state'] == STARTED}
+
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            for record in sorted(self.jobs.values(), key=lambda r: r['time']):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + '.tmp', self.path)
+        self._appended = 0
@@ -0,0 +1,209 @@
+import os, sys
+import gc
+import time
+import signal
+import tracemalloc
+import multiprocessing
+from collections import deque
+from datetime import datetime
+
+from typing import Callable
+
+'''
+    Режим демона для сборщиков, работающих неделями (WeatherForecastParser.py, WeatherParser.py).
+
+    Сбор выполняется в дочернем процессе-обработчике, который перезапускается:
+        - после max_cycles циклов сбора;
+        - если резидентная память после цикла превысила max_rss_mb;
+        - после падения (с задержкой restart_delay).
+    Так фрагментация кучи и медленные утечки (кэши библиотек, деревья html5lib) не накапливаются
+    дольше одного поколения обработчика, а резидентная память остается в пределах max_rss_mb.
+    Состояние между поколениями передается через файлы (расписание, ансамбль, агрегаты).
+
+    После каждого цикла MemoryGuard выполняет полную сборку мусора (деревья BeautifulSoup состоят из
+    циклических ссылок), запоминает RSS и оценивает скорость роста памяти (МБ/сутки) - признак утечки.
+
+    Снимок tracemalloc по запросу: kill -USR1 <pid> (pid демона или обработчика). Первый сигнал включает
+    трассировку, следующие записывают в snapshot_dir топ выделений памяти и разницу с предыдущим снимком
+    (<pid>_<время>.txt) и сам снимок (.tracemalloc, для tracemalloc.Snapshot.load).
+
+    Запуск: python WeatherForecastParser.py --daemon [--max-cycles 500] [--max-rss 600]
+'''
+
+RECYCLE_EXIT = 0  # обработчик завершился для перезапуска (не упал)
+
+GROWTH_WINDOW = 6 * 3600  # минимальный интервал наблюдений для оценки роста памяти, с (короткий интервал - шум аллокатора)
+
+
+def current_rss() -> float:
+    # резидентная память процесса, МБ
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource  # не Linux: пиковая память вместо текущей
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+class MemoryGuard:
+    '''
+    Контроль памяти процесса-обработчика.
+
+    Параметры:
+        max_cycles      - количество циклов сбора до перезапуска обработчика
+        max_rss_mb      - резидентная память, после превышения которой обработчик перезапускается, МБ
+        leak_mb_per_day - скорость роста памяти, о которой сообщается как о вероятной утечке
+        warmup          - количество первых циклов, не учитываемых в оценке роста (кэши, импорт модулей)
+        snapshot_dir    - директория снимков tracemalloc
+        trace           - включить трассировку tracemalloc сразу (замедляет работу и увеличивает память)
+        report_every    - период вывода состояния памяти, циклов
+    '''
+    def __init__(self, max_cycles: int = 500, max_rss_mb: float = 600, leak_mb_per_day: float = 20, warmup: int = 10,
+                 snapshot_dir: str = 'memory', trace: bool = False, report_every: int = 50) -> None:
+        self.max_cycles = max_cycles
+        self.max_rss_mb = max_rss_mb
+        self.leak_mb_per_day = leak_mb_per_day
+        self.warmup = warmup
+        self.snapshot_dir = snapshot_dir
+        self.report_every = report_every
+
+        self.cycles = 0
+        self.samples: deque = deque(maxlen=1000)  # (время, RSS) после каждого цикла
+        self._snapshot: tracemalloc.Snapshot = None
+
+        if trace:
+            tracemalloc.start(25)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.snapshot())
+
+    def growth(self) -> float:
+        # скорость роста RSS после прогрева, МБ/сутки (наклон МНК); None - мало данных
+        samples = list(self.samples)[self.warmup:]
+        if len(samples) < 10 or samples[-1][0] - samples[0][0] < GROWTH_WINDOW:
+            return None
+        t0 = samples[0][0]
+        times = [t - t0 for t, _ in samples]
+        values = [rss for _, rss in samples]
+        mean_t, mean_v = sum(times) / len(times), sum(values) / len(values)
+        variance = sum((t - mean_t) ** 2 for t in times)
+        if variance == 0:
+            return None
+        slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / variance
+        return slope * 86400
+
+    def after_cycle(self) -> bool:
+        # вызывается после каждого цикла сбора; True - обработчик нужно перезапустить
+        gc.collect()
+        self.cycles += 1
+        rss = current_rss()
+        self.samples.append((time.time(), rss))
+
+        growth = self.growth()
+        if self.cycles % self.report_every == 0:
+            print(f"Memory: cycle {self.cycles}, RSS {rss:.0f} MB" +
+                  (f", growth {growth:+.1f} MB/day" if growth is not None else ''))
+        if growth is not None and growth > self.leak_mb_per_day and self.cycles % self.report_every == 0:
+            print(f"Memory: RSS grows {growth:.1f} MB/day, possible leak (kill -USR1 {os.getpid()} for tracemalloc snapshot)")
+            if tracemalloc.is_tracing():
+                self.snapshot()
+
+        if rss > self.max_rss_mb:
+            print(f"Memory: RSS {rss:.0f} MB exceeds {self.max_rss_mb} MB, recycling worker after {self.cycles} cycles")
+            return True
+        if self.cycles >= self.max_cycles:
+            print(f"Memory: {self.cycles} cycles done, recycling worker (RSS {rss:.0f} MB)")
+            return True
+        return False
+
+    def snapshot(self) -> str:
+        # снимок tracemalloc: топ выделений и разница с предыдущим снимком; возвращает имя файла отчета
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            print(f"Memory: tracemalloc started, send SIGUSR1 to pid {os.getpid()} again for a snapshot")
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        name = os.path.join(self.snapshot_dir, f"{os.getpid()}_{datetime.now():%Y%m%d_%H%M%S_%f}")
+
+        current, peak = tracemalloc.get_traced_memory()
+        with open(name + '.txt', 'w', encoding='utf-8') as f:
+            f.write(f"cycles {self.cycles}, RSS {current_rss():.1f} MB, traced {current / 2 ** 20:.1f} MB "
+                    f"(peak {peak / 2 ** 20:.1f} MB)\n\nTop allocations:\n")
+            for stat in snapshot.statistics('lineno')[:30]:
+                f.write(f"{stat}\n")
+            if self._snapshot is not None:
+                f.write("\nGrowth since previous snapshot:\n")
+                for stat in snapshot.compare_to(self._snapshot, 'traceback')[:10]:
+                    f.write(f"{stat}\n" + ''.join(f"    {line}\n" for line in stat.traceback.format()))
+        snapshot.dump(name + '.tracemalloc')
+
+        self._snapshot = snapshot
+        print(f"Memory: tracemalloc snapshot saved to {name}.txt")
+        return name + '.txt'
+
+
+def _worker(target: Callable, guard_options: dict) -> None:
+    # процесс-обработчик: target(guard) выполняет циклы сбора, пока guard.after_cycle() не потребует перезапуска
+    guard = MemoryGuard(**guard_options)
+    target(guard)
+    sys.exit(RECYCLE_EXIT)
+
+
+def run_daemon(target: Callable, restart_delay: float = 30, **guard_options) -> None:
+    '''
+    Запуск target(guard) в перезапускаемом процессе-обработчике.
+
+    target должна быть функцией уровня модуля (передается в процесс, запущенный методом spawn),
+    вызывать guard.after_cycle() после каждого цикла и возвращаться, когда он вернул True.
+    guard_options - параметры MemoryGuard.
+    '''
+    context = multiprocessing.get_context('spawn')
+    worker = None
+
+    def forward(signum, frame):
+        if worker is not None and worker.pid:
+            os.kill(worker.pid, signum)
+
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, forward)
+
+    generation = 0
+    try:
+        while True:
+            generation += 1
+            worker = context.Process(target=_worker, args=(target, guard_options), name=f'worker-{generation}')
+            worker.start()
+            print(f"Daemon: worker {generation} started, pid {worker.pid}")
+            worker.join()
+
+            if worker.exitcode == RECYCLE_EXIT:
+                continue
+            print(f"Daemon: worker {generation} failed with exit code {worker.exitcode}, restarting in {restart_delay}s")
+            time.sleep(restart_delay)
+
+    except KeyboardInterrupt:
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+
+def main(target: Callable) -> None:
+    # запуск сборщика из командной строки: обычный цикл или режим демона (--daemon)
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--daemon', action='store_true', help='run in a recycled worker process with memory control')
+    parser.add_argument('--max-cycles', type=int, default=500, help='cycles before the worker is recycled')
+    parser.add_argument('--max-rss', type=float, default=600, help='worker RSS limit, MB')
+    parser.add_argument('--trace', action='store_true', help='start tracemalloc immediately')
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(target, max_cycles=args.max_cycles, max_rss_mb=args.max_rss, trace=args.trace)
+    else:
+        target(None)
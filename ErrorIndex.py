@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import os, json
+from io import BytesIO
+from datetime import datetime
+
+from typing import Dict, List
+
+from FileTail import FileTail
+from ForecastArchive import NUMERIC_COLUMNS, list_forecast_files, read_forecast_file, to_numeric_frame
+
+'''
+    Инкрементальный индекс ошибок прогнозов по заблаговременности.
+
+    Для каждого (период, провайдер, метеопараметр, заблаговременность в часах) хранятся накопители
+    ошибок прогноз - факт: количество, сумма, сумма модулей и сумма квадратов. Периоды - месяц времени,
+    на которое дан прогноз ('2023-05'), и 'all' - за все время.
+
+    Прогнозы из архива (<root>/<provider>/ddmmYYYY_HHMM.csv) попадают в индекс по времени прогноза
+    (valid_time). Когда приходит фактическое значение за час, ошибки всех прогнозов на этот час
+    добавляются в накопители, и прогнозы удаляются из индекса ожидания. Прогноз на час, факт по которому
+    уже известен (например, при первом построении по архиву), учитывается сразу. Фактическое значение
+    часа - среднее по провайдерам всех наблюдений часа (как ForecastArchive.actual_by_hour), поэтому
+    час учитывается, когда появляются наблюдения следующего часа.
+
+    Запрос "кто лучше всех прогнозирует температуру на 6 ч в этом месяце" - обращение к накопителям
+    по ключу для каждого провайдера, без чтения архива:
+        index = LeadTimeErrorIndex.load('ensemble/error_index.json')
+        index.ranking('temperature', 6)
+
+    Индекс обновляет сборщик фактических данных (WeatherParser.py) после каждой записи, один процесс -
+    один писатель: новые файлы прогнозов и новые строки actual_report.csv дочитываются в sync.
+'''
+
+ALL = 'all'
+
+
+def hour_number(times) -> np.ndarray:
+    # номер часа от начала эпохи
+    return pd.DatetimeIndex(times).to_numpy(dtype='datetime64[ns]').astype('datetime64[h]').astype(np.int64)
+
+
+def hour_time(number: int) -> pd.Timestamp:
+    return pd.Timestamp(np.datetime64(int(number), 'h'))
+
+
+class LeadTimeErrorIndex:
+    '''
+    Индекс ошибок прогнозов по (период, провайдер, метеопараметр, заблаговременность).
+
+    Параметры:
+        state_file      - файл состояния индекса
+        root            - директория архива прогнозов
+        actual_file     - файл фактических данных
+        variables       - метеопараметры
+        providers       - провайдеры (по умолчанию все поддиректории архива с файлами прогнозов)
+        history_days    - сколько суток хранятся фактические значения для прогнозов, пришедших позже факта
+        max_wait_hours  - сколько часов прогноз ждет фактического значения после того, как факт за
+                          более поздние часы уже пришел
+    '''
+    def __init__(self, state_file: str = 'ensemble/error_index.json', root: str = '.',
+                 actual_file: str = 'actual_report.csv', variables: List[str] = None, providers: List[str] = None,
+                 history_days: int = 400, max_wait_hours: int = 48) -> None:
+        self.state_file = state_file
+        self.root = root
+        self.actual_file = actual_file
+        self.variables = variables or NUMERIC_COLUMNS
+        self.providers = providers
+        self.history_days = history_days
+        self.max_wait_hours = max_wait_hours
+
+        self.accumulators: Dict[tuple, list] = {}    # (период, провайдер, метеопараметр, заблаговременность) -> [n, sum, sum_abs, sum_sq]
+        self.pending: Dict[int, list] = {}           # час прогноза -> [(провайдер, заблаговременность, {метеопараметр: значение})]
+        self.observed: Dict[int, dict] = {}          # час -> фактические значения (для прогнозов, пришедших позже факта)
+        self.known_providers: set = set()
+
+        self._open_hour: int = None                  # последний час фактических данных, еще не учтенный
+        self._open_sums: Dict[str, list] = {}        # метеопараметр -> [сумма, количество] наблюдений открытого часа
+        self._actual = FileTail()                     # позиция чтения файла фактических данных
+        self._loaded_files: set = set()
+
+    @staticmethod
+    def period(hour: int) -> str:
+        # месяц часа 'YYYY-MM'
+        return str(np.datetime64(hour, 'h').astype('datetime64[M]'))
+
+    def _accumulate(self, hour: int, provider: str, lead: int, values: dict, actual: dict) -> None:
+        periods = (self.period(hour), ALL)
+        for variable, value in values.items():
+            target = actual.get(variable)
+            if target is None:
+                continue
+            error = value - target
+            for period in periods:
+                acc = self.accumulators.setdefault((period, provider, variable, lead), [0, 0.0, 0.0, 0.0])
+                acc[0] += 1
+                acc[1] += error
+                acc[2] += abs(error)
+                acc[3] += error * error
+
+    def add(self, forecasts: pd.DataFrame) -> int:
+        # прогнозы в "длинном" формате (provider, valid_time, lead_hour, метеопараметры); возвращает число строк
+        if forecasts.empty:
+            return 0
+        forecasts = to_numeric_frame(forecasts, self.variables)
+        variables = [v for v in self.variables if v in forecasts]
+        hours = hour_number(forecasts['valid_time'])
+        values = forecasts[variables].to_numpy(dtype=float)
+
+        for hour, provider, lead, row in zip(hours.tolist(), forecasts['provider'], forecasts['lead_hour'].tolist(), values):
+            row = {v: x for v, x in zip(variables, row.tolist()) if x == x}
+            if not row:
+                continue
+            self.known_providers.add(provider)
+            if hour in self.observed:
+                self._accumulate(hour, provider, lead, row, self.observed[hour])
+            else:
+                self.pending.setdefault(hour, []).append((provider, lead, row))
+        return forecasts.shape[0]
+
+    def observe(self, hour: int, actual: dict) -> None:
+        # фактические значения за час: ошибки всех ожидающих прогнозов на этот час
+        actual = {v: x for v, x in actual.items() if x == x}
+        self.observed[hour] = actual
+        for provider, lead, values in self.pending.pop(hour, []):
+            self._accumulate(hour, provider, lead, values, actual)
+
+        # старые фактические значения и прогнозы, не дождавшиеся факта, больше не нужны
+        for old in [h for h in self.observed if h < hour - self.history_days * 24]:
+            del self.observed[old]
+        for stale in [h for h in self.pending if h < hour - self.max_wait_hours]:
+            del self.pending[stale]
+
+    def sync_forecasts(self) -> int:
+        # дочитывание новых файлов архива прогнозов; возвращает количество строк
+        rows = 0
+        for provider, filename in list_forecast_files(self.root, self.providers):
+            if filename in self._loaded_files:
+                continue
+            self._loaded_files.add(filename)
+            try:
+                rows += self.add(read_forecast_file(filename, provider))
+            except Exception as e:
+                print(f"Error index: failed to read {filename}: {e}")
+        return rows
+
+    def sync_actuals(self) -> int:
+        # чтение только новых строк файла фактических данных; возвращает количество учтенных часов
+        filename = os.path.join(self.root, self.actual_file)
+        if not os.path.exists(filename):
+            return 0
+
+        # последняя строка может быть дописана не полностью - она будет прочитана в следующий раз;
+        # после отката строк файла (CycleJournal) чтение продолжается с границы строки (FileTail)
+        header, chunk = self._actual.read(filename)
+        if not chunk:
+            return 0
+
+        actual = to_numeric_frame(pd.read_csv(BytesIO(header + chunk)), self.variables)
+        actual['time'] = pd.to_datetime(actual['time'], errors='coerce')
+        actual = actual[actual['time'].notna()]
+        actual['hour'] = hour_number(actual['time'])
+        variables = [v for v in self.variables if v in actual]
+        grouped = actual.groupby('hour')[variables].agg(['sum', 'count'])
+
+        closed = 0
+        for hour, row in grouped.iterrows():
+            if self._open_hour is not None and hour > self._open_hour:
+                self._close_hour()
+                closed += 1
+            if self._open_hour is None or hour >= self._open_hour:
+                self._open_hour = hour
+                for variable in variables:
+                    sums = self._open_sums.setdefault(variable, [0.0, 0])
+                    sums[0] += float(row[(variable, 'sum')])
+                    sums[1] += int(row[(variable, 'count')])
+        return closed
+
+    def _close_hour(self) -> None:
+        actual = {v: total / count for v, (total, count) in self._open_sums.items() if count}
+        self.observe(self._open_hour, actual)
+        self._open_hour, self._open_sums = None, {}
+
+    def sync(self) -> tuple:
+        # сначала фактические данные, затем прогнозы: прогнозы на прошедшие часы учитываются сразу
+        return self.sync_actuals(), self.sync_forecasts()
+
+    def stats(self, variable: str = 'temperature', provider: str = None, lead_hour: int = None,
+              period: str = ALL) -> pd.DataFrame:
+        # статистика ошибок: provider, lead_hour, mae, bias, count, rmse (как ForecastArchive.error_stats)
+        rows = [(p, lead, acc) for (per, p, v, lead), acc in self.accumulators.items()
+                if per == period and v == variable and (provider is None or p == provider)
+                and (lead_hour is None or lead == lead_hour)]
+        if not rows:
+            return pd.DataFrame(columns=['provider', 'lead_hour', 'mae', 'bias', 'count', 'rmse'])
+
+        n = np.array([acc[0] for _, _, acc in rows], dtype=float)
+        sums = np.array([acc[1:] for _, _, acc in rows], dtype=float)
+        return pd.DataFrame({'provider': [p for p, _, _ in rows], 'lead_hour': [lead for _, lead, _ in rows],
+                             'mae': sums[:, 1] / n, 'bias': sums[:, 0] / n, 'count': n.astype(int),
+                             'rmse': np.sqrt(sums[:, 2] / n)}).sort_values(['provider', 'lead_hour'], ignore_index=True)
+
+    def ranking(self, variable: str = 'temperature', lead_hour: int = 6, period: str = None, metric: str = 'mae',
+                min_count: int = 1) -> List[tuple]:
+        # провайдеры по возрастанию ошибки [(провайдер, ошибка, количество)]; period - месяц 'YYYY-MM',
+        # 'all' или None (текущий месяц); одно обращение к накопителям на провайдера
+        period = period or datetime.now().strftime('%Y-%m')
+        result = []
+        for provider in self.known_providers:
+            acc = self.accumulators.get((period, provider, variable, int(lead_hour)))
+            if acc is None or acc[0] < min_count:
+                continue
+            n, total, total_abs, total_sq = acc
+            error = {'mae': total_abs / n, 'rmse': (total_sq / n) ** 0.5, 'bias': abs(total / n)}[metric]
+            result.append((provider, error, n))
+        return sorted(result, key=lambda item: item[1])
+
+    def best(self, variable: str = 'temperature', lead_hour: int = 6, period: str = None, metric: str = 'mae',
+             min_count: int = 1) -> str:
+        ranking = self.ranking(variable, lead_hour, period, metric, min_count)
+        return ranking[0][0] if ranking else None
+
+    def save(self, state_file: str = None) -> None:
+        state_file = state_file or self.state_file
+        directory = os.path.dirname(state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        root = os.path.abspath(self.root)
+        state = {
+            'actual_offset': self._actual.offset,
+            'actual_check': self._actual.check,
+            'open_hour': self._open_hour,
+            'open_sums': self._open_sums,
+            'variables': self.variables,
+            'providers': sorted(self.known_providers),
+            'loaded_files': sorted(os.path.relpath(os.path.abspath(f), root) for f in self._loaded_files),
+            'accumulators': [[*key, *acc] for key, acc in self.accumulators.items()],
+            'pending': {str(hour): entries for hour, entries in self.pending.items()},
+            'observed': {str(hour): actual for hour, actual in self.observed.items()},
+        }
+        with open(state_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(state_file + '.tmp', state_file)
+
+    @classmethod
+    def load(cls, state_file: str = 'ensemble/error_index.json', root: str = '.', **kwargs) -> LeadTimeErrorIndex:
+        # индекс из файла состояния; если файла нет - пустой (будет построен по архиву при первом sync)
+        if not os.path.exists(state_file):
+            return cls(state_file, root, **kwargs)
+
+        with open(state_file, encoding='utf-8') as f:
+            state = json.load(f)
+
+        index = cls(state_file, root, variables=state.get('variables'), **kwargs)
+        index._actual = FileTail(state.get('actual_offset', 0), state.get('actual_check'))
+        index._open_hour = state.get('open_hour')
+        index._open_sums = state.get('open_sums', {})
+        index.known_providers = set(state.get('providers', []))
+        index._loaded_files = {os.path.join(root, f) for f in state.get('loaded_files', [])}
+        index.accumulators = {(per, p, v, int(lead)): [int(n), s, sa, ss]
+                              for per, p, v, lead, n, s, sa, ss in state.get('accumulators', [])}
+        index.pending = {int(hour): [tuple(e) for e in entries] for hour, entries in state.get('pending', {}).items()}
+        index.observed = {int(hour): actual for hour, actual in state.get('observed', {}).items()}
+        return index
+
+
+if __name__ == '__main__':
+    import sys
+
+    # построение (дочитывание) индекса по архиву: python ErrorIndex.py [root] [state_file]
+    root = sys.argv[1] if len(sys.argv) > 1 else '.'
+    state_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(root, 'ensemble', 'error_index.json')
+
+    index = LeadTimeErrorIndex.load(state_file, root)
+    hours, rows = index.sync()
+    index.save()
+    print(f"Error index: {hours} hours observed, {rows} forecast rows added, {len(index.accumulators)} accumulators")
+    for variable in ('temperature', 'pressure'):
+        print(variable, 'lead 6h, all time:', index.ranking(variable, 6, period=ALL))
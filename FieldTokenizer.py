@@ -0,0 +1,80 @@
+import re
+
+from typing import Callable, Dict, Iterable
+
+'''
+    Извлечение полей из текста блока страницы за один проход.
+
+    Шаблоны всех полей блока компилируются один раз (при импорте модуля-парсера) в одно регулярное выражение:
+    каждый шаблон - альтернатива с именем токена, именованные группы внутри шаблона - поля результата.
+    Текст блока просматривается один раз (re.finditer), для каждого токена берется первое совпадение,
+    значения групп приводятся к типам полей (числа - float/int вместо строк).
+
+    Блоки страницы находятся одним прямым обходом дерева (find_blocks), текст блока собирается из текстов
+    его узлов, каждый из которых вычисляется один раз:
+        text = labelled([('ветер', wind.text), ('давление', pressure.text)])   # 'ветер: ...\nдавление: ...'
+
+    Пример:
+        tokenizer = FieldTokenizer({'pressure': r'давление:\s*(?P<pressure>\d{3})'}, types={'pressure': integer})
+        tokenizer('Давление: 745 мм')   # {'pressure': 745}
+'''
+
+_NUMBER = str.maketrans({'−': '-', '–': '-', ',': '.'})
+
+
+def number(value: str) -> float:
+    # '+5', '−3', '3,4' -> float
+    return float(value.translate(_NUMBER))
+
+
+def integer(value: str) -> int:
+    return int(number(value))
+
+
+def find_blocks(root, name: str, class_: str) -> list:
+    # элементы дерева BeautifulSoup с именем name и классом class_: прямой обход дерева
+    # (find_all проверяет каждый узел фильтром bs4 и на больших страницах в несколько раз медленнее)
+    return [tag for tag in root.descendants if tag.name == name and class_ in tag.get('class', ())]
+
+
+def labelled(items: Iterable[tuple]) -> str:
+    # текст блока из пар (метка, текст узла); пустые узлы пропускаются, узел занимает одну строку (пустая метка - без метки)
+    return '\n'.join(f"{label}: {' '.join(text.split())}" if label else ' '.join(text.split())
+                     for label, text in items if text is not None)
+
+
+class FieldTokenizer:
+    '''
+    Параметры:
+        patterns    - {имя токена: регулярное выражение с именованными группами полей}
+        types       - {поле: функция преобразования значения} (по умолчанию - строка без пробелов по краям)
+        flags       - флаги регулярного выражения (по умолчанию без учета регистра)
+    '''
+    def __init__(self, patterns: Dict[str, str], types: Dict[str, Callable] = None, flags: int = re.I) -> None:
+        self.types = types or {}
+        # группы токенов получают префикс, чтобы не совпадать с именами полей
+        self.regex = re.compile('|'.join(f'(?P<_{name}>{pattern})' for name, pattern in patterns.items()), flags)
+
+        # поля каждого токена (группы, вложенные в группу токена); ключ - имя группы токена
+        names = {index: group for group, index in self.regex.groupindex.items()}
+        tokens = sorted(self.regex.groupindex[f'_{name}'] for name in patterns) + [self.regex.groups + 1]
+        self._fields: Dict[str, list] = {names[start]: [names[index] for index in range(start + 1, end) if index in names]
+                                         for start, end in zip(tokens, tokens[1:])}
+
+    def __call__(self, text: str) -> dict:
+        matches = {}
+        for match in self.regex.finditer(text):
+            token = match.lastgroup  # группа токена закрывается последней
+            if token in matches:
+                continue
+            matches[token] = match
+            if len(matches) == len(self._fields):
+                break
+
+        fields = {}
+        for token, match in matches.items():
+            for field in self._fields[token]:
+                value = match.group(field)
+                if value is not None:
+                    fields[field] = self.types.get(field, str.strip)(value)
+        return fields
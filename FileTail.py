@@ -0,0 +1,86 @@
+import os
+import hashlib
+
+'''
+    Чтение новых строк файла, который дописывает другой процесс (actual_report.csv): агрегаты фактических
+    данных, индекс ошибок и консенсусный прогноз читают только строки, появившиеся после прошлого чтения.
+
+    Позиция чтения хранится вместе с контрольной суммой последней прочитанной строки. Если файл стал короче
+    позиции или байты перед позицией изменились (откат строк прерванного цикла, CycleJournal.rollback, и
+    новые строки на их месте), позиция переносится на начало строки, в которой она оказалась (не дальше
+    конца файла): чтение продолжается с границы строки, а не с середины строки или после конца файла.
+    Строки, прочитанные до отката, повторно не вычитаются - откатывается только позиция.
+    Недописанная последняя строка файла не читается (будет прочитана в следующий раз).
+
+    Пример:
+        tail = FileTail(state.get('actual_offset', 0), state.get('actual_check'))
+        header, chunk = tail.read('actual_report.csv')   # chunk - новые полные строки
+        state.update(actual_offset=tail.offset, actual_check=tail.check)
+'''
+
+
+def _check(line: bytes) -> str:
+    return f'{len(line)}:{hashlib.sha1(line).hexdigest()[:16]}'
+
+
+class FileTail:
+    '''
+    Позиция чтения дописываемого файла.
+
+    Параметры:
+        offset  - позиция после последней прочитанной строки
+        check   - контрольная сумма последней прочитанной строки ('длина:sha1'; None - не проверяется)
+    '''
+    def __init__(self, offset: int = 0, check: str = None) -> None:
+        self.offset = offset
+        self.check = check
+
+    def _matches(self, f, offset: int) -> bool:
+        # байты перед позицией - та же строка, что была прочитана последней
+        if not self.check:
+            return True
+        length = int(self.check.split(':')[0])
+        if length > offset:
+            return False
+        f.seek(offset - length)
+        return _check(f.read(length)) == self.check
+
+    @staticmethod
+    def _line_start(f, position: int, start: int) -> int:
+        # начало строки, в которой находится position (position сразу после перевода строки - сама position)
+        end, block = position, 1 << 16
+        while end > start:
+            begin = max(start, end - block)
+            f.seek(begin)
+            found = f.read(end - begin).rfind(b'\n')
+            if found != -1:
+                return begin + found + 1
+            end = begin
+        return start
+
+    def read(self, filename: str) -> tuple:
+        # (строка заголовка, новые полные строки); файла нет - (b'', b'')
+        if not os.path.exists(filename):
+            return b'', b''
+
+        with open(filename, 'rb') as f:
+            header = f.readline()
+            start = f.tell()
+            size = f.seek(0, os.SEEK_END)
+
+            offset = max(self.offset, start)
+            if offset > size or not self._matches(f, offset):
+                offset = self._line_start(f, min(offset, size), start)
+                print(f"{filename} was truncated or rewritten, reading from offset {offset} instead of {self.offset}")
+                # последней прочитанной считается строка перед новой позицией
+                previous = self._line_start(f, offset - 1, start) if offset > start else offset
+                f.seek(previous)
+                self.check = _check(f.read(offset - previous)) if offset > start else None
+            f.seek(offset)
+            chunk = f.read()
+
+        chunk = chunk[:chunk.rfind(b'\n') + 1]
+        self.offset = offset + len(chunk)
+        if chunk:
+            self.check = _check(chunk[chunk.rfind(b'\n', 0, len(chunk) - 1) + 1:])
+        return header, chunk
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import os, re
+from datetime import datetime
+
+from typing import Dict, List, Union
+
+'''
+    Архив сохраненных прогнозов (директории провайдеров с файлами ddmmYYYY_HHMM.csv) и
+    фактических данных (actual_report.csv) с предварительно построенными индексами.
+
+    Прогнозы хранятся в "длинной" таблице: provider, issue_time (время выпуска = имя файла),
+    valid_time (время, на которое дан прогноз), lead_hour и колонки метеопараметров.
+    Индексы:
+        by_valid    - отсортированный MultiIndex (provider, valid_time)
+        by_issue    - отсортированный MultiIndex (provider, issue_time)
+        latest      - время последнего выпуска по каждому провайдеру
+'''
+
+FILENAME_FORMAT = '%d%m%Y_%H%M'
+_filename_regex = re.compile(r'^\d{8}_\d{4}\.csv$')
+
+# числовые метеопараметры, по которым считаются ошибки прогноза
+NUMERIC_COLUMNS = ['temperature', 'wind_speed', 'pressure', 'humidity', 'cloudiness']
+
+
+def to_numeric_frame(data: pd.DataFrame, columns: List[str] = NUMERIC_COLUMNS) -> pd.DataFrame:
+    # приведение строковых значений ('+5', '3,4') к числам
+    data = data.copy()
+    for column in columns:
+        if column in data:
+            values = data[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = values.astype(str).str.replace(',', '.', regex=False)
+            data[column] = pd.to_numeric(values, errors='coerce')
+    return data
+
+
+def list_forecast_files(root: str = '.', providers: List[str] = None) -> List[tuple]:
+    # файлы прогнозов [(provider, filename)]; по умолчанию - все поддиректории с файлами прогнозов
+    if providers is None:
+        providers = [d for d in sorted(os.listdir(root))
+                     if os.path.isdir(os.path.join(root, d)) and any(map(_filename_regex.match, os.listdir(os.path.join(root, d))))]
+
+    result = []
+    for provider in providers:
+        directory = os.path.join(root, provider)
+        if not os.path.isdir(directory):
+            continue
+        result.extend((provider, os.path.join(directory, name)) for name in sorted(os.listdir(directory))
+                      if _filename_regex.match(name))
+    return result
+
+
+def read_forecast_file(filename: str, provider: str) -> pd.DataFrame:
+    # чтение одного сохраненного прогноза в "длинном" формате
+    data = pd.read_csv(filename, index_col=0)
+    issue_time = datetime.strptime(os.path.basename(filename)[:-4], FILENAME_FORMAT)
+    return forecast_frame(data, provider, issue_time)
+
+
+def forecast_frame(data: pd.DataFrame, provider: str, issue_time: datetime) -> pd.DataFrame:
+    # прогноз (индекс - время, как в Forecast.data) в "длинном" формате
+    data = data.copy()
+    data.index = pd.to_datetime(data.index, errors='coerce')
+    data = data[data.index.notna()]
+    data.index.name = 'valid_time'
+    data = data.reset_index()
+
+    data.insert(0, 'issue_time', pd.Timestamp(issue_time))
+    data.insert(0, 'provider', provider)
+    data['lead_hour'] = ((data['valid_time'] - data['issue_time']) / pd.Timedelta('1h')).round().astype(int)
+
+    return data
+
+
+class ForecastArchive:
+    '''
+    Архив прогнозов и фактических данных.
+
+    Параметры:
+        root            - директория с поддиректориями провайдеров
+        actual_file     - файл с фактическими данными
+        providers       - список провайдеров (по умолчанию все поддиректории с файлами прогнозов)
+        aggregates_file - снимок агрегатов фактических данных (ObservationAggregates); если снимок существует,
+                          почасовые фактические данные берутся из него без чтения actual_report.csv
+        error_index_file - состояние индекса ошибок (ErrorIndex.LeadTimeErrorIndex); если файл существует,
+                          статистика ошибок берется из готовых накопителей без соединения архива с фактом
+    '''
+    def __init__(self, root: str = '.', actual_file: str = 'actual_report.csv', providers: List[str] = None,
+                 aggregates_file: str = None, error_index_file: str = None) -> None:
+        self.root = root
+        self.actual_file = actual_file
+        self.providers = providers
+        self.aggregates_file = aggregates_file
+        self.error_index_file = error_index_file
+
+        self.forecasts = pd.DataFrame()
+        self.actuals = pd.DataFrame()
+        self.aggregates = None
+        self.error_index = None
+        self.by_valid = pd.DataFrame()
+        self.by_issue = pd.DataFrame()
+        self.latest: Dict[str, pd.Timestamp] = {}
+
+        self._loaded_files: set = set()
+        self._actual_mtime = None
+        self._error_index_mtime = None
+        self._errors = None
+
+        self.refresh()
+
+    def refresh(self) -> bool:
+        # дочитывание новых файлов архива и перестроение индексов; True - если архив изменился
+        new_frames = [read_forecast_file(filename, provider) for provider, filename in self._new_files()]
+        actual_changed = self._actuals_changed()
+        index_changed = self._load_error_index()
+
+        if not new_frames and not actual_changed:
+            return index_changed
+
+        if new_frames:
+            self.forecasts = to_numeric_frame(pd.concat([self.forecasts] + new_frames, ignore_index=True))
+        if actual_changed and self._has_aggregates():
+            from ObservationAggregates import ObservationAggregates
+            self.aggregates = ObservationAggregates.load(os.path.join(self.root, self.aggregates_file))
+        elif actual_changed:
+            self.actuals = self._read_actuals()
+
+        self._build_indexes()
+        return True
+
+    def _new_files(self) -> List[tuple]:
+        result = [(provider, filename) for provider, filename in list_forecast_files(self.root, self.providers)
+                  if filename not in self._loaded_files]
+        self._loaded_files.update(filename for _, filename in result)
+        return result
+
+    def _load_error_index(self) -> bool:
+        # перечитывание индекса ошибок, если его файл изменился
+        filename = os.path.join(self.root, self.error_index_file) if self.error_index_file else None
+        mtime = os.path.getmtime(filename) if filename and os.path.exists(filename) else None
+        if mtime == self._error_index_mtime:
+            return False
+        self._error_index_mtime = mtime
+        if mtime is not None:
+            from ErrorIndex import LeadTimeErrorIndex
+            self.error_index = LeadTimeErrorIndex.load(filename, self.root)
+        return True
+
+    def _has_aggregates(self) -> bool:
+        return bool(self.aggregates_file) and os.path.exists(os.path.join(self.root, self.aggregates_file))
+
+    def _actuals_changed(self) -> bool:
+        # при наличии снимка агрегатов отслеживается он, иначе - файл фактических данных
+        filename = os.path.join(self.root, self.aggregates_file if self._has_aggregates() else self.actual_file)
+        mtime = (filename, os.path.getmtime(filename)) if os.path.exists(filename) else None
+        changed = mtime != self._actual_mtime
+        self._actual_mtime = mtime
+        return changed
+
+    def _read_actuals(self) -> pd.DataFrame:
+        filename = os.path.join(self.root, self.actual_file)
+        if not os.path.exists(filename):
+            return pd.DataFrame()
+
+        data = pd.read_csv(filename)
+        data['time'] = pd.to_datetime(data['time'], errors='coerce')
+        data = data[data['time'].notna()]
+        data['valid_time'] = data['time'].dt.floor('h')
+        return to_numeric_frame(data)
+
+    def _build_indexes(self) -> None:
+        self._errors = None
+
+        if self.forecasts.empty:
+            return
+
+        self.by_valid = self.forecasts.set_index(['provider', 'valid_time']).sort_index()
+        self.by_issue = self.forecasts.set_index(['provider', 'issue_time']).sort_index()
+        self.latest = self.forecasts.groupby('provider')['issue_time'].max().to_dict()
+
+    def latest_forecast(self, provider: str) -> pd.DataFrame:
+        # последний выпуск прогноза провайдера (список ключей: выпуск из одной строки - тоже таблица, а не Series)
+        if provider not in self.latest:
+            return pd.DataFrame()
+        return self.by_issue.loc[[(provider, self.latest[provider])]].reset_index()
+
+    def forecasts_for(self, valid_time: Union[str, datetime], latest_only: bool = True) -> pd.DataFrame:
+        # прогнозы всех провайдеров на заданное время (по умолчанию - только последний выпуск каждого провайдера)
+        valid_time = pd.Timestamp(valid_time)
+        frames = []
+
+        for provider in self.latest:
+            try:
+                rows = self.by_valid.loc[[(provider, valid_time)]]
+            except KeyError:
+                continue
+            if latest_only:
+                rows = rows[rows['issue_time'] == rows['issue_time'].max()]
+            frames.append(rows.reset_index())
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def actual_by_hour(self) -> pd.DataFrame:
+        # среднее по провайдерам фактических данных за каждый час
+        if self.aggregates is not None:
+            return self._actual_by_hour_from_aggregates()
+        if self.actuals.empty:
+            return pd.DataFrame()
+        columns = [c for c in NUMERIC_COLUMNS if c in self.actuals]
+        return self.actuals.groupby('valid_time')[columns].mean()
+
+    def _actual_by_hour_from_aggregates(self) -> pd.DataFrame:
+        # то же среднее по всем наблюдениям часа, но из готовых сумм и количеств снимка
+        hourly = self.aggregates.frame('hour')
+        if hourly.empty:
+            return pd.DataFrame()
+        hourly['total'] = hourly['mean'] * hourly['count']
+        sums = hourly.pivot_table(index='period', columns='variable', values=['total', 'count'], aggfunc='sum')
+        actual = sums['total'] / sums['count']
+        actual.index.name, actual.columns.name = 'valid_time', None
+        return actual[[c for c in NUMERIC_COLUMNS if c in actual]]
+
+    def errors(self) -> pd.DataFrame:
+        # ошибки прогнозов (прогноз - факт) для каждой строки архива, у которой есть фактические данные
+        if self._errors is None:
+            actual = self.actual_by_hour()
+            if actual.empty or self.forecasts.empty:
+                self._errors = pd.DataFrame()
+            else:
+                columns = [c for c in actual.columns if c in self.forecasts]
+                joined = self.forecasts.join(actual[columns], on='valid_time', rsuffix='_actual', how='inner')
+                errors = joined[['provider', 'issue_time', 'valid_time', 'lead_hour']].copy()
+                for column in columns:
+                    errors[column] = joined[column] - joined[f'{column}_actual']
+                self._errors = errors
+        return self._errors
+
+    def error_stats(self, variable: str = 'temperature', provider: str = None) -> pd.DataFrame:
+        # статистика ошибок по заблаговременности прогноза: MAE, BIAS, RMSE, количество
+        if self.error_index is not None:
+            return self.error_index.stats(variable, provider)
+
+        errors = self.errors()
+        if errors.empty or variable not in errors:
+            return pd.DataFrame()
+        if provider is not None:
+            errors = errors[errors['provider'] == provider]
+
+        errors = errors.dropna(subset=[variable])
+        stats = pd.DataFrame({'provider': errors['provider'], 'lead_hour': errors['lead_hour'],
+                              'error': errors[variable], 'abs_error': errors[variable].abs(), 'sq_error': errors[variable]**2})
+        stats = stats.groupby(['provider', 'lead_hour']).agg(
+            mae=('abs_error', 'mean'), bias=('error', 'mean'), mse=('sq_error', 'mean'), count=('error', 'size'))
+        stats['rmse'] = np.sqrt(stats.pop('mse'))
+        return stats.reset_index()
+
+    def resampled(self, freq: str = '1h', **kwargs) -> pd.DataFrame:
+        # все выпуски архива на общей сетке (ForecastResampling.resample)
+        from ForecastResampling import resample
+        if self.forecasts.empty:
+            return pd.DataFrame()
+        return resample(self.forecasts, freq, **kwargs)
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import os, json
+from io import BytesIO
+from datetime import datetime
+
+from typing import Dict, List
+
+from WeatherForecastParser import Forecast
+from FileTail import FileTail
+from ForecastArchive import to_numeric_frame
+
+'''
+    Ансамблевый (консенсусный) прогноз по всем провайдерам.
+
+    EnsembleBuilder принимает Forecast.data каждого провайдера по мере готовности и обновляет консенсус
+    инкрементально: вклад провайдера (взвешенные суммы) вычитается и добавляется заново, история
+    не пересчитывается. Веса - обратные среднеквадратичные ошибки провайдера для данной заблаговременности,
+    ошибки накапливаются онлайн (алгоритм Уэлфорда) по мере поступления фактических данных.
+
+    EnsembleForecast сохраняет консенсус как пятый провайдер ('ensemble').
+'''
+
+
+class RunningStats:
+    '''
+    Онлайн статистика ошибок (алгоритм Уэлфорда): количество, среднее, сумма квадратов отклонений.
+    '''
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0) -> None:
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else np.nan
+
+    @property
+    def mse(self) -> float:
+        # среднеквадратичная ошибка = дисперсия + квадрат смещения
+        return self.variance + self.mean**2 if self.count else np.nan
+
+    def to_list(self) -> list:
+        return [self.count, self.mean, self.m2]
+
+
+def weighted_median(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # взвешенная медиана по строкам матрицы values (пропуски не учитываются)
+    missing = np.isnan(values)
+    weights = np.where(missing, 0, weights)
+    order = np.argsort(np.where(missing, np.inf, values), axis=1)
+
+    values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+    idx = (cumulative >= cumulative[:, -1:] / 2).argmax(axis=1)
+
+    result = values[np.arange(values.shape[0]), idx]
+    result[cumulative[:, -1] == 0] = np.nan
+    return result
+
+
+class EnsembleBuilder:
+    '''
+    Построитель консенсусного прогноза.
+
+    Параметры:
+        variables       - метеопараметры консенсуса
+        method          - 'mean' (взвешенное среднее) или 'median' (взвешенная медиана)
+        state_file      - файл с накопленной статистикой ошибок и прогнозами консенсуса
+        min_count       - минимальное число наблюдений для использования статистики в весах
+        max_lead        - максимальная заблаговременность (ч), для которой хранятся прогнозы до проверки
+    '''
+    def __init__(self, variables: List[str] = None, method: str = 'mean', state_file: str = 'ensemble/state.json',
+                 min_count: int = 24, max_lead: int = 240) -> None:
+        self.variables = variables or ['temperature', 'wind_speed', 'pressure', 'humidity']
+        self.method = method
+        self.state_file = state_file
+        self.min_count = min_count
+        self.max_lead = max_lead
+
+        self.stats: Dict[tuple, RunningStats] = {}
+        self.members: Dict[str, pd.DataFrame] = {}
+        self.pending: Dict[pd.Timestamp, Dict[tuple, dict]] = {}
+
+        self._numerator = pd.DataFrame(columns=self.variables, dtype=float)
+        self._denominator = pd.DataFrame(columns=self.variables, dtype=float)
+        self._actual = FileTail()  # позиция чтения файла фактических данных
+        self._state_changed = False  # прогнозы консенсуса или ожидающие фактических данных еще не сохранены
+
+        self.load_state()
+
+    def weight(self, provider: str, variable: str, lead_hour: int) -> float:
+        stats = self.stats.get((provider, variable, int(lead_hour)))
+        if stats is None or stats.count < self.min_count:
+            return 1.0
+        return 1.0 / (stats.mse + 1e-6)
+
+    def _weights(self, provider: str, variable: str, lead_hours: pd.Series) -> pd.Series:
+        return lead_hours.map(lambda lead: self.weight(provider, variable, lead)).astype(float)
+
+    def add(self, provider: str, data: pd.DataFrame, issue_time: datetime = None) -> pd.DataFrame:
+        # добавление (замена) прогноза провайдера, возвращает обновленный консенсус
+        if data is None or data.empty:
+            return self.consensus()
+
+        issue_time = pd.Timestamp(issue_time or datetime.now()).floor('h')
+        member = to_numeric_frame(data.reset_index(), self.variables)
+        member['valid_time'] = pd.to_datetime(member.iloc[:, 0]).dt.floor('h')
+        member = member.groupby('valid_time')[[v for v in self.variables if v in member]].mean()
+        member = member.reindex(columns=self.variables)
+        member['lead_hour'] = ((member.index - issue_time) / pd.Timedelta('1h')).astype(int)
+
+        self._remove_member(provider)
+        self._add_member(provider, member)
+        self._add_pending(provider, member)
+        self._state_changed = True
+
+        return self.consensus()
+
+    def _contribution(self, provider: str, member: pd.DataFrame) -> tuple:
+        values = member[self.variables]
+        weights = pd.DataFrame({v: self._weights(provider, v, member['lead_hour']) for v in self.variables}, index=member.index)
+        weights = weights.where(values.notna(), 0.0)
+        return (values * weights).fillna(0.0), weights
+
+    def _add_member(self, provider: str, member: pd.DataFrame) -> None:
+        numerator, denominator = self._contribution(provider, member)
+        self.members[provider] = member.assign(**{f'_w_{v}': denominator[v] for v in self.variables})
+        self._numerator = self._numerator.add(numerator, fill_value=0.0)
+        self._denominator = self._denominator.add(denominator, fill_value=0.0)
+
+    def _remove_member(self, provider: str) -> None:
+        member = self.members.pop(provider, None)
+        if member is None:
+            return
+        # вычитаются именно те веса, с которыми прогноз был добавлен
+        weights = member[[f'_w_{v}' for v in self.variables]].set_axis(self.variables, axis=1)
+        numerator = (member[self.variables] * weights).fillna(0.0)
+        self._numerator = self._numerator.sub(numerator, fill_value=0.0)
+        self._denominator = self._denominator.sub(weights, fill_value=0.0)
+
+        # часы, которых нет ни в одном оставшемся прогнозе, удаляются: суммы не растут с каждым выпуском,
+        # и в них не остается погрешность вычитания
+        orphans = member.index
+        for other in self.members.values():
+            orphans = orphans.difference(other.index)
+        if len(orphans):
+            self._numerator = self._numerator.drop(orphans, errors='ignore')
+            self._denominator = self._denominator.drop(orphans, errors='ignore')
+
+    def consensus(self, from_time: datetime = None) -> pd.DataFrame:
+        from_time = pd.Timestamp(from_time or datetime.now()).floor('h')
+
+        if self.method == 'median' and self.members:
+            index = self._denominator.index
+            data = pd.DataFrame(index=index, columns=self.variables, dtype=float)
+            for v in self.variables:
+                values = np.column_stack([m[v].reindex(index).to_numpy(float) for m in self.members.values()])
+                weights = np.column_stack([m[f'_w_{v}'].reindex(index).fillna(0).to_numpy(float) for m in self.members.values()])
+                data[v] = weighted_median(values, weights)
+        else:
+            data = self._numerator / self._denominator.where(self._denominator > 1e-12)
+
+        data = data[data.index >= from_time].sort_index()
+        data['members'] = sum(m[self.variables].notna().any(axis=1).reindex(data.index, fill_value=False).astype(int)
+                              for m in self.members.values()) if self.members else 0
+        data.index.name = 'time'
+        return data
+
+    def _add_pending(self, provider: str, member: pd.DataFrame) -> None:
+        # прогнозы ждут фактических данных для обновления статистики ошибок;
+        # повторный выпуск провайдера в тот же час заменяет предыдущий
+        for valid_time, row in member[(member['lead_hour'] >= 0) & (member['lead_hour'] <= self.max_lead)].iterrows():
+            values = {v: row[v] for v in self.variables if not pd.isna(row[v])}
+            self.pending.setdefault(valid_time, {})[(provider, int(row['lead_hour']))] = values
+
+    def observe(self, valid_time: datetime, actual: Dict[str, float]) -> None:
+        # фактические данные за час valid_time: обновление статистики ошибок всех прогнозов на этот час
+        valid_time = pd.Timestamp(valid_time).floor('h')
+
+        for (provider, lead_hour), values in self.pending.pop(valid_time, {}).items():
+            for variable, value in values.items():
+                if variable in actual and not pd.isna(actual[variable]):
+                    self.stats.setdefault((provider, variable, lead_hour), RunningStats()).update(value - actual[variable])
+
+        # прогнозы на прошедшие часы без фактических данных больше не нужны
+        for stale in [t for t in self.pending if t < valid_time - pd.Timedelta(hours=24)]:
+            del self.pending[stale]
+
+    def sync_actuals(self, filename: str = 'actual_report.csv') -> int:
+        # чтение только новых строк файла фактических данных; возвращает количество учтенных часов
+        # последняя строка может быть дописана не полностью - она будет прочитана в следующий раз;
+        # после отката строк файла (CycleJournal) чтение продолжается с границы строки (FileTail)
+        header, chunk = self._actual.read(filename)
+        if not chunk:
+            if self._state_changed:
+                self.save_state()
+            return 0
+
+        actual = to_numeric_frame(pd.read_csv(BytesIO(header + chunk)), self.variables)
+        actual['time'] = pd.to_datetime(actual['time'], errors='coerce').dt.floor('h')
+        actual = actual.groupby('time')[[v for v in self.variables if v in actual]].mean()
+
+        for valid_time, row in actual.iterrows():
+            self.observe(valid_time, row.to_dict())
+
+        self.save_state()
+        return actual.shape[0]
+
+    def save_state(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # прогнозы консенсуса и прогнозы, ожидающие фактических данных, сохраняются вместе со статистикой:
+        # после перезапуска консенсус включает провайдеров, прогноз которых с тех пор не изменился
+        # (Scheduler не передает его повторно), а ошибки прогнозов, выпущенных до перезапуска, учитываются
+        state = {'actual_offset': self._actual.offset, 'actual_check': self._actual.check,
+                 'stats': [[*key, *value.to_list()] for key, value in self.stats.items()],
+                 'members': {provider: [[valid_time.isoformat(), int(row['lead_hour']),
+                                         {v: float(row[v]) for v in self.variables if not pd.isna(row[v])}]
+                                        for valid_time, row in member.iterrows()]
+                             for provider, member in self.members.items()},
+                 'pending': [[valid_time.isoformat(), provider, lead_hour, {v: float(x) for v, x in values.items()}]
+                             for valid_time, forecasts in self.pending.items()
+                             for (provider, lead_hour), values in forecasts.items()]}
+        with open(self.state_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(self.state_file + '.tmp', self.state_file)
+        self._state_changed = False
+
+    def load_state(self) -> None:
+        if not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, encoding='utf-8') as f:
+            state = json.load(f)
+
+        self._actual = FileTail(state.get('actual_offset', 0), state.get('actual_check'))
+        self.stats = {(p, v, int(lead)): RunningStats(count, mean, m2) for p, v, lead, count, mean, m2 in state.get('stats', [])}
+        for provider, rows in state.get('members', {}).items():
+            member = pd.DataFrame([values for _, _, values in rows], columns=self.variables, dtype=float,
+                                  index=pd.DatetimeIndex([pd.Timestamp(t) for t, _, _ in rows], name='valid_time'))
+            member['lead_hour'] = [int(lead_hour) for _, lead_hour, _ in rows]
+            self._remove_member(provider)
+            self._add_member(provider, member)
+        self.pending = {}
+        for valid_time, provider, lead_hour, values in state.get('pending', []):
+            self.pending.setdefault(pd.Timestamp(valid_time), {})[(provider, int(lead_hour))] = values
+
+
+class EnsembleForecast(Forecast):
+    '''
+    Консенсусный прогноз, сохраняемый как отдельный провайдер.
+    Данные берутся из EnsembleBuilder, сетевых запросов нет.
+    '''
+    def __init__(self, builder: EnsembleBuilder = None, **kwargs) -> None:
+        self._builder = builder
+        super().__init__('ensemble', **kwargs)
+
+    @property
+    def builder(self) -> EnsembleBuilder:
+        # построитель создается при первом использовании, чтобы не замедлять запуск сборщика
+        if self._builder is None:
+            self._builder = EnsembleBuilder()
+        return self._builder
+
+    def add(self, forecast: Forecast) -> None:
+        # добавление прогноза провайдера сразу после его получения
+        if forecast.data is not None:
+            self.builder.add(forecast.provider, forecast.data, forecast.issue_time)
+
+    def _get_data_from_source(self) -> pd.DataFrame:
+        self.builder.sync_actuals()
+        return self.builder.consensus()
+
+    def _extract_data_from_forecast(self, forecast_raw: pd.DataFrame) -> pd.DataFrame:
+        return forecast_raw if not forecast_raw.empty else None
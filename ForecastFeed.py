@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+
+import os, re
+import time
+import struct
+import socket
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+from typing import Iterator, List
+
+'''
+    Публикация прогнозов для внешних потребителей в виде двоичной ленты Arrow IPC (без чтения CSV).
+
+    Каждый новый прогноз провайдера сразу после разбора приводится к "длинной" таблице с постоянной схемой
+    feed_schema() (provider, location, issue_time, valid_time, lead_hour, числовые метеопараметры и текстовые поля)
+    и публикуется одним сообщением Arrow (record batch):
+
+    - в ленту-файл <directory>/<сегмент>.arrows - обычный поток Arrow IPC (схема, затем сообщения), только дозапись;
+      рядом индекс <сегмент>.idx с записями фиксированной длины (смещение, длина, время выпуска, строк),
+      запись индекса дописывается после сообщения, поэтому читатель видит только целые сообщения.
+      Читатели (FeedReader) отображают сегмент в память и получают сообщения без копирования данных;
+      новый сегмент начинается при запуске писателя, при смене даты и при превышении segment_size;
+    - в Unix сокет (необязательно): каждый подключившийся получает поток Arrow IPC (схема, затем новые сообщения),
+      читается стандартно - pyarrow.ipc.open_stream (см. subscribe). Медленные клиенты отключаются.
+
+    Писатель один (сборщик), читателей сколько угодно.
+    Требует pyarrow (необязательная зависимость): pip install pyarrow
+'''
+
+NUMERIC = ['temperature', 'wind_speed', 'pressure', 'humidity', 'cloudiness']
+TEXT = ['wind_direction', 'precipitation', 'conditions']
+
+_INDEX = struct.Struct('<QQqI')  # смещение, длина сообщения, время выпуска (unix, с), строк
+_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'  # признак конца потока Arrow IPC
+_segment_regex = re.compile(r'^\d{8}_\d{6}\.arrows$')
+
+
+def _pyarrow():
+    # pyarrow - необязательная зависимость, нужна только для ленты прогнозов
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("ForecastFeed requires the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+@lru_cache(maxsize=1)
+def feed_schema():
+    pa = _pyarrow()
+    return pa.schema([('provider', pa.string()), ('location', pa.string()),
+                      ('issue_time', pa.timestamp('s')), ('valid_time', pa.timestamp('s')), ('lead_hour', pa.int16())] +
+                     [(name, pa.float32()) for name in NUMERIC] + [(name, pa.string()) for name in TEXT])
+
+
+def to_batch(data: pd.DataFrame, provider: str, issue_time: datetime, location: str = None):
+    # прогноз (индекс - время, как в Forecast.data) -> record batch со схемой ленты
+    from ForecastArchive import forecast_frame, to_numeric_frame
+    pa = _pyarrow()
+    schema = feed_schema()
+
+    frame = to_numeric_frame(forecast_frame(data, provider, issue_time), NUMERIC)
+    frame['location'] = location
+    for name in NUMERIC:
+        frame[name] = frame[name].astype('float32') if name in frame else float('nan')
+    for name in TEXT:
+        frame[name] = frame[name].astype('string') if name in frame else None
+    frame['issue_time'] = frame['issue_time'].astype('datetime64[s]')
+    frame['valid_time'] = frame['valid_time'].astype('datetime64[s]')
+    frame['lead_hour'] = frame['lead_hour'].astype('int16')
+
+    # строки pandas хранятся в arrow по частям (ChunkedArray), сообщение ленты - одним блоком
+    table = pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False).combine_chunks()
+    batches = table.to_batches()
+    return batches[0] if batches else pa.RecordBatch.from_pylist([], schema=schema)
+
+
+class ForecastFeed:
+    '''
+    Писатель ленты прогнозов.
+
+    Параметры:
+        directory       - директория сегментов ленты
+        socket_path     - путь Unix сокета для потоковой рассылки (None - только файлы)
+        segment_size    - максимальный размер сегмента, байт
+        keep_days       - срок хранения сегментов, дней (None - не удалять)
+        send_timeout    - время ожидания отправки клиенту сокета, с (клиент, не успевающий читать, отключается)
+    '''
+    def __init__(self, directory: str = 'feed', socket_path: str = None, segment_size: int = 64 * 2**20,
+                 keep_days: int = 7, send_timeout: float = 0.1) -> None:
+        self.directory = directory
+        self.socket_path = socket_path
+        self.segment_size = segment_size
+        self.keep_days = keep_days
+        self.send_timeout = send_timeout
+
+        self.pa = _pyarrow()
+        self.schema = feed_schema()
+        self._header = self.schema.serialize().to_pybytes()
+
+        self._data = None       # файл текущего сегмента
+        self._index = None      # файл индекса текущего сегмента
+        self._segment_date = None
+
+        self._lock = threading.Lock()
+        self._clients: List[socket.socket] = []
+        self._server: socket.socket = None
+
+        os.makedirs(directory, exist_ok=True)
+        if socket_path:
+            self._listen()
+
+    def _open_segment(self) -> None:
+        self._close_segment()
+        now = datetime.now()
+        name = os.path.join(self.directory, now.strftime('%Y%m%d_%H%M%S'))
+        while os.path.exists(name + '.arrows'):  # перезапуск в ту же секунду
+            time.sleep(1)
+            now = datetime.now()
+            name = os.path.join(self.directory, now.strftime('%Y%m%d_%H%M%S'))
+
+        # индекс создается вместе с сегментом: читатель не видит сегмент без индекса
+        self._index = open(name + '.idx', 'ab')
+        self._data = open(name + '.arrows', 'ab')
+        self._data.write(self._header)
+        self._data.flush()
+        self._segment_date = now.date()
+        self._remove_old()
+
+    def _close_segment(self) -> None:
+        if self._data is not None:
+            self._data.write(_EOS)
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def _remove_old(self) -> None:
+        if not self.keep_days:
+            return
+        limit = time.time() - self.keep_days * 86400
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if _segment_regex.match(name) and os.path.getmtime(path) < limit:
+                os.remove(path)
+                if os.path.exists(path[:-7] + '.idx'):
+                    os.remove(path[:-7] + '.idx')
+
+    def publish(self, forecast) -> int:
+        # публикация прогноза провайдера (Forecast после get_data); возвращает количество строк
+        if forecast.data is None:
+            return 0
+        return self.publish_batch(to_batch(forecast.data, forecast.provider, forecast.issue_time, forecast.location))
+
+    def publish_batch(self, batch) -> int:
+        message = batch.serialize()
+        issue_time = int(batch.column('issue_time')[0].value) if batch.num_rows else 0
+
+        with self._lock:
+            if self._data is None or self._segment_date != datetime.now().date() or \
+               self._data.tell() + message.size > self.segment_size:
+                self._open_segment()
+
+            offset = self._data.tell()
+            self._data.write(message)
+            self._data.flush()
+            self._index.write(_INDEX.pack(offset, message.size, issue_time, batch.num_rows))
+            self._index.flush()
+
+            self._broadcast(message)
+        return batch.num_rows
+
+    def _listen(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen()
+        threading.Thread(target=self._accept, daemon=True, name='feed-socket').start()
+
+    def _accept(self) -> None:
+        while self._server is not None:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                break
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                try:
+                    client.sendall(self._header)
+                except OSError:
+                    client.close()
+                    continue
+                self._clients.append(client)
+
+    def _broadcast(self, message) -> None:
+        # вызывается под self._lock
+        dropped = 0
+        for client in list(self._clients):
+            try:
+                client.sendall(message)
+            except OSError:
+                self._clients.remove(client)
+                client.close()
+                dropped += 1
+        if dropped:
+            print(f"Feed: {dropped} socket client(s) disconnected or too slow, dropped ({len(self._clients)} left)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        if self._server is not None:
+            server, self._server = self._server, None
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class FeedReader:
+    '''
+    Читатель ленты прогнозов: новые сообщения из сегментов, отображенных в память (без копирования данных).
+
+    Параметры:
+        directory   - директория сегментов ленты
+        from_start  - читать ленту с начала (False - только сообщения, опубликованные после создания читателя)
+    '''
+    def __init__(self, directory: str = 'feed', from_start: bool = False) -> None:
+        self.directory = directory
+        self.pa = _pyarrow()
+
+        self._segment: str = None   # текущий сегмент (имя без расширения)
+        self._position = 0          # прочитанная часть индекса текущего сегмента, байт
+        self._buffer = None         # отображение сегмента в память
+        self._schema = None
+
+        if not from_start:
+            segments = self._segments()
+            if segments:
+                self._open(segments[-1])
+                self._position = os.path.getsize(self._segment + '.idx')
+
+    def _open(self, segment: str) -> None:
+        self._segment, self._position, self._buffer, self._schema = segment, 0, None, None
+
+    def _segments(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name[:-7]) for name in sorted(os.listdir(self.directory))
+                if _segment_regex.match(name)]
+
+    def _read_segment(self) -> list:
+        # новые сообщения текущего сегмента
+        try:
+            with open(self._segment + '.idx', 'rb') as f:
+                f.seek(self._position)
+                records = f.read()
+        except FileNotFoundError:
+            return []
+        records = records[:len(records) - len(records) % _INDEX.size]
+        if not records:
+            return []
+
+        entries = [_INDEX.unpack_from(records, i) for i in range(0, len(records), _INDEX.size)]
+        end = entries[-1][0] + entries[-1][1]
+        if self._buffer is None or self._buffer.size < end:
+            # сегмент вырос - отображается заново (ранее прочитанные сообщения ссылаются на прежнее отображение)
+            self._buffer = self.pa.memory_map(self._segment + '.arrows').read_buffer()
+            if self._schema is None:
+                self._schema = self.pa.ipc.read_schema(self._buffer)
+        self._position += len(records)
+        return [self.pa.ipc.read_record_batch(self._buffer.slice(offset, length), self._schema)
+                for offset, length, _, _ in entries]
+
+    def poll(self) -> list:
+        # новые сообщения (record batch) всех сегментов с момента предыдущего вызова
+        batches = []
+        segments = self._segments()
+        if self._segment is None and segments:
+            self._open(segments[0])
+
+        while self._segment is not None:
+            batches.extend(self._read_segment())
+            later = [s for s in segments if s > self._segment]
+            if not later:
+                break
+            # писатель перешел к следующему сегменту до получения списка, текущий сегмент дочитан
+            self._open(later[0])
+        return batches
+
+    def follow(self, interval: float = 0.01) -> Iterator:
+        # бесконечная последовательность новых сообщений (опрос индекса раз в interval секунд)
+        while True:
+            batches = self.poll()
+            yield from batches
+            if not batches:
+                time.sleep(interval)
+
+    def read_all(self) -> pd.DataFrame:
+        # все новые сообщения одной таблицей pandas
+        batches = self.poll()
+        if not batches:
+            return feed_schema().empty_table().to_pandas()
+        return self.pa.Table.from_batches(batches).to_pandas()
+
+
+def subscribe(socket_path: str) -> Iterator:
+    # сообщения ленты из Unix сокета писателя по мере публикации
+    pa = _pyarrow()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socket_path)
+    with client, client.makefile('rb') as stream:
+        reader = pa.ipc.open_stream(stream)
+        while True:
+            try:
+                yield reader.read_next_batch()
+            except StopIteration:
+                return
+
+
+if __name__ == '__main__':
+    # просмотр ленты: python ForecastFeed.py [directory] [--from-start]
+    import sys
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    reader = FeedReader(args[0] if args else 'feed', from_start='--from-start' in sys.argv)
+    for batch in reader.follow():
+        first = batch.slice(0, 1).to_pylist()[0] if batch.num_rows else {}
+        print(f"{datetime.now():%H:%M:%S.%f} {first.get('provider')} {first.get('location')} "
+              f"issued {first.get('issue_time')}: {batch.num_rows} rows")
@@ -0,0 +1,224 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from functools import lru_cache
+from contextlib import contextmanager
+import threading
+import json
+import time
+from datetime import datetime
+
+from typing import Callable, Dict, Tuple
+
+from ForecastArchive import ForecastArchive
+
+'''
+    Локальный HTTP/JSON сервис запросов к архиву прогнозов и фактических данных.
+
+    Запросы:
+        GET /providers                              - список провайдеров и время их последнего выпуска
+        GET /latest?provider=rp5                    - последний прогноз провайдера (без provider - всех провайдеров)
+        GET /valid?time=2023-05-20T15:00            - прогнозы всех провайдеров на заданное время
+        GET /errors?variable=temperature&provider=  - статистика ошибок по заблаговременности прогноза
+        GET /ranking?variable=temperature&lead=6&period=2023-05&metric=mae
+                                                    - провайдеры по возрастанию ошибки на заданной заблаговременности
+                                                      (period: месяц, 'all', по умолчанию - текущий месяц), если архив
+                                                      открыт с индексом ошибок (ErrorIndex.py)
+        GET /aggregates?resolution=day&provider=&variable=
+                                                    - агрегаты фактических данных (min/max/mean по часам, суткам, месяцам),
+                                                      если архив открыт со снимком агрегатов
+        GET /reload                                 - принудительное дочитывание архива
+
+    Индексы архива строятся один раз при загрузке (см. ForecastArchive), готовые JSON ответы
+    хранятся в LRU кэше и сбрасываются только при изменении архива. Запросы выполняются одновременно
+    (ThreadingHTTPServer), монопольно - только дочитывание архива. Значения по умолчанию, зависящие
+    от текущего времени (период /ranking), подставляются в запрос до обращения к кэшу.
+
+    Запуск: python ForecastQueryService.py [port]
+'''
+
+
+class NotFound(Exception):
+    # неизвестный путь запроса (404); KeyError внутри обработчика - ошибка сервиса (500)
+    pass
+
+
+class ReadWriteLock:
+    '''
+    Блокировка "много читателей - один писатель": запросы к архиву выполняются одновременно,
+    дочитывание архива - без одновременных запросов. Ожидающий писатель не пропускает новых читателей.
+    '''
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def _to_json(data) -> bytes:
+    if hasattr(data, 'to_json'):
+        return data.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+
+
+class ForecastQueryService:
+    '''
+    Сервис запросов к архиву.
+
+    Параметры:
+        archive             - архив прогнозов (ForecastArchive)
+        cache_size          - размер LRU кэша ответов
+        refresh_interval    - период проверки архива на новые файлы, с (None - только по запросу /reload)
+    '''
+    def __init__(self, archive: ForecastArchive, cache_size: int = 1024, refresh_interval: float = 60) -> None:
+        self.archive = archive
+        self.refresh_interval = refresh_interval
+
+        self._lock = ReadWriteLock()
+        self._version = 0  # версия архива - часть ключа кэша: ответ, вычисленный до дочитывания, не попадает в новый кэш
+        self._routes: Dict[str, Callable] = {
+            '/providers': self._providers,
+            '/latest': self._latest,
+            '/valid': self._valid,
+            '/errors': self._errors,
+            '/ranking': self._ranking,
+            '/aggregates': self._aggregates,
+        }
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+
+    def request(self, path: str, params: Tuple[tuple, ...]) -> bytes:
+        # ответ на запрос; текущий месяц /ranking входит в ключ кэша (после смены месяца - новый ответ)
+        if path == '/ranking' and not dict(params).get('period'):
+            params = tuple(sorted(dict(params, period=datetime.now().strftime('%Y-%m')).items()))
+        if path not in self._routes:
+            raise NotFound(path)
+        return self.query(path, params, self._version)
+
+    def _query(self, path: str, params: Tuple[tuple, ...], version: int = None) -> bytes:
+        # params - отсортированный кортеж пар (ключ, значение), чтобы ответ можно было кэшировать
+        route = self._routes.get(path)
+        if route is None:
+            raise NotFound(path)
+        with self._lock.reading():
+            return _to_json(route(**dict(params)))
+
+    def refresh(self) -> bool:
+        # дочитывание архива; при изменениях кэш ответов сбрасывается
+        with self._lock.writing():
+            changed = self.archive.refresh()
+            if changed:
+                self._version += 1
+        if changed:
+            self.query.cache_clear()
+        return changed
+
+    def _providers(self) -> dict:
+        return {provider: str(issue_time) for provider, issue_time in self.archive.latest.items()}
+
+    def _latest(self, provider: str = None):
+        if provider is not None:
+            return self.archive.latest_forecast(provider)
+        return {p: json.loads(_to_json(self.archive.latest_forecast(p))) for p in self.archive.latest}
+
+    def _valid(self, time: str, latest_only: str = '1'):
+        return self.archive.forecasts_for(time, latest_only=latest_only not in ('0', 'false'))
+
+    def _errors(self, variable: str = 'temperature', provider: str = None):
+        return self.archive.error_stats(variable, provider)
+
+    def _ranking(self, variable: str = 'temperature', lead: str = '6', period: str = None, metric: str = 'mae',
+                 min_count: str = '1'):
+        if self.archive.error_index is None:
+            return []
+        if metric not in ('mae', 'rmse', 'bias'):
+            raise ValueError(f'unknown metric: {metric}')
+        ranking = self.archive.error_index.ranking(variable, int(lead), period, metric, int(min_count))
+        return [{'provider': provider, metric: error, 'count': count} for provider, error, count in ranking]
+
+    def _aggregates(self, resolution: str = 'day', provider: str = None, variable: str = None):
+        if self.archive.aggregates is None:
+            return []
+        if resolution not in self.archive.aggregates.resolutions:
+            raise ValueError(f'unknown resolution: {resolution}')
+        return self.archive.aggregates.frame(resolution, provider, variable)
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Failed to refresh archive: {e}")
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8080) -> None:
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = tuple(sorted((k, v[-1]) for k, v in parse_qs(url.query).items()))
+
+                try:
+                    if url.path == '/reload':
+                        body, status = _to_json({'changed': service.refresh()}), 200
+                    else:
+                        body, status = service.request(url.path, params), 200
+                except NotFound as e:
+                    body, status = _to_json({'error': f'not found: {e}'}), 404
+                except (TypeError, ValueError) as e:
+                    body, status = _to_json({'error': str(e)}), 400
+                except Exception as e:
+                    # ошибка обработчика не обрывает соединение без ответа
+                    print(f"Query {self.path} failed: {type(e).__name__}: {e}")
+                    body, status = _to_json({'error': f'internal error: {type(e).__name__}'}), 500
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        if self.refresh_interval:
+            threading.Thread(target=self._watch, daemon=True).start()
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        print(f"Query service is listening on http://{host}:{port}")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    ForecastQueryService(ForecastArchive(aggregates_file='aggregates/actual.npz', error_index_file='ensemble/error_index.json')).serve(port=port)
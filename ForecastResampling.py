@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import re
+from datetime import datetime
+
+from typing import Dict
+
+from ForecastArchive import forecast_frame, to_numeric_frame
+
+'''
+    Приведение прогнозов всех провайдеров к общей временной сетке (по умолчанию - ежечасной в UTC).
+
+    Провайдеры дают прогноз с разным шагом (yandex и ru-meteo - каждый час, rp5 - через 3 часа,
+    goodmeteo - своя сетка), поэтому для сравнения каждый выпуск (provider, issue_time) интерполируется
+    на узлы сетки по правилам метеопараметров (RULES):
+        linear      - линейная интерполяция (температура, давление, влажность, ...)
+        circular    - направление ветра: линейная интерполяция синуса и косинуса угла, угол в градусах (0 - северный)
+        sum         - осадки: значение строки - сумма за интервал от предыдущей строки; накопленная сумма
+                      интерполируется линейно, значение узла - прирост за шаг сетки, первого узла выпуска - сумма
+                      с начала интервала первой строки (сумма за выпуск сохраняется, если последняя строка - узел сетки)
+        previous    - текстовые поля: значение ближайшей предыдущей строки
+    Узлы берутся только внутри интервала прогноза выпуска, пропуски длиннее max_gap не заполняются.
+
+    Весь архив обрабатывается векторно: выпуски нумеруются одним проходом groupby, строки всех выпусков
+    упорядочиваются по ключу (номер выпуска, время), и соседние строки для всех узлов сетки находятся
+    одним np.searchsorted - без циклов по выпускам.
+
+    Пример:
+        archive = ForecastArchive('.')
+        hourly = resample(archive.forecasts)                   # все выпуски на ежечасной сетке UTC
+        hourly = resample_forecast(forecast.data, 'rp5', forecast.issue_time)
+'''
+
+RULES = {
+    'temperature': 'linear',
+    'pressure': 'linear',
+    'humidity': 'linear',
+    'cloudiness': 'linear',
+    'wind_speed': 'linear',
+    'wind_direction': 'circular',
+    'precipitation': 'sum',
+    'conditions': 'previous',
+}
+
+TIMEZONE = 'Asia/Yekaterinburg'  # время на страницах источников - местное
+
+# 16 румбов: буквы направления -> градусы (0 - северный, по часовой стрелке)
+_POINTS = ['с', 'ссв', 'св', 'всв', 'в', 'всю', 'юв', 'ююв', 'ю', 'ююз', 'юз', 'зюз', 'з', 'зсз', 'сз', 'ссз']
+COMPASS = {point: i * 22.5 for i, point in enumerate(_POINTS)}
+COMPASS['вюв'] = COMPASS['всю']  # восток-юго-восток в обоих вариантах записи
+_WORDS = [('северо', 'с'), ('северн', 'с'), ('север', 'с'), ('юго', 'ю'), ('южн', 'ю'), ('юг', 'ю'),
+          ('западн', 'з'), ('запад', 'з'), ('восточн', 'в'), ('восток', 'в')]
+_NUMBER = re.compile(r'(\d+(?:[.,]\d+)?)')
+
+
+def _direction(text) -> float:
+    # 'СЗ', 'С-З', 'Северо-Запад', 'северо-западный' -> 315.0; штиль и нераспознанное - NaN
+    if not isinstance(text, str):
+        return float(text) if isinstance(text, (int, float)) else np.nan
+    text = text.lower()
+    for word, letter in _WORDS:
+        text = text.replace(word, letter)
+    return COMPASS.get(re.sub('[^свюз]', '', text.replace('ый', '')), np.nan)
+
+
+def wind_degrees(values: pd.Series) -> pd.Series:
+    # направление ветра в градусах; текстовые значения распознаются один раз для каждого уникального значения
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    unique = pd.unique(values.dropna())
+    return values.map({value: _direction(value) for value in unique}).astype(float)
+
+
+def precipitation_amount(frame: pd.DataFrame) -> pd.Series:
+    # количество осадков, мм: число из precipitation, иначе из precipitation_info ('(0.3 мм)'); 'Без осадков' - 0
+    amount = pd.Series(np.nan, index=frame.index)
+    for column in ('precipitation', 'precipitation_info'):
+        if column in frame:
+            text = frame[column].astype('string')
+            number = pd.to_numeric(text.str.extract(_NUMBER, expand=False).str.replace(',', '.'), errors='coerce')
+            amount = amount.fillna(number.astype(float))
+            amount = amount.mask(amount.isna() & text.str.lower().str.contains('без осадков', na=False), 0.0)
+    return amount
+
+
+def _to_seconds(times: pd.Series, tz: str) -> np.ndarray:
+    # время -> секунды unix; наивное время считается местным временем tz и переводится в UTC (tz=None - как есть)
+    times = pd.to_datetime(pd.Series(times))
+    if tz is not None:
+        if times.dt.tz is None:
+            times = times.dt.tz_localize(tz, ambiguous='NaT', nonexistent='shift_forward')
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _neighbours(keys: np.ndarray, groups: np.ndarray, targets: np.ndarray, target_groups: np.ndarray) -> tuple:
+    # соседние строки узлов сетки внутри своего выпуска: (левая, правая, есть левая, есть правая)
+    right = np.searchsorted(keys, targets, side='left')
+    left = right - 1
+    last = len(keys) - 1
+    left_c, right_c = np.clip(left, 0, last), np.clip(right, 0, last)
+    has_left = (left >= 0) & (groups[left_c] == target_groups)
+    has_right = (right <= last) & (groups[right_c] == target_groups)
+    return left_c, right_c, has_left, has_right
+
+
+def _interpolate(keys, groups, values, targets, target_groups, max_gap) -> np.ndarray:
+    # линейная интерполяция по строкам, где значение задано
+    ok = ~np.isnan(values)
+    keys, groups, values = keys[ok], groups[ok], values[ok]
+    result = np.full(len(targets), np.nan)
+    if not len(keys):
+        return result
+
+    left, right, has_left, has_right = _neighbours(keys, groups, targets, target_groups)
+    exact = has_right & (keys[right] == targets)
+    span = keys[right] - keys[left]
+    inner = has_left & has_right & ~exact & (span <= max_gap)
+
+    weight = np.where(inner, (targets - keys[left]) / np.where(span > 0, span, 1), 0.0)
+    result[inner] = (values[left] + weight * (values[right] - values[left]))[inner]
+    result[exact] = values[right][exact]
+    return result
+
+
+def _previous(keys, groups, values, targets, target_groups, max_gap) -> np.ndarray:
+    # значение ближайшей строки не позже узла
+    ok = pd.notna(values)
+    keys, groups, values = keys[ok], groups[ok], values[ok]
+    result = np.full(len(targets), None, dtype=object)
+    if not len(keys):
+        return result
+
+    right = np.searchsorted(keys, targets, side='right') - 1
+    index = np.clip(right, 0, len(keys) - 1)
+    found = (right >= 0) & (groups[index] == target_groups) & (targets - keys[index] <= max_gap)
+    result[found] = values[index][found]
+    return result
+
+
+def resample(forecasts: pd.DataFrame, freq: str = '1h', rules: Dict[str, str] = None, tz: str = TIMEZONE,
+             max_gap: str = '6h') -> pd.DataFrame:
+    '''
+    Прогнозы в "длинном" формате (provider, issue_time, valid_time, метеопараметры - как ForecastArchive.forecasts)
+    на общей сетке с шагом freq.
+
+    rules   - правила метеопараметров (по умолчанию RULES; параметры, которых нет в прогнозах, пропускаются)
+    tz      - часовой пояс времени прогнозов; результат - в UTC (None - время как есть, без перевода)
+    max_gap - наибольший интервал между строками прогноза, внутри которого выполняется интерполяция
+    '''
+    rules = {v: rule for v, rule in (rules or RULES).items()
+             if v in forecasts or (rule == 'sum' and 'precipitation_info' in forecasts)}
+    step, gap = int(pd.Timedelta(freq).total_seconds()), int(pd.Timedelta(max_gap).total_seconds())
+    columns = ['provider', 'issue_time', 'valid_time', 'lead_hour'] + list(rules)
+
+    data = forecasts[forecasts['valid_time'].notna()]
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+
+    # один проход groupby: номер выпуска каждой строки
+    groups = data.groupby(['provider', 'issue_time'], sort=True).ngroup().to_numpy()
+    times = _to_seconds(data['valid_time'], tz)
+    order = np.lexsort((times, groups))
+    groups, times = groups[order], times[order]
+    data = data.iloc[order]
+
+    # ключ сортировки (выпуск, время): строки всех выпусков - один возрастающий массив
+    base = times.min() - gap - step
+    span = times.max() - base + 1
+    keys = groups * span + (times - base)
+
+    # узлы сетки каждого выпуска: от первой до последней строки выпуска, кратные шагу
+    count = np.bincount(groups)
+    starts = np.cumsum(count) - count
+    first, last = times[starts[count > 0]], times[starts[count > 0] + count[count > 0] - 1]
+    issues = np.flatnonzero(count > 0)
+    grid_first = -(-first // step) * step
+    nodes = np.maximum((last - grid_first) // step + 1, 0)
+    target_groups = np.repeat(issues, nodes)
+    offsets = np.arange(nodes.sum()) - np.repeat(np.cumsum(nodes) - nodes, nodes)
+    target_times = np.repeat(grid_first, nodes) + offsets * step
+    targets = target_groups * span + (target_times - base)
+
+    result = {}
+    for variable, rule in rules.items():
+        if rule == 'linear':
+            values = to_numeric_frame(data[[variable]], [variable])[variable].to_numpy(float)
+            result[variable] = _interpolate(keys, groups, values, targets, target_groups, gap)
+
+        elif rule == 'circular':
+            radians = np.deg2rad(wind_degrees(data[variable]).to_numpy(float))
+            sin = _interpolate(keys, groups, np.sin(radians), targets, target_groups, gap)
+            cos = _interpolate(keys, groups, np.cos(radians), targets, target_groups, gap)
+            degrees = np.rad2deg(np.arctan2(sin, cos)) % 360
+            # противоположные направления в соседних строках - направление не определено
+            result[variable] = np.where(np.hypot(sin, cos) > 1e-6, degrees, np.nan)
+
+        elif rule == 'sum':
+            result[variable] = _accumulate(keys, groups, precipitation_amount(data).to_numpy(float),
+                                           targets, target_groups, step, gap)
+
+        elif rule == 'previous':
+            result[variable] = _previous(keys, groups, data[variable].to_numpy(object), targets, target_groups, gap)
+
+        else:
+            raise ValueError(f'Unknown resampling rule {rule} for {variable}')
+
+    # provider и issue_time выпуска каждого узла
+    issue = data.iloc[starts[target_groups]]
+    issue_times = _to_seconds(issue['issue_time'], tz)
+    valid_time = pd.to_datetime(target_times, unit='s')
+    issue_time = pd.to_datetime(issue_times, unit='s')
+    if tz is not None:
+        valid_time, issue_time = valid_time.tz_localize('UTC'), issue_time.tz_localize('UTC')
+
+    frame = pd.DataFrame({'provider': issue['provider'].to_numpy(), 'issue_time': issue_time, 'valid_time': valid_time,
+                          'lead_hour': np.round((target_times - issue_times) / 3600).astype(int), **result})
+    return frame[columns]
+
+
+def _accumulate(keys, groups, values, targets, target_groups, step, gap) -> np.ndarray:
+    # осадки за шаг сетки: прирост линейно интерполированной накопленной суммы, сумма выпуска сохраняется
+    ok = ~np.isnan(values)
+    keys, groups, values = keys[ok], groups[ok], values[ok]
+    if not len(keys):
+        return np.full(len(targets), np.nan)
+
+    # первая строка выпуска - сумма за интервал, равный следующему шагу выпуска (не длиннее gap)
+    first = np.r_[True, groups[1:] != groups[:-1]]
+    following = np.r_[np.diff(keys), 0]
+    following = np.where(first & np.r_[~first[1:], False], following, step)
+    origin = keys[first] - np.minimum(following[first], gap)
+
+    # накопленная сумма по выпуску с нулевой точкой перед первой строкой
+    totals = pd.Series(values).groupby(groups).cumsum().to_numpy()
+    keys = np.r_[keys, origin]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    groups = np.r_[groups, groups[first]][order]
+    totals = np.r_[totals, np.zeros(first.sum())][order]
+
+    end = _interpolate(keys, groups, totals, targets, target_groups, gap)
+    begin = _interpolate(keys, groups, totals, targets - step, target_groups, gap)
+    # первый узел выпуска - сумма от начала интервала первой строки: осадки до начала сетки не теряются
+    first_node = np.r_[True, target_groups[1:] != target_groups[:-1]] if len(targets) else np.zeros(0, bool)
+    begin[first_node] = 0.0
+    return end - begin
+
+
+def resample_forecast(data: pd.DataFrame, provider: str, issue_time: datetime, **kwargs) -> pd.DataFrame:
+    # один прогноз (Forecast.data) на общей сетке; параметры - как у resample
+    return resample(forecast_frame(data, provider, issue_time), **kwargs)
@@ -0,0 +1,31 @@
+import importlib
+
+'''
+    Отложенный импорт тяжелых модулей (pandas, bs4, requests).
+    Модуль импортируется при первом обращении к его атрибуту, а не при импорте скрипта,
+    поэтому создание провайдеров и запуск сборщиков не тратят время на неиспользуемые модули.
+
+    Пример:
+        pd = lazy_import('pandas')
+        pd.DataFrame()      # pandas импортируется здесь
+'''
+
+
+class LazyModule:
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        # вызывается только для атрибутов, которых нет у самого объекта
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
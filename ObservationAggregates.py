@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import os, json
+from io import BytesIO
+from datetime import datetime
+
+from typing import Dict, List
+
+from FileTail import FileTail
+from ForecastArchive import to_numeric_frame
+
+'''
+    Скользящие агрегаты фактических данных (actual_report.csv).
+
+    Для каждого провайдера и метеопараметра хранятся минимум, максимум, среднее и количество
+    наблюдений по часам, суткам и месяцам. Каждый ряд - кольцевой буфер фиксированного размера
+    (RESOLUTIONS), поэтому память не растет со временем: новый период занимает ячейку самого старого.
+
+    Сборщик фактических данных (WeatherParser.py) после каждой записи в actual_report.csv вызывает sync,
+    который дочитывает только новые строки файла. Агрегаты сохраняются снимком (aggregates/actual.npz)
+    вместе со смещением в файле, поэтому дашборды и проверка прогнозов читают готовые агрегаты,
+    а после перезапуска сборщика дочитываются только строки, записанные без него.
+
+    Пример чтения:
+        aggregates = ObservationAggregates.load('aggregates/actual.npz')
+        aggregates.frame('day', variable='temperature')
+'''
+
+# разрешение -> количество хранимых периодов
+RESOLUTIONS = {'hour': 24 * 90, 'day': 366 * 2, 'month': 12 * 10}
+
+VARIABLES = ['temperature', 'wind_speed', 'pressure', 'humidity']
+
+_UNITS = {'hour': 'h', 'day': 'D', 'month': 'M'}
+
+
+def period_numbers(times: pd.Series, resolution: str) -> np.ndarray:
+    # номер периода от начала эпохи: часы, сутки или месяцы
+    return times.to_numpy(dtype='datetime64[ns]').astype(f'datetime64[{_UNITS[resolution]}]').astype(np.int64)
+
+
+def period_start(numbers: np.ndarray, resolution: str) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(numbers.astype(f'datetime64[{_UNITS[resolution]}]').astype('datetime64[ns]'))
+
+
+class RingBuffer:
+    '''
+    Кольцевой буфер агрегатов одного ряда: период с номером n хранится в ячейке n % size.
+    Ячейка, занятая более старым периодом, очищается при поступлении нового.
+    '''
+    __slots__ = ('periods', 'count', 'total', 'min', 'max')
+
+    def __init__(self, size: int) -> None:
+        self.periods = np.full(size, -1, dtype=np.int64)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.total = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def update(self, periods: np.ndarray, values: np.ndarray) -> None:
+        # добавление наблюдений (периоды должны идти не раньше, чем уже вытесненные из буфера)
+        size = self.periods.shape[0]
+        slots = periods % size
+
+        # самый новый период каждой ячейки; ячейки, занятые более старыми периодами, очищаются
+        latest = self.periods.copy()
+        np.maximum.at(latest, slots, periods)
+        reset = np.flatnonzero(latest != self.periods)
+        if reset.size:
+            self.periods[reset] = latest[reset]
+            self.count[reset] = 0
+            self.total[reset] = 0.0
+            self.min[reset] = np.inf
+            self.max[reset] = -np.inf
+
+        # наблюдения старше хранимого окна не учитываются
+        current = self.periods[slots] == periods
+        slots, values = slots[current], values[current]
+
+        np.add.at(self.count, slots, 1)
+        np.add.at(self.total, slots, values)
+        np.minimum.at(self.min, slots, values)
+        np.maximum.at(self.max, slots, values)
+
+    def to_array(self) -> np.ndarray:
+        return np.vstack([self.periods, self.count, self.total, self.min, self.max])
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> RingBuffer:
+        buffer = cls(array.shape[1])
+        buffer.periods = array[0].astype(np.int64)
+        buffer.count = array[1].astype(np.int64)
+        buffer.total, buffer.min, buffer.max = array[2].copy(), array[3].copy(), array[4].copy()
+        return buffer
+
+
+class ObservationAggregates:
+    '''
+    Скользящие агрегаты фактических данных по провайдерам и метеопараметрам.
+
+    Параметры:
+        snapshot_file   - файл снимка агрегатов
+        variables       - агрегируемые метеопараметры
+        resolutions     - разрешения и количество хранимых периодов
+    '''
+    def __init__(self, snapshot_file: str = 'aggregates/actual.npz', variables: List[str] = None,
+                 resolutions: Dict[str, int] = None) -> None:
+        self.snapshot_file = snapshot_file
+        self.variables = variables or VARIABLES
+        self.resolutions = resolutions or RESOLUTIONS
+
+        self.buffers: Dict[tuple, RingBuffer] = {}  # (provider, variable, resolution) -> буфер
+        self._actual = FileTail()  # позиция чтения файла фактических данных
+
+    def _buffer(self, provider: str, variable: str, resolution: str) -> RingBuffer:
+        key = (provider, variable, resolution)
+        if key not in self.buffers:
+            self.buffers[key] = RingBuffer(self.resolutions[resolution])
+        return self.buffers[key]
+
+    def update(self, data: pd.DataFrame) -> int:
+        # добавление наблюдений (колонки time, provider и метеопараметры); возвращает количество строк
+        data = to_numeric_frame(data, self.variables)
+        data['time'] = pd.to_datetime(data['time'], errors='coerce')
+        data = data[data['time'].notna()]
+
+        for provider, rows in data.groupby('provider'):
+            periods = {resolution: period_numbers(rows['time'], resolution) for resolution in self.resolutions}
+            for variable in self.variables:
+                if variable not in rows:
+                    continue
+                values = rows[variable].to_numpy(dtype=float)
+                valid = ~np.isnan(values)
+                if not valid.any():
+                    continue
+                for resolution, numbers in periods.items():
+                    self._buffer(provider, variable, resolution).update(numbers[valid], values[valid])
+
+        return data.shape[0]
+
+    def sync(self, filename: str = 'actual_report.csv') -> int:
+        # чтение только новых строк файла фактических данных; возвращает количество учтенных строк
+        if not os.path.exists(filename):
+            return 0
+
+        # последняя строка может быть дописана не полностью - она будет прочитана в следующий раз;
+        # после отката строк файла (CycleJournal) чтение продолжается с границы строки (FileTail)
+        header, chunk = self._actual.read(filename)
+        if not chunk:
+            return 0
+
+        return self.update(pd.read_csv(BytesIO(header + chunk)))
+
+    def frame(self, resolution: str = 'day', provider: str = None, variable: str = None) -> pd.DataFrame:
+        # агрегаты в виде таблицы: provider, variable, period, count, mean, min, max
+        frames = []
+        for (p, v, r), buffer in self.buffers.items():
+            if r != resolution or (provider and p != provider) or (variable and v != variable):
+                continue
+            used = buffer.count > 0
+            frames.append(pd.DataFrame({'provider': p, 'variable': v,
+                                        'period': period_start(buffer.periods[used], resolution),
+                                        'count': buffer.count[used],
+                                        'mean': buffer.total[used] / buffer.count[used],
+                                        'min': buffer.min[used], 'max': buffer.max[used]}))
+
+        if not frames:
+            return pd.DataFrame(columns=['provider', 'variable', 'period', 'count', 'mean', 'min', 'max'])
+        return pd.concat(frames, ignore_index=True).sort_values(['provider', 'variable', 'period'], ignore_index=True)
+
+    def save(self, snapshot_file: str = None) -> None:
+        # сохранение снимка (запись во временный файл и замена, чтобы читатели не видели недописанный снимок)
+        snapshot_file = snapshot_file or self.snapshot_file
+        directory = os.path.dirname(snapshot_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        keys = list(self.buffers)
+        meta = {'actual_offset': self._actual.offset, 'actual_check': self._actual.check, 'variables': self.variables,
+                'resolutions': self.resolutions, 'keys': keys, 'saved': datetime.now().isoformat(timespec='seconds')}
+        arrays = {f'b{i}': self.buffers[key].to_array() for i, key in enumerate(keys)}
+
+        tmp = snapshot_file + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, snapshot_file)
+
+    @classmethod
+    def load(cls, snapshot_file: str = 'aggregates/actual.npz') -> ObservationAggregates:
+        # агрегаты из снимка; если снимка нет - пустые
+        if not os.path.exists(snapshot_file):
+            return cls(snapshot_file)
+
+        with np.load(snapshot_file) as snapshot:
+            meta = json.loads(str(snapshot['meta']))
+            aggregates = cls(snapshot_file, meta['variables'], meta['resolutions'])
+            aggregates._actual = FileTail(meta['actual_offset'], meta.get('actual_check'))
+            aggregates.buffers = {tuple(key): RingBuffer.from_array(snapshot[f'b{i}']) for i, key in enumerate(meta['keys'])}
+        return aggregates
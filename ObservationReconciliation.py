@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+import os
+import warnings
+
+from typing import List
+
+from ForecastArchive import to_numeric_frame
+
+'''
+    Согласование фактических данных разных провайдеров (goodmeteo, rumeteo, yandex).
+
+    Провайдеры сообщают "одну и ту же" текущую погоду, но значения расходятся, а сборщик сохраняет их
+    строками, как они найдены на странице ('+5', '3,5'). Согласование:
+        1. нормализация: строки приводятся к числам, значения вне физически возможного диапазона отбрасываются;
+        2. выравнивание: наблюдения округляются до общего такта (по умолчанию час), от провайдера в такте
+           берется последнее наблюдение;
+        3. выбросы: отклонение от медианы провайдеров больше k робастных СКО (1.4826 * MAD, но не меньше
+           min_scale метеопараметра, т.к. при двух-трех провайдерах MAD часто равно нулю);
+        4. оценка: среднее значений провайдеров без выбросов.
+
+    Все вычисления векторизованы по тактам (массив такт x метеопараметр x провайдер), поэтому один и тот же
+    код считает и один такт в сборщике, и многолетнюю историю за один проход:
+        python ObservationReconciliation.py actual_report.csv actual_reconciled.csv
+'''
+
+VARIABLES = ['temperature', 'wind_speed', 'pressure', 'humidity']
+
+# физически возможные значения (давление - мм рт. ст., ветер - м/с, влажность - %)
+VALID_RANGES = {
+    'temperature': (-60, 50),
+    'wind_speed': (0, 60),
+    'pressure': (650, 820),
+    'humidity': (0, 100),
+}
+
+# минимальный масштаб расхождения провайдеров, ниже которого отклонение не считается выбросом
+MIN_SCALE = {
+    'temperature': 1.5,
+    'wind_speed': 1.5,
+    'pressure': 2.0,
+    'humidity': 8.0,
+}
+
+
+def normalize(data: pd.DataFrame, variables: List[str] = VARIABLES, tick: str = 'h') -> pd.DataFrame:
+    # числовые значения в допустимых диапазонах, время округлено до такта
+    data = to_numeric_frame(data, variables)
+    data['time'] = pd.to_datetime(data['time'], errors='coerce')
+    data = data[data['time'].notna()].copy()
+    data['tick'] = data['time'].dt.floor(tick)
+
+    for variable in variables:
+        if variable not in data:
+            data[variable] = np.nan  # состав колонок результата не зависит от ответивших провайдеров
+        elif variable in VALID_RANGES:
+            low, high = VALID_RANGES[variable]
+            data[variable] = data[variable].where(data[variable].between(low, high))
+
+    return data
+
+
+def align(data: pd.DataFrame, variables: List[str] = VARIABLES) -> tuple:
+    # массив значений такт x метеопараметр x провайдер (последнее наблюдение провайдера в такте)
+    last = data.sort_values('time').groupby(['tick', 'provider'])[variables].last()
+
+    ticks = last.index.get_level_values('tick').unique().sort_values()
+    providers = sorted(last.index.get_level_values('provider').unique())
+    full = pd.MultiIndex.from_product([ticks, providers], names=['tick', 'provider'])
+
+    values = last.reindex(full).to_numpy(dtype=float)
+    values = values.reshape(len(ticks), len(providers), len(variables)).transpose(0, 2, 1)
+    return values, ticks, providers, variables
+
+
+def robust_outliers(values: np.ndarray, min_scale: np.ndarray, k: float = 3.0) -> tuple:
+    # медиана провайдеров, робастный масштаб и маска выбросов для массива (..., провайдер)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)  # такты без данных
+        median = np.nanmedian(values, axis=-1, keepdims=True)
+        mad = np.nanmedian(np.abs(values - median), axis=-1, keepdims=True)
+
+    scale = np.maximum(1.4826 * mad, min_scale)
+    deviation = np.abs(values - median)
+    outliers = deviation > k * scale
+    return median[..., 0], scale[..., 0], outliers
+
+
+def reconcile(data: pd.DataFrame, variables: List[str] = VARIABLES, tick: str = 'h', k: float = 3.0) -> tuple:
+    '''
+    Согласование наблюдений.
+
+    Параметры:
+        data        - наблюдения провайдеров (колонки time, provider и метеопараметры, как в actual_report.csv)
+        variables   - согласуемые метеопараметры
+        tick        - такт выравнивания (частота pandas)
+        k           - порог выброса в робастных СКО
+
+    Возвращает (estimate, outliers):
+        estimate    - по тактам: оценка каждого метеопараметра, количество согласных провайдеров (<variable>_n)
+                      и медиана провайдеров (<variable>_median)
+        outliers    - выбросы: tick, provider, variable, value, median, deviation (в робастных СКО)
+    '''
+    data = normalize(data, variables, tick)
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame(columns=['tick', 'provider', 'variable', 'value', 'median', 'deviation'])
+
+    values, ticks, providers, variables = align(data, variables)
+    min_scale = np.array([MIN_SCALE.get(v, 0.0) for v in variables])[None, :, None]
+    median, scale, outliers = robust_outliers(values, min_scale, k)
+
+    accepted = np.where(outliers, np.nan, values)
+    count = np.sum(~np.isnan(accepted), axis=-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        estimate = np.nanmean(accepted, axis=-1)
+
+    result = pd.DataFrame(estimate, index=ticks, columns=variables)
+    for i, variable in enumerate(variables):
+        result[f'{variable}_n'] = count[:, i]
+        result[f'{variable}_median'] = median[:, i]
+    result.index.name = 'time'
+
+    t, v, p = np.nonzero(outliers)
+    flagged = pd.DataFrame({'tick': ticks[t], 'provider': np.array(providers)[p], 'variable': np.array(variables)[v],
+                            'value': values[t, v, p], 'median': median[t, v],
+                            'deviation': np.abs(values[t, v, p] - median[t, v]) / scale[t, v]})
+    return result, flagged
+
+
+def outlier_rates(outliers: pd.DataFrame, data: pd.DataFrame) -> pd.DataFrame:
+    # доля выбросов по провайдерам и метеопараметрам - для поиска систематически расходящегося провайдера
+    observed = normalize(data).melt(id_vars=['provider'], value_vars=[v for v in VARIABLES if v in data],
+                                    var_name='variable').dropna().groupby(['provider', 'variable']).size()
+    flagged = outliers.groupby(['provider', 'variable']).size().reindex(observed.index, fill_value=0)
+    return pd.DataFrame({'observations': observed, 'outliers': flagged, 'rate': flagged / observed}).reset_index()
+
+
+if __name__ == '__main__':
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'actual_report.csv'
+    target = sys.argv[2] if len(sys.argv) > 2 else 'actual_reconciled.csv'
+
+    data = pd.read_csv(source)
+    estimate, outliers = reconcile(data)
+    estimate.to_csv(target)
+    outliers.to_csv(os.path.splitext(target)[0] + '_outliers.csv', index=False)
+
+    print(f"{estimate.shape[0]} ticks reconciled, {outliers.shape[0]} outliers")
+    print(outlier_rates(outliers, data).to_string(index=False))
@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+bs4 = lazy_import('bs4')
+pd = lazy_import('pandas')
+
+import re
+from io import StringIO
+
+import copy
+from datetime import datetime, timedelta
+from calendar import monthrange
+
+from typing import Dict, List, Callable, Union, Optional
+
+from WeatherForecastParser import Forecast
+
+'''
+    Реестр провайдеров прогнозов с декларативным описанием извлечения данных.
+
+    Провайдер описывается спецификацией ProviderSpec: список страниц (Page),
+    способ получения сырых данных (Table - html таблица, Text - текст блока + регулярное выражение),
+    строки таблицы, которые нужно дополнительно разобрать (Row), и карта колонок итогового прогноза (Column).
+
+    Спецификация компилируется один раз (CompiledSpec): регулярные выражения предкомпилируются,
+    колонки превращаются в векторные функции над pandas.Series. Движок SpecForecast выполняет
+    скомпилированную спецификацию: каждая страница скачивается один раз, разбирается только
+    целевой фрагмент страницы (SoupStrainer + lxml), колонки извлекаются векторно (Series.str.extract).
+
+    Сторонние провайдеры подключаются через entry points группы ENTRY_POINT_GROUP:
+    объект entry point - ProviderSpec или функция, возвращающая ProviderSpec (или список спецификаций).
+    Сборщик прогнозов (WeatherForecastParser.collect_forecasts) и повторный разбор архива (Backfill.py)
+    опрашивают все зарегистрированные провайдеры: новый провайдер - это только спецификация.
+'''
+
+ENTRY_POINT_GROUP = 'weather_forecast_parser.providers'
+
+_converters: Dict[str, Callable] = {
+    'str': lambda s: s,
+    'float': lambda s: pd.to_numeric(s, errors='coerce').astype(float),
+    'int': lambda s: pd.to_numeric(s, errors='coerce').round().astype('Int64'),
+}
+
+
+class Page:
+    '''
+    Страница источника.
+        url         - адрес страницы
+        day_offset  - сдвиг в днях для временных меток прогноза на этой странице
+    '''
+    def __init__(self, url: str, day_offset: int = 0) -> None:
+        self.url = url
+        self.day_offset = day_offset
+
+
+class Column:
+    '''
+    Колонка итогового прогноза.
+        source      - имя колонки (поля) в сырых данных
+        pattern     - регулярное выражение для извлечения значения (None - значение берется как есть)
+        group       - номер группы в pattern (0 - совпадение целиком)
+        dtype       - тип значения: 'str', 'float', 'int' (None - без преобразования)
+        replace     - пара (old, new) для замены в извлеченной строке, например (',', '.')
+    '''
+    def __init__(self, source: str, pattern: str = None, group: int = 0, dtype: str = None, replace: tuple = None) -> None:
+        self.source = source
+        self.pattern = pattern
+        self.group = group
+        self.dtype = dtype
+        self.replace = replace
+
+    def compile(self) -> Callable:
+        # pattern оборачивается во внешнюю группу, чтобы group=0 соответствовал совпадению целиком
+        regex = re.compile(f'({self.pattern})') if self.pattern else None
+        convert = _converters[self.dtype] if self.dtype else None
+
+        def extract(frame: pd.DataFrame) -> pd.Series:
+            values = frame[self.source]
+
+            if regex is not None or self.replace or self.dtype == 'str':
+                values = values.astype('string')
+            if regex is not None:
+                values = values.str.extract(regex, expand=True)[self.group]
+            if self.replace:
+                values = values.str.replace(*self.replace, regex=False)
+
+            return convert(values) if convert else values
+
+        return extract
+
+
+class Row:
+    '''
+    Строка html таблицы, значения которой извлекаются из ячеек (например, всплывающие подсказки rp5).
+        match       - номер строки или подстрока в первой ячейке строки (без учета регистра)
+        fields      - карта {имя поля: номер группы pattern}
+        cell        - css селектор внутри ячейки (None - сама ячейка)
+        attr        - атрибут элемента (None - текст элемента)
+        pattern     - регулярное выражение для извлечения полей (None - значение целиком в единственное поле)
+        cells       - срез ячеек строки с данными
+    '''
+    def __init__(self, match: Union[int, str], fields: Dict[str, int], cell: str = None, attr: str = None,
+                 pattern: str = None, cells: slice = slice(1, -1)) -> None:
+        self.match = match
+        self.fields = fields
+        self.cell = cell
+        self.attr = attr
+        self.pattern = pattern
+        self.cells = cells
+
+
+class Table:
+    '''
+    Получение сырых данных из html таблиц страницы.
+        attrs           - атрибуты целевой таблицы (None - все таблицы страницы)
+        first_only      - использовать только первую найденную таблицу
+        index_col       - колонка с временными метками
+        columns         - новые имена колонок
+        drop_last_row   - удаление последней (итоговой) строки таблицы
+        transpose       - таблица хранит прогноз по колонкам (rp5)
+        index           - способ построения временного индекса (см. INDEX_BUILDERS)
+        rows            - дополнительные строки таблицы для разбора (Row)
+    '''
+    def __init__(self, attrs: dict = None, first_only: bool = False, index_col: int = 0, columns: List[str] = None,
+                 drop_last_row: bool = False, transpose: bool = False, index: str = 'datetime', rows: List[Row] = None) -> None:
+        self.attrs = attrs
+        self.first_only = first_only
+        self.index_col = index_col
+        self.columns = columns
+        self.drop_last_row = drop_last_row
+        self.transpose = transpose
+        self.index = index
+        self.rows = rows or []
+
+
+class Text:
+    '''
+    Получение сырых данных из текста html элемента.
+        tag, attrs      - целевой элемент (берется первый найденный)
+        pattern         - регулярное выражение, каждое совпадение - строка прогноза
+        fields          - имена групп pattern (поля сырых данных)
+        postprocess     - обработка списка совпадений до построения таблицы, postprocess(rows, now) (например, проверка времени)
+        index           - поле с временной меткой
+    '''
+    def __init__(self, tag: str, attrs: dict, pattern: str, fields: List[str],
+                 postprocess: Callable = None, index: str = 'time') -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.pattern = pattern
+        self.fields = fields
+        self.postprocess = postprocess
+        self.index = index
+
+
+class ProviderSpec:
+    '''
+    Декларативное описание провайдера прогноза.
+        name        - имя источника (имя директории для сохранения прогнозов)
+        pages       - список страниц (Page)
+        source      - способ получения сырых данных (Table или Text)
+        columns     - карта {имя колонки прогноза: Column}
+    '''
+    def __init__(self, name: str, pages: List[Page], source: Union[Table, Text], columns: Dict[str, Column]) -> None:
+        self.name = name
+        self.pages = pages
+        self.source = source
+        self.columns = columns
+
+
+def _index_datetime(frame: pd.DataFrame, page: Page, table_number: int, now: datetime) -> pd.DatetimeIndex:
+    # индекс уже содержит дату и время
+    return pd.DatetimeIndex(pd.to_datetime(frame.index)) + pd.Timedelta(days=page.day_offset)
+
+
+def _index_hour_of_day(frame: pd.DataFrame, page: Page, table_number: int, now: datetime) -> pd.DatetimeIndex:
+    # индекс содержит время 'HH:MM', каждая следующая таблица страницы - следующий день
+    hours = pd.Series(frame.index, dtype='string').str.extract(r'(\d{1,2}:\d{2})', expand=False)
+    today = pd.Timestamp(now.date())
+    return pd.DatetimeIndex(today + pd.to_timedelta(hours + ':00') + pd.Timedelta(days=page.day_offset + table_number))
+
+
+def _index_day_and_hour(frame: pd.DataFrame, page: Page, table_number: int, now: datetime) -> pd.DatetimeIndex:
+    # индекс содержит день месяца ('12 мая'), колонка 'Местное время' - час (rp5)
+    days_before_end = monthrange(now.year, now.month)[1] - now.day
+
+    days = pd.Series(frame.index, dtype='string').str.extract(r'(\d{1,2})\s\w+', expand=False).astype(int).to_numpy()
+    hours = pd.to_numeric(frame['Местное время']).to_numpy()
+    days_diff = [d - now.day if d >= now.day else d + days_before_end for d in days]
+
+    today = pd.Timestamp(now.date())
+    return pd.DatetimeIndex(today + pd.to_timedelta(days_diff, unit='D') + pd.to_timedelta(hours, unit='h')
+                            + pd.Timedelta(days=page.day_offset))
+
+
+INDEX_BUILDERS: Dict[str, Callable] = {
+    'datetime': _index_datetime,
+    'hour_of_day': _index_hour_of_day,
+    'day_and_hour': _index_day_and_hour,
+}
+
+
+def _trim_hour(forecast_row: tuple) -> tuple:
+    # обрезка часа до одной значащей цифры (граница времени распознана неправильно: '2322:00' -> '22:00')
+    row = list(forecast_row)
+    row[0] = row[0][-4:]
+    return tuple(row)
+
+
+def _hour_delta(current: tuple, previous: tuple) -> timedelta:
+    # разница во времени (формат '%H:%M') между двумя строками прогноза
+    return datetime.strptime(current[0], '%H:%M') - datetime.strptime(previous[0], '%H:%M')
+
+
+def check_time_sequence(forecast_list: list, date=None) -> list:
+    # проверка, что временные метки идут с шагом 1 час (переход через полночь - следующий день),
+    # и преобразование 'HH:MM' в дату и время; date - дата первой метки (по умолчанию - сегодня) (yandex)
+    allowed = (timedelta(hours=1), timedelta(days=-1, hours=1))
+    date = date or datetime.now().date()
+    forecast_list = list(forecast_list)
+    times = [datetime.strptime(forecast_list[0][0], '%H:%M').replace(date.year, date.month, date.day)]
+
+    for i in range(len(forecast_list) - 1):
+        try:
+            delta = _hour_delta(forecast_list[i+1], forecast_list[i])
+        except ValueError:
+            forecast_list[i+1] = _trim_hour(forecast_list[i+1])
+            delta = _hour_delta(forecast_list[i+1], forecast_list[i])
+
+        if delta not in allowed:
+            forecast_list[i+1] = _trim_hour(forecast_list[i+1])
+            delta = _hour_delta(forecast_list[i+1], forecast_list[i])
+            if delta not in allowed:
+                raise AttributeError(f"Wrong time sequence: {forecast_list[i][0]}, {forecast_list[i+1][0]}")
+
+        if delta == timedelta(days=-1, hours=1):
+            date += timedelta(days=1)
+        times.append(datetime.strptime(forecast_list[i+1][0], '%H:%M').replace(date.year, date.month, date.day))
+
+    return [(str(dt), *forecast[1:]) for forecast, dt in zip(forecast_list, times)]
+
+
+class CompiledSpec:
+    '''
+    Скомпилированная спецификация провайдера: предкомпилированные регулярные выражения и
+    векторные функции извлечения колонок. Создается один раз на провайдера.
+    '''
+    def __init__(self, spec: ProviderSpec) -> None:
+        self.spec = spec
+        self.name = spec.name
+        self.columns = {name: column.compile() for name, column in spec.columns.items()}
+
+        source = spec.source
+        if isinstance(source, Text):
+            self._raw = self._raw_from_text
+            self._regex = re.compile(source.pattern)
+            self._strainer_args = (source.tag, source.attrs)
+        else:
+            self._raw = self._raw_from_table
+            self._index = INDEX_BUILDERS[source.index]
+            self._strainer_args = ('table', source.attrs) if source.rows else None
+            self._rows = [(row, re.compile(row.pattern) if row.pattern else None) for row in source.rows]
+
+        self._strainer = None
+
+    def _get_strainer(self):
+        # bs4 импортируется только при первом разборе страницы, а не при компиляции спецификации
+        if self._strainer is None:
+            tag, attrs = self._strainer_args
+            self._strainer = bs4.SoupStrainer(tag, attrs=attrs)
+        return self._strainer
+
+    def raw(self, pages: List[tuple], field: Callable = None, now: datetime = None) -> pd.DataFrame:
+        # pages - список пар (Page, содержимое страницы), now - время получения страниц (опорное для временных меток)
+        # field(name, func, default) - изоляция ошибок извлечения отдельных полей (см. Forecast._field)
+        field = field or (lambda name, func, default=None: func())
+        now = now or datetime.now()
+        return pd.concat([self._raw(page, content, field, now) for page, content in pages])
+
+    def extract(self, forecast_raw: pd.DataFrame, field: Callable = None) -> pd.DataFrame:
+        field = field or (lambda name, func, default=None: func())
+        data = pd.DataFrame(index=forecast_raw.index)
+        for name, func in self.columns.items():
+            data[name] = field(name, lambda: func(forecast_raw))
+        data.index.name = 'time'
+        return data
+
+    def _raw_from_text(self, page: Page, content: bytes, field: Callable, now: datetime) -> pd.DataFrame:
+        source = self.spec.source
+        element = bs4.BeautifulSoup(content, 'lxml', parse_only=self._get_strainer()).find(source.tag, source.attrs)
+        forecast_raw = self._regex.findall(element.text)
+
+        if source.postprocess:
+            forecast_raw = source.postprocess(forecast_raw, now)
+
+        frame = pd.DataFrame(forecast_raw, columns=source.fields)
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop(source.index))) + pd.Timedelta(days=page.day_offset)
+        return frame
+
+    def _raw_from_table(self, page: Page, content: bytes, field: Callable, now: datetime) -> pd.DataFrame:
+        source = self.spec.source
+        html = content.decode('utf-8', errors='replace') if isinstance(content, bytes) else content
+        table_soup = None
+
+        if self._strainer_args is not None:
+            # разбирается только целевая таблица, она же используется и для pandas, и для строк Row
+            table_soup = bs4.BeautifulSoup(html, 'lxml', parse_only=self._get_strainer()).find('table', source.attrs)
+            html = str(table_soup)
+
+        tables = pd.read_html(StringIO(html), header=0, attrs=source.attrs)
+        if source.first_only:
+            tables = tables[:1]
+
+        frames = [self._prepare_table(table, page, i, now) for i, table in enumerate(tables)]
+        frame = pd.concat(frames)
+
+        for row, regex in self._rows:
+            row_values = field('/'.join(row.fields), lambda: self._extract_row(table_soup, row, regex, frame.shape[0]),
+                               default=dict.fromkeys(row.fields))
+            for name, values in row_values.items():
+                frame[name] = values.to_numpy() if values is not None else None
+
+        return frame
+
+    def _prepare_table(self, table: pd.DataFrame, page: Page, table_number: int, now: datetime) -> pd.DataFrame:
+        source = self.spec.source
+
+        if source.drop_last_row:
+            table = table.drop(table.shape[0]-1).dropna(how='all', axis=1)
+
+        if source.transpose:
+            table.index = table.iloc[:, source.index_col]
+            table = table.iloc[:, 1:-1].T
+        else:
+            table.index = table.iloc[:, source.index_col]
+            if source.columns:
+                table.columns = source.columns
+            else:
+                table = table.drop(columns=table.columns[source.index_col])
+
+        table.index = self._index(table, page, table_number, now)
+        table.index.name = 'time'
+        return table
+
+    @staticmethod
+    def _extract_row(table_soup, row: Row, regex, length: int) -> Dict[str, pd.Series]:
+        # length - количество строк прогноза: последние length значений строки таблицы сопоставляются им по порядку
+        rows = table_soup.find_all('tr')
+
+        if isinstance(row.match, int):
+            tr = rows[row.match]
+        else:
+            tr = next((r for r in rows if r.find('td') is not None and r.find('td').text.lower().find(row.match) != -1), None)
+            if tr is None:
+                raise ValueError(f"row '{row.match}' is not found in the table")
+
+        raw = []
+        for td in tr.find_all('td')[row.cells]:
+            element = td.select_one(row.cell) if row.cell else td
+            if element is None:
+                raw.append(None)
+            else:
+                raw.append(element.get(row.attr) if row.attr else element.text)
+
+        # строки таблицы могут быть длиннее прогноза (подписи, объединенные ячейки в начале строки),
+        # выравнивание по последним значениям
+        if len(raw) < length:
+            raise ValueError(f"row '{row.match}' has {len(raw)} values, the forecast has {length} rows")
+        values = pd.Series(raw[len(raw) - length:], dtype='string')
+
+        if regex is None:
+            name, = row.fields
+            return {name: values}
+
+        groups = values.str.extract(regex, expand=True)
+        return {name: groups[group-1] for name, group in row.fields.items()}
+
+
+class SpecForecast(Forecast):
+    '''
+    Прогноз, получаемый выполнением декларативной спецификации провайдера.
+    Страницы скачиваются по одному разу за цикл, целый html документ не разбирается.
+    '''
+    def __init__(self, spec: Union[ProviderSpec, CompiledSpec], **kwargs) -> None:
+        self.spec = spec if isinstance(spec, CompiledSpec) else CompiledSpec(spec)
+        self.pages: List[Page] = list(self.spec.spec.pages)  # страницы этого объекта (адреса меняет configure)
+        self._default_spec = self.spec  # спецификация без настроек конфигурации
+        super().__init__(self.spec.name, **kwargs)
+        self.URL = self.pages[0].url
+        self._set_region()
+
+    def _set_region(self) -> None:
+        # отпечаток структуры снимается с элемента, из которого спецификация берет данные
+        source = self.spec.spec.source
+        self.region = (source.tag, source.attrs) if isinstance(source, Text) else ('table', source.attrs)
+
+    def configure(self, settings: dict) -> None:
+        # url - адрес первой страницы, urls - адреса всех страниц (по порядку страниц спецификации),
+        # forecast_table - id целевой таблицы (спецификация перекомпилируется для этого объекта);
+        # страницы и спецификация каждый раз строятся от спецификации провайдера, поэтому настройка,
+        # удаленная из конфигурации, перестает действовать
+        super().configure(settings)
+        spec = self._default_spec
+        urls = settings.get('urls') or ([settings['url']] if settings.get('url') else [])
+        self.pages = [Page(url, page.day_offset) for url, page in zip(urls, spec.spec.pages)] + spec.spec.pages[len(urls):]
+        self.URL = self.pages[0].url
+
+        source = spec.spec.source
+        table = settings.get('forecast_table')
+        if table and isinstance(source, Table) and source.attrs and source.attrs.get('id') != table:
+            if self.spec.spec.source.attrs.get('id') != table:  # при каждом перечитывании не перекомпилируется
+                custom = copy.copy(spec.spec)
+                custom.source = copy.copy(source)
+                custom.source.attrs = {**source.attrs, 'id': table}
+                self.spec = CompiledSpec(custom)
+        else:
+            self.spec = spec
+        self._set_region()
+        if settings.get('region'):
+            tag, attrs = settings['region']
+            self.region = (tag, attrs)
+
+    def _get_soup(self):
+        # страницы только загружаются, полный html документ не разбирается (см. CompiledSpec)
+        for page in self.pages:
+            self._fetch(page.url)
+        return None
+
+    def _get_data_from_source(self) -> pd.DataFrame:
+        return self.spec.raw([(page, content) for page, (_, content) in zip(self.pages, self._pages)],
+                             field=self._field, now=self.issue_time)
+
+    def _extract_data_from_forecast(self, forecast_raw: pd.DataFrame) -> pd.DataFrame:
+        return self.spec.extract(forecast_raw, field=self._field)
+
+
+_registry: Dict[str, CompiledSpec] = {}
+_entry_points_loaded = False
+
+
+def register_provider(spec: ProviderSpec) -> ProviderSpec:
+    # регистрация (и компиляция) спецификации провайдера
+    _registry[spec.name] = CompiledSpec(spec)
+    return spec
+
+
+def load_entry_points() -> None:
+    # загрузка сторонних провайдеров, объявленных через entry points
+    global _entry_points_loaded
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+
+    for ep in group:
+        try:
+            obj = ep.load()
+            specs = obj() if callable(obj) and not isinstance(obj, ProviderSpec) else obj
+            for spec in (specs if isinstance(specs, (list, tuple)) else [specs]):
+                register_provider(spec)
+        except Exception as e:
+            print(f"Failed to load provider plugin {ep.name}: {e}")
+
+    _entry_points_loaded = True
+
+
+def available_providers() -> List[str]:
+    if not _entry_points_loaded:
+        load_entry_points()
+    return list(_registry)
+
+
+def get_provider(name: str, **kwargs) -> SpecForecast:
+    # создание прогноза по имени зарегистрированного провайдера
+    if not _entry_points_loaded:
+        load_entry_points()
+    if name not in _registry:
+        raise KeyError(f"Unknown provider: {name}. Available: {', '.join(_registry)}")
+    return SpecForecast(_registry[name], **kwargs)
+
+
+# --- Встроенные провайдеры ---
+
+YANDEX = ProviderSpec(
+    'yandex',
+    pages=[Page("https://yandex.ru/pogoda/?lat=56.813158&lon=60.643738")],
+    source=Text('ul', {'class': 'swiper-wrapper'},
+                pattern=r"(\d{1,2}:\d{2})((\+|\-)\d+)([^\,]*)",
+                fields=['time', 'temperature', 'sign', 'message'],
+                postprocess=lambda rows, now: check_time_sequence(rows, now.date())),
+    columns={
+        'temperature': Column('temperature', dtype='float'),
+        'conditions': Column('message', pattern=r'([час]\S*\s)(.*)', group=2),
+        'message_debug': Column('message', pattern=r'^.(.*)', group=1),
+    },
+)
+
+RUMETEO = ProviderSpec(
+    'rumeteo',
+    pages=[Page("https://ru-meteo.ru/ekaterinburg/hour")],
+    source=Table(drop_last_row=True, index='hour_of_day',
+                 columns=['column0', 'column1', 'Осадки', 'Ветер', 'Давление', 'Влажность']),
+    columns={
+        'temperature': Column('column0', pattern=r'(\+|\-)\d+\.?\d?'),
+        'conditions': Column('column1', dtype='str', replace=(',', '')),
+        'precipitation': Column('Осадки'),
+        'wind_speed': Column('Ветер', pattern=r'\d{1,2}', dtype='int'),
+        'wind_direction': Column('Ветер', pattern=r', (.*)', group=1),
+        'pressure': Column('Давление'),
+        'humidity': Column('Влажность', pattern=r'\d{2,3}', dtype='int'),
+    },
+)
+
+RP5 = ProviderSpec(
+    'rp5',
+    pages=[Page("https://rp5.ru/%D0%9F%D0%BE%D0%B3%D0%BE%D0%B4%D0%B0_%D0%B2_%D0%95%D0%BA%D0%B0%D1%82%D0%B5%D1%80%D0%B8%D0%BD%D0%B1%D1%83%D1%80%D0%B3%D0%B5")],
+    source=Table(attrs={'id': 'forecastTable_1_3'}, transpose=True, index='day_and_hour', rows=[
+        Row(2, {'conditions': 1, 'cloudiness': 2}, cell='div.cc_0 div', attr='onmouseover',
+            pattern=r"<b>(.+)</b><br/>\(([^')]+)"),
+        Row(3, {'precipitation': 1, 'precipitation_info': 2}, cell='div.pr_0', attr='onmouseover',
+            pattern=r", '((?:\w+\s?)+)(\(.+\))?"),
+        Row('влажность', {'humidity': 0}),
+    ]),
+    columns={
+        'temperature': Column('Температура, °C'),
+        'wind_speed': Column('Ветер: скорость, м/с'),
+        'wind_direction': Column('направление'),
+        'pressure': Column('Давление, мм рт. ст.'),
+        'conditions': Column('conditions'),
+        'cloudiness': Column('cloudiness'),
+        'precipitation': Column('precipitation'),
+        'precipitation_info': Column('precipitation_info'),
+        'humidity': Column('humidity'),
+    },
+)
+
+GOODMETEO = ProviderSpec(
+    'goodmeteo',
+    pages=[Page("https://goodmeteo.ru/pogoda-ekaterinburg/"),
+           Page("https://goodmeteo.ru/pogoda-ekaterinburg/zavtra/", day_offset=1)],
+    source=Table(first_only=True, index='hour_of_day'),
+    columns={
+        'temperature': Column('Температура', pattern=r'\-?\d{1,2}(,|.)\d', dtype='float', replace=(',', '.')),
+        'wind_direction': Column('Ветер', pattern=r', (.*)', group=1),
+        'wind_speed': Column('Ветер', pattern=r'\d{1,2}(,|.)?\d?', dtype='float', replace=(',', '.')),
+        'humidity': Column('Влажность', pattern=r'\d{1,2}', dtype='int'),
+        'pressure': Column('Давление', pattern=r'\d{3}', dtype='int'),
+        'cloudiness': Column('Облачность', pattern=r'\d{1,2}', dtype='int'),
+        'conditions': Column('Осадки'),
+    },
+)
+
+for _spec in (YANDEX, RUMETEO, RP5, GOODMETEO):
+    register_provider(_spec)
+
+
+if __name__ == '__main__':
+    for name in available_providers():
+        get_provider(name).get_and_save_data()
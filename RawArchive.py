@@ -0,0 +1,347 @@
+import os, json
+import gzip
+import hashlib
+import random
+import threading
+from datetime import datetime
+
+from typing import Dict, Iterator, List
+
+'''
+    Архив сырых страниц источников.
+
+    Содержимое страниц хранится в сжатом виде (gzip) и адресуется хэшем содержимого (sha256):
+        <root>/objects/ab/cdef...gz
+    Одинаковые страницы хранятся один раз. Каждый цикл получения прогноза записывается
+    строкой в индекс <root>/index.jsonl:
+        {"provider": "rp5", "issue_time": "2023-05-20T15:00:02", "pages": [[url, sha256], ...]}
+
+    По архиву можно заново разобрать историю после исправления парсера (см. Backfill.py).
+
+    SegmentArchive - архив с тем же интерфейсом, но компактнее: страницы сжимаются zstd со словарем,
+    обученным для каждого провайдера, и дописываются в сегментные файлы с индексом смещений.
+    open_archive открывает архив любого типа.
+'''
+
+
+class RawArchive:
+    '''
+    Параметры:
+        root            - корневая директория архива
+        compresslevel   - степень сжатия gzip
+    '''
+    def __init__(self, root: str = 'raw', compresslevel: int = 6) -> None:
+        self.root = root
+        self.compresslevel = compresslevel
+        self.index_file = os.path.join(root, 'index.jsonl')
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.root, 'objects', key[:2], key[2:] + '.gz')
+
+    def put(self, content: bytes) -> str:
+        # сохранение содержимого страницы, возвращает ключ (sha256)
+        key = hashlib.sha256(content).hexdigest()
+        path = self._object_path(key)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=self.compresslevel))
+            os.replace(tmp, path)
+
+        return key
+
+    def get(self, key: str) -> bytes:
+        with open(self._object_path(key), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def _sample(self, provider: str, pages: List[tuple]) -> None:
+        # равномерная выборка страниц провайдера для обучения словаря: в памяти не больше train_samples страниц
+        samples = self._samples.setdefault(provider, [])
+        for _, content in pages:
+            seen = self._seen[provider] = self._seen.get(provider, 0) + 1
+            if len(samples) < self.train_samples:
+                samples.append(content)
+            else:
+                slot = self._random.randrange(seen)
+                if slot < self.train_samples:
+                    samples[slot] = content
+
+    def record(self, provider: str, issue_time: datetime, pages: List[tuple], location: str = '') -> dict:
+        # сохранение страниц одного цикла получения прогноза
+        entry = {'provider': provider,
+                 'location': location,
+                 'issue_time': issue_time.isoformat(timespec='seconds'),
+                 'pages': [[url, self.put(content)] for url, content in pages]}
+
+        with self._lock, open(self.index_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        return entry
+
+    def records(self, providers: List[str] = None, since: datetime = None, until: datetime = None) -> Iterator[dict]:
+        # записи индекса с фильтром по провайдерам и времени получения
+        if not os.path.exists(self.index_file):
+            return
+
+        with open(self.index_file, encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # запись дописывается прямо сейчас
+                entry = json.loads(line)
+                issue_time = datetime.fromisoformat(entry['issue_time'])
+
+                if providers and entry['provider'] not in providers:
+                    continue
+                if (since and issue_time < since) or (until and issue_time >= until):
+                    continue
+                yield entry
+
+    def pages(self, entry: dict) -> List[tuple]:
+        # содержимое страниц записи индекса [(url, content)]
+        return [(url, self.get(key)) for url, key in entry['pages']]
+
+
+def _zstd():
+    # zstandard - необязательная зависимость, нужна только для SegmentArchive
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("SegmentArchive requires the zstandard package: pip install zstandard")
+    return zstandard
+
+
+class SegmentArchive:
+    '''
+    Архив сырых страниц в сегментных файлах, сжатых zstd со словарями, обученными отдельно для каждого провайдера.
+
+    Страницы одного провайдера почти одинаковы по структуре, поэтому словарь, обученный на первых
+    страницах провайдера, сжимает каждую следующую страницу во много раз лучше gzip.
+
+    Структура:
+        <root>/archive.json                     - описание архива
+        <root>/<provider>/dict_0001.zdict       - словари провайдера (старые словари не удаляются)
+        <root>/<provider>/segment_00001.zst     - сегменты: сжатые страницы, записанные подряд (только дозапись)
+        <root>/<provider>/index.tsv             - индекс: время, location, url, сегмент, смещение, длина, словарь, sha256,
+                                                  хэш цикла (записи одного времени различаются содержимым)
+
+    Получение любой страницы по (provider, location, timestamp) - одно смещение в файле и одна распаковка.
+    Запись рассчитана на один процесс-сборщик. Пока словаря нет, в памяти хранится равномерная выборка
+    из train_samples страниц провайдера (reservoir sampling); если словарь на ней не обучается, попытка
+    повторяется, когда страниц провайдера станет вдвое больше.
+
+    Параметры:
+        root            - корневая директория архива
+        level           - степень сжатия zstd
+        dict_size       - размер словаря, байт
+        train_samples   - количество страниц провайдера, после которого обучается словарь (и размер выборки для обучения)
+        segment_size    - максимальный размер сегмента, байт
+    '''
+    def __init__(self, root: str = 'raw_zstd', level: int = 10, dict_size: int = 112640,
+                 train_samples: int = 64, segment_size: int = 256 * 2**20) -> None:
+        self.root = root
+        self.level = level
+        self.dict_size = dict_size
+        self.train_samples = train_samples
+        self.segment_size = segment_size
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[tuple, Dict[str, List[tuple]]]] = {}  # provider -> (location, issue_time) -> хэш цикла -> страницы
+        self._dicts: Dict[str, Dict[int, object]] = {}         # provider -> dict_id -> ZstdCompressionDict
+        self._samples: Dict[str, List[bytes]] = {}              # выборка страниц для обучения словаря
+        self._seen: Dict[str, int] = {}                         # страниц провайдера, записанных без словаря
+        self._train_at: Dict[str, int] = {}                     # количество страниц для следующей попытки обучения
+        self._random = random.Random(0)
+        self._compressors: Dict[tuple, object] = {}
+        self._decompressors: Dict[tuple, object] = {}
+
+        os.makedirs(root, exist_ok=True)
+        meta = os.path.join(root, 'archive.json')
+        if not os.path.exists(meta):
+            with open(meta, 'w', encoding='utf-8') as f:
+                json.dump({'type': 'segment', 'codec': 'zstd'}, f)
+
+        for provider in sorted(os.listdir(root)):
+            if os.path.isdir(os.path.join(root, provider)):
+                self._load_provider(provider)
+
+    # --- словари ---
+
+    def _dict_path(self, provider: str, dict_id: int) -> str:
+        return os.path.join(self.root, provider, f'dict_{dict_id:04d}.zdict')
+
+    def _load_provider(self, provider: str) -> None:
+        zstd = _zstd()
+        directory = os.path.join(self.root, provider)
+        self._dicts[provider] = {}
+        for name in os.listdir(directory):
+            if name.startswith('dict_') and name.endswith('.zdict'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    self._dicts[provider][int(name[5:9])] = zstd.ZstdCompressionDict(f.read())
+
+        index = self._index.setdefault(provider, {})
+        index_file = os.path.join(directory, 'index.tsv')
+        if os.path.exists(index_file):
+            with open(index_file, encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # недописанная строка после аварийной остановки
+                    issue_time, location, url, segment, offset, length, dict_id, key, *cycle = line.rstrip('\n').split('\t')
+                    # индекс без хэша цикла (записан до его появления) - циклы различаются только временем
+                    index.setdefault((location, issue_time), {}).setdefault(cycle[0] if cycle else '', []).append(
+                        (url, int(segment), int(offset), int(length), int(dict_id), key))
+
+    def train(self, provider: str, samples: List[bytes]) -> int:
+        # обучение нового словаря провайдера; новые страницы сжимаются им, старые - своими словарями
+        zstd = _zstd()
+        with self._lock:
+            dicts = self._dicts.setdefault(provider, {})
+            dict_id = max(dicts, default=0) + 1
+            # словарь не может быть больше части обучающих данных
+            dict_size = min(self.dict_size, sum(map(len, samples)) // 4)
+            dictionary = zstd.train_dictionary(dict_size, samples, level=self.level)
+
+            os.makedirs(os.path.join(self.root, provider), exist_ok=True)
+            with open(self._dict_path(provider, dict_id), 'wb') as f:
+                f.write(dictionary.as_bytes())
+            dicts[dict_id] = dictionary
+            return dict_id
+
+    def _current_dict(self, provider: str) -> int:
+        dicts = self._dicts.get(provider)
+        return max(dicts) if dicts else 0
+
+    def _compressor(self, provider: str, dict_id: int):
+        key = (provider, dict_id)
+        if key not in self._compressors:
+            zstd = _zstd()
+            dictionary = self._dicts[provider][dict_id] if dict_id else None
+            self._compressors[key] = zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+        return self._compressors[key]
+
+    def _decompressor(self, provider: str, dict_id: int):
+        key = (provider, dict_id)
+        if key not in self._decompressors:
+            zstd = _zstd()
+            dictionary = self._dicts[provider][dict_id] if dict_id else None
+            self._decompressors[key] = zstd.ZstdDecompressor(dict_data=dictionary)
+        return self._decompressors[key]
+
+    # --- запись ---
+
+    def _segment_path(self, provider: str, segment: int) -> str:
+        return os.path.join(self.root, provider, f'segment_{segment:05d}.zst')
+
+    def _current_segment(self, provider: str) -> int:
+        directory = os.path.join(self.root, provider)
+        segments = [int(name[8:13]) for name in os.listdir(directory) if name.startswith('segment_')]
+        segment = max(segments, default=1)
+        path = self._segment_path(provider, segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_size:
+            segment += 1
+        return segment
+
+    def _sample(self, provider: str, pages: List[tuple]) -> None:
+        # равномерная выборка страниц провайдера для обучения словаря: в памяти не больше train_samples страниц
+        samples = self._samples.setdefault(provider, [])
+        for _, content in pages:
+            seen = self._seen[provider] = self._seen.get(provider, 0) + 1
+            if len(samples) < self.train_samples:
+                samples.append(content)
+            else:
+                slot = self._random.randrange(seen)
+                if slot < self.train_samples:
+                    samples[slot] = content
+
+    def record(self, provider: str, issue_time: datetime, pages: List[tuple], location: str = '') -> dict:
+        # сохранение страниц одного цикла получения прогноза
+        if not self._current_dict(provider):
+            self._sample(provider, pages)
+            if self._seen[provider] >= self._train_at.get(provider, self.train_samples):
+                try:
+                    self.train(provider, self._samples[provider])
+                    del self._samples[provider], self._seen[provider]
+                except _zstd().ZstdError as e:
+                    # слишком мало данных для словаря - страницы сжимаются без словаря, обучение повторится
+                    # на выборке из вдвое большего числа страниц
+                    self._train_at[provider] = 2 * self._seen[provider]
+                    print(f"SegmentArchive: failed to train dictionary for {provider}: {e}")
+
+        with self._lock:
+            os.makedirs(os.path.join(self.root, provider), exist_ok=True)
+            dict_id = self._current_dict(provider)
+            compressor = self._compressor(provider, dict_id)
+            segment = self._current_segment(provider)
+            issue = issue_time.isoformat(timespec='seconds')
+            cycle = hashlib.sha256(b''.join(content for _, content in pages)).hexdigest()[:16]
+            entries = []
+
+            with open(self._segment_path(provider, segment), 'ab') as f:
+                for url, content in pages:
+                    frame = compressor.compress(content)
+                    offset = f.tell()
+                    f.write(frame)
+                    entries.append((url, segment, offset, len(frame), dict_id, hashlib.sha256(content).hexdigest()))
+
+            with open(os.path.join(self.root, provider, 'index.tsv'), 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write('\t'.join(map(str, (issue, location) + entry + (cycle,))) + '\n')
+
+            self._index.setdefault(provider, {}).setdefault((location, issue), {})[cycle] = entries
+
+        return self._entry(provider, location, issue, entries)
+
+    # --- чтение ---
+
+    @staticmethod
+    def _entry(provider: str, location: str, issue: str, entries: List[tuple]) -> dict:
+        # ссылка на страницу: 'сегмент:смещение:длина:словарь'
+        return {'provider': provider, 'location': location, 'issue_time': issue,
+                'pages': [[url, ':'.join(map(str, entry))] for url, *entry, _ in entries]}
+
+    def _read(self, provider: str, segment: int, offset: int, length: int, dict_id: int) -> bytes:
+        with open(self._segment_path(provider, segment), 'rb') as f:
+            f.seek(offset)
+            frame = f.read(length)
+        return self._decompressor(provider, dict_id).decompress(frame)
+
+    def get(self, provider: str, location: str, issue_time: datetime) -> List[tuple]:
+        # страницы цикла (provider, location, issue_time): [(url, content)]; несколько циклов в одну секунду - последний
+        issue = issue_time.isoformat(timespec='seconds') if isinstance(issue_time, datetime) else issue_time
+        cycles = self._index.get(provider, {}).get((location, issue))
+        if not cycles:
+            raise KeyError((provider, location, issue))
+        entries = list(cycles.values())[-1]
+        return [(url, self._read(provider, segment, offset, length, dict_id))
+                for url, segment, offset, length, dict_id, _ in entries]
+
+    def records(self, providers: List[str] = None, since: datetime = None, until: datetime = None) -> Iterator[dict]:
+        # записи индекса в том же формате, что и RawArchive.records (для Backfill.py)
+        for provider, index in self._index.items():
+            if providers and provider not in providers:
+                continue
+            for (location, issue), cycles in sorted(index.items(), key=lambda item: item[0][1]):
+                issue_time = datetime.fromisoformat(issue)
+                if (since and issue_time < since) or (until and issue_time >= until):
+                    continue
+                for entries in cycles.values():
+                    yield self._entry(provider, location, issue, entries)
+
+    def pages(self, entry: dict) -> List[tuple]:
+        # содержимое страниц записи индекса [(url, content)]
+        provider = entry['provider']
+        return [(url, self._read(provider, *map(int, ref.split(':')))) for url, ref in entry['pages']]
+
+
+def open_archive(root: str):
+    # открытие архива сырых страниц любого типа
+    meta = os.path.join(root, 'archive.json')
+    if os.path.exists(meta):
+        with open(meta, encoding='utf-8') as f:
+            if json.load(f).get('type') == 'segment':
+                return SegmentArchive(root)
+    return RawArchive(root)
@@ -0,0 +1,202 @@
+import os, json
+import time
+import copy
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from typing import Dict
+
+'''
+    Конфигурация сборщиков, перечитываемая во время работы (без перезапуска и потери цикла).
+
+    Файл JSON (по умолчанию config.json) проверяется по времени изменения; новая версия применяется
+    между опросами - загрузка и разбор, которые уже выполняются, завершаются со старыми настройками.
+    Файл с ошибкой не применяется: сообщение выводится, работа продолжается с предыдущей версией.
+    Отсутствующие ключи берутся из DEFAULTS, поэтому файл содержит только то, что меняется:
+
+    {
+        "defaults":  {"timeout": 30, "attempts": 5, "suspend_time": 10, "user_agent": "..."},
+        "providers": {
+            "rp5":       {"forecast_table": "forecastTable_1_3", "min_interval": 600},
+            "goodmeteo": {"enabled": false},
+            "yandex":    {"url": "https://yandex.ru/pogoda/?lat=56.813158&lon=60.643738",
+                          "region": ["ul", {"class": "swiper-wrapper"}]}
+        },
+        "hosts":     {"rp5.ru": {"concurrency": 1, "rate": 0.2}},
+        "actual":    {"interval": 3600, "providers": {"rumeteo": {"enabled": false}}}
+    }
+
+    Настройки провайдера прогноза (SpecForecast.configure): enabled, url (адрес первой страницы), urls (адреса
+    всех страниц, goodmeteo - сегодня и завтра), region, forecast_table (rp5), timeout, attempts, suspend_time,
+    user_agent; расписания (Scheduler) - min_interval, max_interval. Ограничения хостов (HostLimiter): rate -
+    запросов в секунду, concurrency - одновременных запросов. Scheduler опрашивает провайдеров по одному,
+    поэтому в сборщике прогнозов concurrency ничего не ограничивает: оно действует, только если прогнозы
+    запрашиваются из нескольких потоков с общим Forecast.limiter (собственные сценарии).
+'''
+
+DEFAULTS = {
+    'defaults': {
+        'timeout': 30,          # время ожидания ответа, с
+        'attempts': 5,          # попыток подключения (см. WeatherForecastParser.reconnect)
+        'suspend_time': 10,     # пауза между попытками, с
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                      'Chrome/112.0.0.0 Safari/537.36',
+        'enabled': True,
+        'min_interval': 300,    # интервалы опроса расписания (см. Scheduler.AdaptiveSchedule)
+        'max_interval': 6 * 3600,
+    },
+    'providers': {},
+    'hosts': {
+        '*': {'concurrency': 4, 'rate': None},  # ограничения хостов, не указанных в файле
+    },
+    'actual': {
+        'interval': 3600,       # период сбора фактических данных, с
+        'providers': {},
+    },
+}
+
+
+def _merge(base: dict, update: dict) -> dict:
+    # рекурсивное наложение update на копию base
+    result = copy.deepcopy(base)
+    for key, value in update.items():
+        result[key] = _merge(result[key], value) if isinstance(value, dict) and isinstance(result.get(key), dict) else value
+    return result
+
+
+def _validate(config: dict) -> None:
+    for section in ('defaults', 'providers', 'hosts', 'actual'):
+        if not isinstance(config.get(section), dict):
+            raise ValueError(f'section {section} must be an object')
+    for name, settings in list(config['providers'].items()) + list(config['actual']['providers'].items()):
+        if not isinstance(settings, dict):
+            raise ValueError(f'provider {name} settings must be an object')
+    for host, limits in config['hosts'].items():
+        if not isinstance(limits, dict):
+            raise ValueError(f'host {host} limits must be an object')
+        # 0 - ошибка, а не "без ограничения": без ограничения - null (отсутствующий ключ берется из '*')
+        concurrency, rate = limits.get('concurrency'), limits.get('rate')
+        if (concurrency is not None and int(concurrency) < 1) or (rate is not None and float(rate) <= 0):
+            raise ValueError(f'host {host}: concurrency must be >= 1 and rate > 0')
+    if float(config['actual']['interval']) <= 0:
+        raise ValueError('actual.interval must be positive')
+
+
+class RuntimeConfig:
+    '''
+    Конфигурация, перечитываемая при изменении файла.
+
+    Параметры:
+        path            - файл конфигурации (JSON); если файла нет - используются DEFAULTS
+        check_interval  - как часто проверять изменение файла, с (паузы сборщиков делятся на отрезки этой длины)
+    '''
+    def __init__(self, path: str = 'config.json', check_interval: float = 5) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self.data: dict = copy.deepcopy(DEFAULTS)
+        self.version = 0  # увеличивается при каждом применении новой версии файла
+        self._mtime = None
+
+        self.reload()
+
+    def reload(self) -> bool:
+        # перечитывание файла, если он изменился; True - если применена новая версия
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+
+        if mtime is None:
+            data = copy.deepcopy(DEFAULTS)
+        else:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = _merge(DEFAULTS, json.load(f))
+                _validate(data)
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Config {self.path} is not applied, keeping the previous version: {e}")
+                return False
+
+        if data == self.data:
+            return False
+        self.data = data
+        self.version += 1
+        print(f"Config {self.path} applied (version {self.version})")
+        return True
+
+    def provider(self, name: str) -> dict:
+        # настройки провайдера прогноза: общие значения + значения провайдера
+        return {**self.data['defaults'], **self.data['providers'].get(name, {})}
+
+    def actual(self, name: str) -> dict:
+        # настройки провайдера фактических данных
+        return {**self.data['defaults'], **self.data['actual']['providers'].get(name, {})}
+
+    def hosts(self) -> Dict[str, dict]:
+        return self.data['hosts']
+
+    def wait(self, seconds: float) -> bool:
+        # пауза с проверкой файла; прерывается, как только применена новая версия (True)
+        deadline = time.time() + seconds
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, self.check_interval))
+            if self.reload():
+                return True
+
+
+class HostLimiter:
+    '''
+    Ограничение одновременных запросов и частоты запросов к каждому хосту.
+    Ограничения можно менять во время работы (configure): запросы, ожидающие слота, сразу получают новые значения.
+    Ограничение одновременных запросов имеет смысл, только если запросы идут из нескольких потоков:
+    однопоточный Scheduler и так выполняет не больше одного запроса за раз.
+
+    Параметры:
+        limits  - {хост: {'concurrency': n или None, 'rate': запросов в секунду или None}}; None - без ограничения;
+                  '*' - для остальных хостов и для ключей, не указанных у хоста
+    '''
+    def __init__(self, limits: Dict[str, dict] = None) -> None:
+        self._condition = threading.Condition()
+        self._limits: Dict[str, dict] = {}
+        self._active: Dict[str, int] = {}
+        self._next: Dict[str, float] = {}  # время, раньше которого следующий запрос к хосту не начинается
+        self.configure(limits or DEFAULTS['hosts'])
+
+    def configure(self, limits: Dict[str, dict]) -> None:
+        with self._condition:
+            self._limits = dict(limits)
+            self._condition.notify_all()
+
+    def _limit(self, host: str) -> dict:
+        # ограничения хоста поверх ограничений '*' (хост с одним rate сохраняет общий concurrency)
+        return {**self._limits.get('*', {}), **self._limits.get(host, {})}
+
+    @contextmanager
+    def slot(self, url: str):
+        # ожидание свободного слота хоста url на время запроса
+        host = urlsplit(url).netloc
+        with self._condition:
+            while True:
+                limit = self._limit(host)
+                wait = self._next.get(host, 0.0) - time.time()
+                concurrency = limit.get('concurrency')
+                if (concurrency is None or self._active.get(host, 0) < int(concurrency)) and wait <= 0:
+                    break
+                self._condition.wait(wait if wait > 0 else None)
+
+            self._active[host] = self._active.get(host, 0) + 1
+            rate = limit.get('rate')
+            self._next[host] = time.time() + (1 / rate if rate else 0.0)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[host] -= 1
+                self._condition.notify_all()
@@ -0,0 +1,312 @@
+import os, json
+import time
+import heapq
+import statistics
+from collections import deque
+from datetime import datetime
+
+from CycleJournal import CycleJournal, DONE, FAILED, SAVED
+
+from typing import Callable, Dict, List
+
+'''
+    Адаптивное расписание опроса провайдеров прогнозов.
+
+    Провайдеры обновляют прогнозы по своему расписанию (yandex - часто, goodmeteo - редко), поэтому
+    вместо опроса всех раз в час каждый провайдер опрашивается по своему расписанию:
+        - обновление определяется по изменению прогноза (Forecast.changed: хэш страниц/данных, ответ 304);
+        - по моментам обновлений оценивается период обновления провайдера (медиана интервалов);
+        - около ожидаемого момента обновления опрос учащается до min_interval,
+          до него - опросов нет (но не реже max_interval);
+        - если обновление не пришло в ожидаемом окне или период еще не известен, интервал опроса
+          увеличивается, пока обновление не будет обнаружено.
+
+    Состояние (моменты обновлений) сохраняется в файл, чтобы после перезапуска не обучаться заново.
+    С RuntimeConfig изменения файла конфигурации (включение провайдеров, адреса, интервалы опроса, тайм-ауты)
+    применяются между опросами без перезапуска: текущий опрос завершается со старыми настройками.
+    С CycleJournal каждый опрос - задание (provider, location, час): после падения прерванные опросы
+    повторяются сразу, сохраненный, но не переданный обработчику on_update прогноз передается ему при запуске,
+    а уже сохраненный прогноз не сохраняется повторно (хэш данных берется из журнала).
+'''
+
+
+class AdaptiveSchedule:
+    '''
+    Расписание опроса одного провайдера.
+
+    Пока период обновления не известен, провайдер опрашивается каждые min_interval (редкий опрос не отличит
+    период от интервала опроса). После трех обновлений период оценивается медианой интервалов между ними,
+    и ожидаемые обновления образуют сетку anchor + n * period. Состояние сохраняется, поэтому обучение
+    выполняется один раз.
+
+    Первый опрос каждого цикла выполняется в момент сетки со сдвигом delta. Сдвиг подстраивается так,
+    чтобы первый опрос находил обновление с вероятностью quantile: при успехе опрос смещается раньше
+    (меньше задержка), при неудаче - позже (меньше лишних запросов). Так же компенсируется ошибка оценки
+    периода. Если первый опрос не нашел обновления, опрос продолжается каждые min_interval до середины цикла,
+    затем интервал увеличивается. Обновление далеко от сетки (смена расписания провайдера) задает сетку заново.
+
+    Параметры:
+        min_interval    - интервал частого опроса, с
+        max_interval    - максимальный интервал опроса, с
+        history         - количество запоминаемых обновлений
+        backoff         - множитель увеличения интервала, пока обновление не обнаружено
+        quantile        - целевая доля циклов, в которых обновление находит первый опрос
+    '''
+    def __init__(self, min_interval: float = 300, max_interval: float = 6 * 3600, history: int = 24,
+                 backoff: float = 1.5, quantile: float = 0.9) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.quantile = quantile
+
+        self.interval = min(3600, max_interval)
+        self.updates: deque = deque(maxlen=history)  # моменты обнаружения обновлений (timestamp)
+        self.period: float = None
+        self.anchor: float = None   # момент сетки ожидаемых обновлений
+        self.delta = 0.0            # сдвиг первого опроса цикла относительно сетки
+        self.expected: float = None  # момент сетки текущего цикла (None - первый опрос цикла еще не выполнен)
+        self.first = True           # следующий опрос - первый в цикле
+        self.polls = 0
+
+    def _learn_period(self, now: float) -> None:
+        intervals = [b - a for a, b in zip(self.updates, list(self.updates)[1:])]
+        self.period = max(statistics.median(intervals), self.min_interval)
+        self.anchor, self.delta = now, 0.0
+
+    def _forget_period(self, now: float) -> None:
+        self.period, self.anchor, self.expected, self.delta = None, None, None, 0.0
+        self.updates.clear()
+        self.updates.append(now)
+
+    def next_poll(self, now: float, changed: bool) -> float:
+        # результат опроса в момент now -> время следующего опроса
+        self.polls += 1
+        if changed:
+            self.updates.append(now)
+
+        if self.period is None:
+            if len(self.updates) < 3:
+                # период еще не известен - обучение
+                return now + self.min_interval
+            self._learn_period(now)
+
+        if changed:
+            if self.first:
+                self.delta -= (1 - self.quantile) * self.min_interval  # успех - в следующий раз раньше
+            cycle = round((now - self.delta - self.anchor) / self.period)
+            if abs(now - self.delta - self.anchor - cycle * self.period) > self.period / 4:
+                # обновление далеко от сетки - расписание провайдера изменилось, период определяется заново
+                self._forget_period(now)
+                return now + self.min_interval
+            if abs(self.delta) > self.period / 4:
+                # накопленный сдвиг переносится в сетку
+                self.anchor, self.delta = self.anchor + self.delta, 0.0
+
+            self.expected = self.anchor + (cycle + 1) * self.period
+            self.first, self.interval = True, self.min_interval
+            return min(now + self.max_interval, max(now + self.min_interval, self.expected + self.delta))
+
+        if self.first:
+            self.delta += self.quantile * self.min_interval  # неудача - в следующий раз позже
+            self.first = False
+        if self.expected is not None and now < self.expected + self.period / 2:
+            # обновление задерживается - частый опрос до середины цикла
+            return now + self.min_interval
+        # обновления нет дольше обычного - поиск с увеличением интервала
+        self.interval = min(self.max_interval, self.interval * self.backoff)
+        return now + self.interval
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ('interval', 'period', 'anchor', 'delta')} | \
+               {'updates': list(self.updates)}
+
+    def load(self, state: dict) -> None:
+        for name in ('interval', 'period', 'anchor', 'delta'):
+            setattr(self, name, state.get(name, getattr(self, name)))
+        self.updates.extend(state.get('updates', []))
+
+
+class Scheduler:
+    '''
+    Опрос провайдеров по адаптивному расписанию.
+
+    Параметры:
+        forecasts       - провайдеры (объекты Forecast)
+        on_update       - функция, вызываемая с провайдером после получения нового прогноза
+        state_file      - файл состояния расписаний
+        schedule        - параметры AdaptiveSchedule
+        config          - перечитываемая конфигурация (RuntimeConfig); None - все провайдеры включены, настройки в коде
+        journal         - журнал заданий (CycleJournal) для восстановления после падения; None - без журнала
+    '''
+    def __init__(self, forecasts: List, on_update: Callable = None, state_file: str = 'scheduler/state.json',
+                 config=None, journal=None, **schedule) -> None:
+        self.forecasts = {forecast.provider: forecast for forecast in forecasts}
+        self.on_update = on_update
+        self.state_file = state_file
+        self.config = config
+        self.journal = journal
+        self.schedules: Dict[str, AdaptiveSchedule] = {provider: AdaptiveSchedule(**schedule) for provider in self.forecasts}
+        self.next_polls: Dict[str, float] = {}  # запланированное время опроса (после перезапуска опрос продолжается по нему)
+        self.enabled = set(self.forecasts)
+
+        self.load_state()
+        self.apply_config()
+        self.recover()
+
+    def recover(self) -> None:
+        # восстановление по журналу заданий после падения или перезапуска
+        if self.journal is None:
+            return
+        now = time.time()
+        for record in self.journal.recover():
+            # опрос прерван - повторяется первым, не дожидаясь расписания
+            if record['job'][0] in self.forecasts:
+                self.next_polls[record['job'][0]] = now
+
+        for provider, forecast in self.forecasts.items():
+            record = self.journal.latest(provider, forecast.location)
+            if record is None:
+                continue
+            # хэш в журнале записан раньше состояния расписания: тот же прогноз не сохраняется повторно
+            forecast._data_hash = record.get('data_hash', forecast._data_hash)
+            if record['state'] == SAVED:
+                self._resume(forecast, record)
+
+    def _resume(self, forecast, record: dict) -> None:
+        # прогноз сохранен, но процесс остановился до on_update: обработчик получает прогноз из файла
+        import pandas as pd
+        provider, location, window = record['job']
+        try:
+            data = pd.read_csv(record['file'], index_col=0)
+            data.index = pd.to_datetime(data.index)
+            forecast.data, forecast.issue_time = data, datetime.fromisoformat(record['issue_time'])
+            if self.on_update is not None:
+                self.on_update(forecast)
+            self.journal.record(provider, location, window, DONE, data_hash=forecast._data_hash)
+            print(f"{forecast._log_prefix} update from {record['file']} resumed after restart")
+        except Exception as e:
+            print(f"{forecast._log_prefix} failed to resume update from {record.get('file')}: {e}")
+            self.journal.record(provider, location, window, FAILED, data_hash=forecast._data_hash, reason=str(e))
+
+    def apply_config(self) -> None:
+        # настройки провайдеров и расписаний из текущей версии конфигурации
+        if self.config is None:
+            return
+        for provider, forecast in self.forecasts.items():
+            settings = self.config.provider(provider)
+            forecast.configure(settings)
+            schedule = self.schedules[provider]
+            schedule.min_interval, schedule.max_interval = settings['min_interval'], settings['max_interval']
+            schedule.interval = min(max(schedule.interval, schedule.min_interval), schedule.max_interval)
+
+            if settings['enabled'] and provider not in self.enabled:
+                print(f"{forecast._log_prefix} enabled")
+            elif not settings['enabled'] and provider in self.enabled:
+                print(f"{forecast._log_prefix} disabled")
+        self.enabled = {provider for provider in self.forecasts if self.config.provider(provider)['enabled']}
+
+        # ограничения хостов - общие для всех провайдеров
+        for limiter in {id(f.limiter): f.limiter for f in self.forecasts.values() if f.limiter is not None}.values():
+            limiter.configure(self.config.hosts())
+
+    def _queue(self, now: float) -> list:
+        # очередь опросов включенных провайдеров: запланированное время, но не позже max_interval от now
+        queue = [(min(self.next_polls.get(provider, now), now + self.schedules[provider].max_interval), provider)
+                 for provider in self.forecasts if provider in self.enabled]
+        heapq.heapify(queue)
+        return queue
+
+    def _wait(self, seconds: float) -> bool:
+        # пауза до следующего опроса; True - применена новая версия конфигурации (очередь строится заново)
+        if self.config is None:
+            time.sleep(max(0.0, seconds))
+            return False
+        if self.config.wait(seconds):
+            self.apply_config()
+            return True
+        return False
+
+    def poll(self, provider: str, now: float = None) -> float:
+        # опрос провайдера; возвращает время следующего опроса
+        forecast = self.forecasts[provider]
+        now = now or time.time()
+        job = (provider, forecast.location, CycleJournal.window(now))
+
+        if self.journal is not None:
+            self.journal.start(*job)
+        try:
+            forecast.get_data()
+            if forecast.changed:
+                filename = forecast.save_data()
+                if self.journal is not None:
+                    self.journal.record(*job, SAVED, data_hash=forecast._data_hash, file=filename,
+                                        issue_time=forecast.issue_time.isoformat())
+                if self.on_update is not None:
+                    self.on_update(forecast)
+        except Exception as e:
+            if self.journal is not None:
+                self.journal.record(*job, FAILED, data_hash=forecast._data_hash, reason=str(e))
+            raise
+        if self.journal is not None:
+            self.journal.record(*job, DONE if forecast.data is not None else FAILED, data_hash=forecast._data_hash)
+
+        next_time = self.schedules[provider].next_poll(now, forecast.changed)
+        period = self.schedules[provider].period
+        print(f"{forecast._log_prefix} {'updated' if forecast.changed else 'not changed'}, "
+              f"period {f'{period / 60:.0f} min' if period else 'unknown'}, "
+              f"next poll at {datetime.fromtimestamp(next_time):%H:%M:%S}")
+        return next_time
+
+    def run(self, stop: Callable = None) -> None:
+        # при запуске опрашиваются все провайдеры, затем каждый - по своему расписанию
+        # stop - функция, вызываемая после каждого опроса; True - завершение (например, перезапуск процесса в Daemon.py)
+        queue = self._queue(time.time())
+
+        while True:
+            if not queue:
+                # все провайдеры выключены - ожидание изменения конфигурации
+                if self._wait(self.config.check_interval if self.config else 60):
+                    queue = self._queue(time.time())
+                continue
+
+            next_time, provider = queue[0]
+            if self._wait(next_time - time.time()):
+                queue = self._queue(time.time())
+                continue
+            heapq.heappop(queue)
+
+            try:
+                next_time = self.poll(provider)
+            except Exception as e:
+                print(f"{provider} polling failed: {e}")
+                next_time = time.time() + self.schedules[provider].interval
+
+            heapq.heappush(queue, (next_time, provider))
+            self.next_polls[provider] = next_time
+            self.save_state()
+
+            if stop is not None and stop():
+                return
+
+    def save_state(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.state_file + '.tmp', 'w', encoding='utf-8') as f:
+            # хэш последнего прогноза сохраняется, чтобы после перезапуска тот же прогноз не считался обновлением
+            json.dump({provider: schedule.to_dict() | {'data_hash': self.forecasts[provider]._data_hash,
+                                                       'next_poll': self.next_polls.get(provider)}
+                       for provider, schedule in self.schedules.items()}, f)
+        os.replace(self.state_file + '.tmp', self.state_file)
+
+    def load_state(self) -> None:
+        if not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, encoding='utf-8') as f:
+            state = json.load(f)
+        for provider, schedule in self.schedules.items():
+            schedule.load(state.get(provider, {}))
+            self.forecasts[provider]._data_hash = state.get(provider, {}).get('data_hash')
+            if state.get(provider, {}).get('next_poll'):
+                self.next_polls[provider] = state[provider]['next_poll']
@@ -0,0 +1,235 @@
+import os, re, json
+import time
+import hashlib
+from datetime import datetime
+
+from typing import Callable, Dict, List, Set
+
+'''
+    Контроль структуры страниц источников (обнаружение смены верстки).
+
+    Для каждой загруженной страницы строится "скелет" целевого фрагмента - того элемента, из которого
+    парсер берет данные (список swiper-wrapper yandex, таблица forecastTable_1_3 rp5, первая таблица
+    ru-meteo и goodmeteo): дерево имен тегов и их классов без текста и атрибутов, подряд идущие одинаковые
+    поддеревья (строки, ячейки) схлопываются, поэтому длина прогноза и значения на отпечаток не влияют.
+    Отпечаток - sha1 скелета. Скелет строится регулярным выражением по байтам фрагмента, без дерева html,
+    до разбора страницы.
+
+    Последний отпечаток, с которым страница разобралась без ошибок (known-good), хранится в файле состояния.
+    Если страница с другим отпечатком не разобралась - это смена верстки:
+        - выводится предупреждение (и вызывается alert, если задан);
+        - отпечаток запоминается как нерабочий: страницы с ним не разбираются (без html5lib и повторов);
+        - провайдер не опрашивается, кроме проверки раз в recheck секунд (верстку могут вернуть).
+    После исправления парсера и перезапуска первая же загрузка проверяет страницу заново.
+    Если страница с новым отпечатком разобралась, но с ошибками отдельных полей, выводится предупреждение
+    (парсер мог "тихо" начать брать не те строки), опрос не останавливается.
+'''
+
+_TOKEN_RE = re.compile(rb'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>', re.S)
+_ATTR_RE = re.compile(rb'([a-zA-Z_:][-\w:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+# элементы без закрывающего тега
+_VOID = {b'area', b'base', b'br', b'col', b'embed', b'hr', b'img', b'input', b'link', b'meta', b'source', b'track', b'wbr'}
+
+MISSING = 'missing'
+
+
+def _attrs(raw: bytes) -> Dict[str, str]:
+    return {m[1].decode('ascii', 'replace').lower(): (m[2] or m[3] or m[4] or b'').decode('utf-8', 'replace')
+            for m in _ATTR_RE.finditer(raw)}
+
+
+def _matches(raw: bytes, attrs: dict) -> bool:
+    # атрибуты элемента удовлетворяют условию (для class - наличие класса среди классов элемента, как в bs4)
+    if not attrs:
+        return True
+    values = _attrs(raw)
+    for name, value in attrs.items():
+        if name not in values:
+            return False
+        if name == 'class' and value not in values[name].split():
+            return False
+        if name != 'class' and values[name] != value:
+            return False
+    return True
+
+
+def region_skeleton(content: bytes, tag: str, attrs: dict = None) -> str:
+    # скелет первого элемента tag с атрибутами attrs: 'table(tr(td,td.cc_0(div)),...)'; MISSING - элемента нет
+    tag = tag.lower().encode()
+
+    # начало фрагмента ищется поиском открывающего тега, разметка до него не разбирается
+    for start in re.finditer(rb'<' + re.escape(tag) + rb'[\s/>]', content, re.I):
+        token = _TOKEN_RE.match(content, start.start())
+        if token is not None and _matches(token[3], attrs):
+            break
+    else:
+        return MISSING
+    tokens = _TOKEN_RE.finditer(content, token.end())
+
+    def node(name: bytes, raw: bytes) -> str:
+        classes = '.'.join(sorted(_attrs(raw).get('class', '').split()))
+        return name.decode().lower() + ('.' + classes if classes else '')
+
+    # стек открытых элементов: [имя, описание, скелеты дочерних элементов]
+    stack = [[tag, node(tag, token[3]), []]]
+    for token in tokens:
+        name = token[2]
+        if name is None:
+            continue
+        name = name.lower()
+
+        if not token[1]:
+            if name in _VOID or token[3].rstrip().endswith(b'/'):
+                children = stack[-1][2]
+                item = node(name, token[3])
+                if not children or children[-1] != item:
+                    children.append(item)
+            else:
+                stack.append([name, node(name, token[3]), []])
+            continue
+
+        # закрывающий тег: незакрытые вложенные элементы (<td> без </td>) закрываются вместе с ним
+        if not any(frame[0] == name for frame in stack):
+            continue
+        while stack:
+            closed, description, children = stack.pop()
+            item = description + ('(' + ','.join(children) + ')' if children else '')
+            if not stack:
+                return item
+            siblings = stack[-1][2]
+            if not siblings or siblings[-1] != item:  # подряд идущие одинаковые поддеревья схлопываются
+                siblings.append(item)
+            if closed == name:
+                break
+
+    # фрагмент не закрыт до конца страницы
+    while len(stack) > 1:
+        _, description, children = stack.pop()
+        stack[-1][2].append(description + ('(' + ','.join(children) + ')' if children else ''))
+    return stack[0][1] + '(' + ','.join(stack[0][2]) + ')'
+
+
+def fingerprint(content: bytes, region: tuple) -> str:
+    # отпечаток структуры целевого фрагмента страницы; region - (tag, attrs); пустая страница - MISSING
+    if not content or not content.strip():
+        return MISSING
+    skeleton = region_skeleton(content, *region)
+    return MISSING if skeleton == MISSING else hashlib.sha1(skeleton.encode()).hexdigest()[:16]
+
+
+class StructureMonitor:
+    '''
+    Отпечатки структуры страниц провайдеров: известные рабочие и нерабочие, состояние смены верстки.
+
+    Параметры:
+        state_file  - файл состояния (None - только в памяти)
+        recheck     - период проверки страницы во время смены верстки, с
+        alert       - функция alert(provider, message), вызываемая при обнаружении смены верстки
+    '''
+    def __init__(self, state_file: str = 'structure/fingerprints.json', recheck: float = 6 * 3600,
+                 alert: Callable = None) -> None:
+        self.state_file = state_file
+        self.recheck = recheck
+        self.alert = alert
+
+        self.state: Dict[str, dict] = {}      # provider -> {'good': [...], 'good_since', 'bad': {fp: reason}, 'drift_since'}
+        self._checked: Dict[str, float] = {}  # время последней проверки страницы во время смены верстки
+        self._rechecking: Set[str] = set()    # провайдеры, страницы которых сейчас проверяются
+        self.load()
+
+    def _provider(self, provider: str) -> dict:
+        return self.state.setdefault(provider, {'good': None, 'good_since': None, 'bad': {}, 'drift_since': None})
+
+    def blocked(self, provider: str) -> bool:
+        # True - верстка сменилась и время проверки еще не пришло (страницу загружать не нужно)
+        state = self.state.get(provider)
+        if state is None or state['drift_since'] is None:
+            return False
+        checked = self._checked.get(provider)
+        if checked is not None and time.time() - checked < self.recheck:
+            return True
+        # проверка: страница загружается и разбирается, даже если ее отпечаток известен как нерабочий
+        self._checked[provider] = time.time()
+        self._rechecking.add(provider)
+        return False
+
+    def known_bad(self, provider: str, fingerprint: str) -> bool:
+        # страницу с этим отпечатком разбирать не нужно
+        # страница без целевого фрагмента (ошибка сервера, пустой ответ) - не верстка, ее отпечаток не бывает нерабочим
+        state = self.state.get(provider)
+        return state is not None and fingerprint != MISSING and fingerprint in state['bad'] and \
+               provider not in self._rechecking
+
+    def report(self, provider: str, fingerprints: List[str], parsed: bool, field_errors: List[str] = None) -> None:
+        # результат разбора страниц с отпечатками fingerprints: parsed - прогноз получен, field_errors - поля с ошибками
+        self._rechecking.discard(provider)
+        state = self._provider(provider)
+        good = state['good']
+        # страница без целевого фрагмента не считается новой структурой: ни эталоном, ни нерабочей версткой
+        missing = MISSING in fingerprints
+        changed = [fp for i, fp in enumerate(fingerprints)
+                   if fp != MISSING and (good is None or i >= len(good) or good[i] != fp)]
+
+        if parsed and not field_errors:
+            recovered = state['drift_since'] is not None
+            if changed and not missing:
+                if good is not None:
+                    print(f"{provider.ljust(10)}| Page structure changed ({', '.join(changed)}), parser still works")
+                state['good'], state['good_since'] = list(fingerprints), datetime.now().isoformat(timespec='seconds')
+                for fp in changed:
+                    state['bad'].pop(fp, None)
+            if recovered:
+                print(f"{provider.ljust(10)}| Page structure is parsed again, drifted since {state['drift_since']}")
+                state['drift_since'] = None
+                self._checked.pop(provider, None)
+            if (changed and not missing) or recovered:
+                self.save()
+            return
+
+        if missing:
+            # ошибку разбора нельзя отнести к верстке, если одной из страниц нет (ошибка сервера, пустой ответ)
+            print(f"{provider.ljust(10)}| Page has no target element (error or empty page), not treated as a layout change")
+            return
+        if good is None or not changed:
+            # эталона еще нет или структура прежняя - ошибка не в верстке
+            return
+
+        if parsed:
+            message = f"page structure changed ({', '.join(changed)}) and fields failed: {', '.join(field_errors)}"
+        else:
+            message = f"page structure changed ({', '.join(changed)}), parsing failed; fetching paused until the parser is fixed"
+            state['drift_since'] = state['drift_since'] or datetime.now().isoformat(timespec='seconds')
+            self._checked[provider] = time.time()
+
+        if all(state['bad'].get(fp) == message for fp in changed):
+            # о смене верстки уже сообщалось (проверка во время смены верстки)
+            print(f"{provider.ljust(10)}| Page structure still differs from known-good, drifted since {state['drift_since']}")
+            return
+
+        for fp in changed:
+            state['bad'][fp] = message
+        print(f"{provider.ljust(10)}| ALERT: {message}")
+        if self.alert is not None:
+            try:
+                self.alert(provider, message)
+            except Exception as e:
+                print(f"{provider.ljust(10)}| Failed to send structure alert: {e}")
+        self.save()
+
+    def save(self) -> None:
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.state_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1)
+        os.replace(self.state_file + '.tmp', self.state_file)
+
+    def load(self) -> None:
+        # время проверок не сохраняется: после перезапуска (исправления парсера) страница проверяется сразу
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, encoding='utf-8') as f:
+            self.state = json.load(f)
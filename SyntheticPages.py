@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import re
+import math
+import time
+import random
+import zlib
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from typing import Dict, List
+
+'''
+    Синтетические страницы источников и локальный стенд, подменяющий источники.
+
+    PageGenerator строит страницы в той же структуре, которую ожидают парсеры
+    (WeatherForecastParser, WeatherParser): список swiper-wrapper и блок card_size_big yandex,
+    таблицы по дням и блок last-report ru-meteo, таблица forecastTable_1_3 rp5,
+    таблицы на сегодня/завтра и блок b_pogoda goodmeteo. Погода - суточный ход температуры
+    с детерминированным шумом: одинаковые (location, revision) дают одинаковые страницы,
+    новая ревизия - обновленный прогноз.
+
+    StandInServer отдает эти страницы по адресам зеркала (см. mirror_url):
+        http://127.0.0.1:<port>/<host источника><путь>?<query>&location=<населенный пункт>
+    поддерживает условные запросы (ETag), задержку ответа и долю ошибок. Провайдеры направляются
+    на стенд атрибутом Forecast.mirror (WeatherParser.MIRROR для фактических данных):
+        forecast = get_provider('rp5')
+        forecast.mirror = server.url
+
+    Стенд без сети: python SyntheticPages.py --port 8080
+    Нагрузочный тест: python benchmarks/load_test.py
+'''
+
+CONDITIONS = ['ясно', 'малооблачно', 'облачно с прояснениями', 'переменная облачность', 'облачно', 'пасмурно',
+              'небольшой дождь', 'дождь', 'небольшой снег']
+WIND_DIRECTIONS = ['Север', 'Северо-Восток', 'Восток', 'Юго-Восток', 'Юг', 'Юго-Запад', 'Запад', 'Северо-Запад']
+WIND_SHORT = ['С', 'СВ', 'В', 'ЮВ', 'Ю', 'ЮЗ', 'З', 'СЗ']
+WIND_RP5 = ['С', 'С-В', 'В', 'Ю-В', 'Ю', 'Ю-З', 'З', 'С-З']
+MONTHS = ['января', 'февраля', 'марта', 'апреля', 'мая', 'июня', 'июля', 'августа', 'сентября', 'октября',
+          'ноября', 'декабря']
+WEEKDAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+
+# путь страницы на стенде -> провайдер и номер страницы
+PAGES = {
+    ('yandex.ru', '/pogoda/'): ('yandex', 0),
+    ('ru-meteo.ru', '/ekaterinburg/hour'): ('rumeteo', 0),
+    ('rp5.ru', None): ('rp5', 0),
+    ('goodmeteo.ru', '/pogoda-ekaterinburg/'): ('goodmeteo', 0),
+    ('goodmeteo.ru', '/pogoda-ekaterinburg/zavtra/'): ('goodmeteo', 1),
+}
+
+# период обновления прогноза провайдером, с (как у реальных источников - разный)
+UPDATE_INTERVALS = {'yandex': 600, 'rumeteo': 3600, 'rp5': 3 * 3600, 'goodmeteo': 6 * 3600}
+
+
+def _hours(n: int) -> str:
+    # "в 1 час", "в 2 часа", "в 5 часов"
+    if n % 10 == 1 and n % 100 != 11:
+        return 'час'
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return 'часа'
+    return 'часов'
+
+
+def _signed(value: float, digits: int = 0, comma: bool = False) -> str:
+    # температура всегда со знаком, как на страницах источников ('+5', '-0,4'); ноль - '+0'
+    text = f'{value:+.{digits}f}'
+    if float(text) == 0:
+        text = '+' + text[1:]
+    return text.replace('.', ',') if comma else text
+
+
+def _decimal(value: float, digits: int = 1) -> str:
+    # число с десятичной запятой ('3,4')
+    return f'{value:.{digits}f}'.replace('.', ',')
+
+
+class PageGenerator:
+    '''
+    Генератор синтетических страниц источников.
+
+    Параметры:
+        seed        - начальное значение генератора (вместе с населенным пунктом и ревизией задает страницу)
+        horizon     - длина прогноза, ч (для goodmeteo всегда сегодня и завтра)
+        noise       - СКО ошибки прогноза на горизонте 24 ч, °C (ошибка растет с заблаговременностью)
+        padding     - объем разметки вокруг данных, байт (реальные страницы - сотни килобайт, разбор
+                      html5lib зависит от размера всей страницы)
+    '''
+    def __init__(self, seed: int = 0, horizon: int = 72, noise: float = 1.5, padding: int = 100_000) -> None:
+        self.seed = seed
+        self.horizon = horizon
+        self.noise = noise
+        self.padding = padding
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(zlib.crc32(repr((self.seed, *key)).encode()))
+
+    def truth(self, location: str, moment: datetime) -> dict:
+        # "фактическая" погода: сезонный и суточный ход + медленные возмущения, одинаковые для всех провайдеров
+        rng = self._rng(location)
+        shift, amplitude = rng.uniform(-8, 8), rng.uniform(4, 8)
+        hour = moment.timestamp() / 3600
+        season = -15 * math.cos(2 * math.pi * (moment.timetuple().tm_yday - 15) / 365)
+        daily = amplitude * math.sin(2 * math.pi * (moment.hour - 9) / 24)
+        weather = 3 * math.sin(hour / 37 + shift) + 1.5 * math.sin(hour / 11 + 2 * shift)
+        return {
+            'temperature': 3 + shift + season + daily + weather,
+            'wind_speed': max(0.0, 3 + 2 * math.sin(hour / 17 + shift)),
+            'wind_direction': int(hour / 29 + 4 * shift) % 8,
+            'pressure': 745 + 8 * math.sin(hour / 53 + shift),
+            'humidity': min(98.0, max(20.0, 65 - 2.5 * daily + 10 * math.sin(hour / 23 + shift))),
+            'cloudiness': min(99.0, max(0.0, 50 + 45 * math.sin(hour / 19 + 3 * shift))),
+        }
+
+    def forecast(self, provider: str, location: str, revision: int, start: datetime, hours: int) -> List[dict]:
+        # прогноз провайдера: фактическая погода + ошибка, растущая с заблаговременностью
+        rng = self._rng(provider, location, revision)
+        bias = rng.gauss(0, self.noise / 2)
+        result = []
+        for lead in range(hours):
+            moment = start + timedelta(hours=lead)
+            value = self.truth(location, moment)
+            error = self.noise * math.sqrt((lead + 1) / 24)
+            value['temperature'] += bias + rng.gauss(0, error)
+            value['wind_speed'] = max(0.0, value['wind_speed'] + rng.gauss(0, error / 3))
+            value['pressure'] += rng.gauss(0, error)
+            value['humidity'] = min(99.0, max(10.0, value['humidity'] + rng.gauss(0, 3 * error)))
+            value['cloudiness'] = min(99.0, max(0.0, value['cloudiness'] + rng.gauss(0, 10 * error)))
+            value['conditions'] = CONDITIONS[min(len(CONDITIONS) - 1, int(value['cloudiness'] / 100 * 6) +
+                                                 (value['humidity'] > 85) * (1 + (value['temperature'] < 0)))]
+            value['precipitation'] = round(max(0.0, (value['humidity'] - 80) / 5), 1)
+            value['time'] = moment
+            result.append(value)
+        return result
+
+    def actual(self, provider: str, location: str, moment: datetime) -> dict:
+        # текущая погода по данным провайдера (у провайдеров разные станции - небольшие расхождения)
+        value = self.truth(location, moment)
+        rng = self._rng(provider, location, moment.strftime('%Y%m%d%H%M'))
+        value['temperature'] += rng.gauss(0, 0.7)
+        value['wind_speed'] = max(0.0, value['wind_speed'] + rng.gauss(0, 0.5))
+        value['pressure'] += rng.gauss(0, 1)
+        value['humidity'] = min(99.0, max(10.0, value['humidity'] + rng.gauss(0, 3)))
+        value['conditions'] = CONDITIONS[min(5, int(value['cloudiness'] / 100 * 6))]
+        return value
+
+    def _page(self, title: str, body: str) -> bytes:
+        # обрамление данных разметкой реального объема (меню, ссылки, скрипты)
+        filler, size = [], 0
+        rng = self._rng(title)
+        while size < self.padding:
+            block = (f'<div class="nav-item item-{rng.randrange(10 ** 6)}"><a href="/link/{rng.randrange(10 ** 6)}">'
+                     f'{escape(rng.choice(CONDITIONS))} {rng.randrange(100)}</a><span>{rng.random():.6f}</span></div>\n')
+            filler.append(block)
+            size += len(block.encode())
+        half = len(filler) // 2
+        return ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>' + escape(title) + '</title></head><body>'
+                + ''.join(filler[:half]) + body + ''.join(filler[half:]) + '</body></html>').encode('utf-8')
+
+    def yandex(self, location: str, revision: int, now: datetime) -> bytes:
+        start = now.replace(minute=0, second=0, microsecond=0)
+        items = []
+        for i, f in enumerate(self.forecast('yandex', location, revision, start, self.horizon)):
+            hour, temperature = f['time'].hour, _signed(f['temperature'])
+            day = f"{WEEKDAYS[f['time'].weekday()][:2].lower()}, " if hour == 0 and i else ''
+            items.append(f'<li class="swiper-slide"><div class="fc__time">{day}{hour}:00</div>'
+                         f'<div class="fc__temp">{temperature}°</div>'
+                         f'<div class="a11y-hidden">В {hour} {_hours(hour)} {f["conditions"]}, {temperature}°</div></li>')
+
+        value = self.actual('yandex', location, now)
+        direction = WIND_SHORT[value['wind_direction']]
+        fact = (f'<div class="card card_size_big"><div class="fact__temp-wrap">'
+                f'<a class="fact__basic" aria-label="Сейчас {_signed(value["temperature"])}°, ощущается как '
+                f'{_signed(value["temperature"] - value["wind_speed"])}°, {value["conditions"].capitalize()}.">'
+                f'{_signed(value["temperature"])}°</a></div>'
+                f'<div class="fact__wind-speed"><span class="wind-speed">{_decimal(value["wind_speed"])}'
+                f'</span> м/с, <abbr title="Ветер: {WIND_DIRECTIONS[value["wind_direction"]].lower()}">{direction}</abbr></div>'
+                f'<div class="fact__humidity">{value["humidity"]:.0f}%</div>'
+                f'<div class="fact__pressure">{value["pressure"]:.0f} мм рт. ст.</div></div>')
+
+        return self._page(f'yandex {location} {revision}',
+                          fact + '<ul class="swiper-wrapper">' + ''.join(items) + '</ul>')
+
+    def rumeteo(self, location: str, revision: int, now: datetime) -> bytes:
+        start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        forecast = self.forecast('rumeteo', location, revision, start, self.horizon)
+
+        tables = []
+        for day in sorted({f['time'].date() for f in forecast}):
+            rows = [f'<tr><td>{f["time"]:%H:%M} {_signed(f["temperature"], 1)}°</td>'
+                    f'<td>{f["conditions"].capitalize()}</td><td>{f["precipitation"]:g}</td>'
+                    f'<td>{f["wind_speed"]:.0f} м/с, {WIND_SHORT[f["wind_direction"]]}</td>'
+                    f'<td>{f["pressure"]:.0f}</td><td>{f["humidity"]:.0f} %</td></tr>'
+                    for f in forecast if f['time'].date() == day]
+            tables.append('<table class="forecast-hour"><thead><tr><th>Время</th><th>Погода</th><th>Осадки</th>'
+                          '<th>Ветер</th><th>Давление</th><th>Влажность</th></tr></thead><tbody>' + ''.join(rows) +
+                          f'<tr><td colspan="6">Прогноз на {day.day} {MONTHS[day.month - 1]}</td></tr></tbody></table>')
+
+        value = self.actual('rumeteo', location, now)
+        report = (f'<div class="wrap_content"><div class="last-report"><div class="current-temp">'
+                  f'{_signed(value["temperature"])}°</div></div>'
+                  f'<div class="conditions"><ul><li class="condition-descr">{value["conditions"]}</li>'
+                  f'<li title="Ветер: {value["wind_speed"]:.0f} м/с, {WIND_DIRECTIONS[value["wind_direction"]].lower()}">'
+                  f'Ветер: {value["wind_speed"]:.0f} м/с, {WIND_DIRECTIONS[value["wind_direction"]].lower()}</li>'
+                  f'<li>Давление: {value["pressure"]:.0f} мм рт.ст.</li>'
+                  f'<li>Влажность воздуха: {value["humidity"]:.0f}%</li></ul></div>'
+                  f'<div class="ext"><ul><li>Горизонтал. видимость: <span>более 10 км</span></li></ul></div>'
+                  + ''.join(tables) + '</div>')
+
+        return self._page(f'rumeteo {location} {revision}', f'<div class="content">{report}</div>')
+
+    def rp5(self, location: str, revision: int, now: datetime) -> bytes:
+        start = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        forecast = self.forecast('rp5', location, revision, start, self.horizon)
+
+        def row(name: str, cells: List[str]) -> str:
+            return f'<tr><td class="forecastTable_title">{name}</td>' + ''.join(cells) + '<td></td></tr>'
+
+        def day(f: dict) -> str:
+            date = f['time']
+            prefix = 'Сегодня, ' + WEEKDAYS[date.weekday()].lower() if date.date() == now.date() else WEEKDAYS[date.weekday()]
+            return f'{prefix}, {date.day} {MONTHS[date.month - 1]}'
+
+        cloudiness = [f'<td><div class="cc_0"><div onmouseover="tooltip(this, \'&lt;b&gt;{f["conditions"].capitalize()}'
+                      f'&lt;/b&gt;&lt;br/&gt;({f["cloudiness"]:.0f}%)\', \'\')"></div></div></td>' for f in forecast]
+        precipitation = [f'<td><div class="pr_0" onmouseover="tooltip(this, \''
+                         + (f'Дождь ({f["precipitation"]:g} мм)' if f['precipitation'] else 'Без осадков') + '\')"></div></td>'
+                         for f in forecast]
+        rows = [
+            row('Дата', [f'<td>{day(f)}</td>' for f in forecast]),
+            row('Местное время', [f'<td>{f["time"]:%H}</td>' for f in forecast]),
+            row('Облачность, %', cloudiness),
+            row('Осадки, мм', precipitation),
+            row('Температура, °C', [f'<td>{_signed(f["temperature"])}</td>' for f in forecast]),
+            row('Давление, мм рт. ст.', [f'<td>{f["pressure"]:.0f}</td>' for f in forecast]),
+            row('Ветер: скорость, м/с', [f'<td>{f["wind_speed"]:.0f}</td>' for f in forecast]),
+            row('направление', [f'<td>{WIND_RP5[f["wind_direction"]]}</td>' for f in forecast]),
+            row('Влажность, %', [f'<td>{f["humidity"]:.0f}</td>' for f in forecast]),
+        ]
+        return self._page(f'rp5 {location} {revision}',
+                          '<table id="forecastTable_1_3" class="forecastTable">' + ''.join(rows) + '</table>')
+
+    def goodmeteo(self, location: str, revision: int, now: datetime, page: int = 0) -> bytes:
+        # page 0 - сегодня (с текущего часа) и текущая погода, page 1 - завтра
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        forecast = self.forecast('goodmeteo', location, revision, today, 48)
+        if page == 0:
+            forecast = [f for f in forecast[:24] if f['time'].hour >= now.hour]
+        else:
+            forecast = forecast[24:]
+
+        rows = [f'<tr><td>{f["time"]:%H:%M}</td><td>{_signed(f["temperature"], 1, comma=True)} C</td>'
+                f'<td>{_decimal(f["wind_speed"])} м/с, {WIND_DIRECTIONS[f["wind_direction"]]}</td>'
+                f'<td>{f["humidity"]:.0f}%</td><td>{f["pressure"]:.0f} мм</td><td>{f["cloudiness"]:.0f}%</td>'
+                f'<td>{"Без осадков" if not f["precipitation"] else f["conditions"].capitalize()}</td></tr>'
+                for f in forecast]
+        table = ('<table class="hourly"><thead><tr><th>Время</th><th>Температура</th><th>Ветер</th><th>Влажность</th>'
+                 '<th>Давление</th><th>Облачность</th><th>Осадки</th></tr></thead><tbody>' + ''.join(rows) + '</tbody></table>')
+
+        fact = ''
+        if page == 0:
+            value = self.actual('goodmeteo', location, now)
+            fact = (f'<div class="b_pogoda"><div class="det_pog_b1"><div class="det_pog_temp">{_signed(value["temperature"])}°</div>'
+                    f'<div class="det_pog_desc">{value["conditions"].capitalize()}</div></div><div class="det_pog_b2">'
+                    f'<div><span>Ветер</span><b>{_decimal(value["wind_speed"])} м/с, {WIND_DIRECTIONS[value["wind_direction"]]}</b></div>'
+                    f'<div><span>Влажность</span><b>{value["humidity"]:.0f}%</b></div>'
+                    f'<div><span>Давление</span><b>{value["pressure"]:.0f} мм рт. ст.</b></div></div></div>')
+
+        return self._page(f'goodmeteo {location} {revision} {page}', fact + table)
+
+    def page(self, provider: str, location: str, revision: int, now: datetime, number: int = 0) -> bytes:
+        if provider == 'goodmeteo':
+            return self.goodmeteo(location, revision, now, number)
+        return getattr(self, provider)(location, revision, now)
+
+
+class StandInServer:
+    '''
+    Локальный HTTP-стенд, отдающий синтетические страницы вместо источников.
+
+    Ревизия прогноза провайдера меняется раз в update_intervals[provider] секунд; в пределах ревизии
+    страница не меняется и отдается с ETag (повторный условный запрос получает 304).
+
+    Параметры:
+        generator           - генератор страниц (PageGenerator)
+        host, port          - адрес стенда (port=0 - свободный порт)
+        update_intervals    - период обновления прогноза провайдера, с
+        latency             - задержка ответа, с (имитация сети)
+        error_rate          - доля ответов 503
+        cache_size          - количество сгенерированных страниц, хранимых в памяти
+    '''
+    def __init__(self, generator: PageGenerator = None, host: str = '127.0.0.1', port: int = 0,
+                 update_intervals: Dict[str, float] = None, latency: float = 0.0, error_rate: float = 0.0,
+                 cache_size: int = 4096) -> None:
+        self.generator = generator or PageGenerator()
+        self.update_intervals = {**UPDATE_INTERVALS, **(update_intervals or {})}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.generator.seed)
+        self._render = lru_cache(maxsize=cache_size)(self._generate)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _generate(self, provider: str, location: str, revision: int, number: int) -> tuple:
+        # страница ревизии строится на момент начала ревизии - в пределах ревизии она не меняется
+        now = datetime.fromtimestamp(revision * self.update_intervals[provider])
+        content = self.generator.page(provider, location, revision, now, number)
+        return content, f'"{provider}-{zlib.crc32(location.encode()):08x}-{revision}-{number}"'
+
+    def resolve(self, path: str) -> tuple:
+        # путь стенда -> (провайдер, номер страницы, населенный пункт)
+        parts = urlsplit(path)
+        host, _, source_path = parts.path.lstrip('/').partition('/')
+        location = parse_qs(parts.query).get('location', ['ekaterinburg'])[0]
+        page = PAGES.get((host, '/' + source_path)) or PAGES.get((host, None))
+        if page is None:
+            return None, None, location
+        return page[0], page[1], location
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.requests += 1
+            failed = self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+
+        provider, number, location = self.resolve(request.path)
+        if provider is None or failed:
+            request.send_response(404 if provider is None else 503)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+
+        revision = int(time.time() // self.update_intervals[provider])
+        content, etag = self._render(provider, re.sub(r'[^\w-]', '', location), revision, number)
+
+        if request.headers.get('If-None-Match') == etag:
+            request.send_response(304)
+            request.send_header('ETag', etag)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(content)))
+        request.send_header('ETag', etag)
+        request.end_headers()
+        request.wfile.write(content)
+
+    def start(self) -> StandInServer:
+        # запуск в фоновом потоке
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.httpd.serve_forever()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve synthetic provider pages')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--horizon', type=int, default=72, help='forecast length, hours')
+    parser.add_argument('--noise', type=float, default=1.5, help='forecast error at 24h lead, degrees')
+    parser.add_argument('--padding', type=int, default=100_000, help='markup around data, bytes')
+    parser.add_argument('--latency', type=float, default=0.0, help='response delay, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 503 responses')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = StandInServer(PageGenerator(args.seed, args.horizon, args.noise, args.padding), port=args.port,
+                           latency=args.latency, error_rate=args.error_rate)
+    print(f"Serving synthetic pages at {server.url}")
+    server.serve_forever()
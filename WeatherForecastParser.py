@@ -1,23 +1,64 @@
-from bs4 import BeautifulSoup
-import requests
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+# тяжелые модули импортируются при первом использовании (см. LazyImport)
+bs4 = lazy_import('bs4')
+requests = lazy_import('requests')
+pd = lazy_import('pandas')
 
-import pandas as pd
-import re
 import os, platform
+import hashlib
 import warnings
 warnings.filterwarnings("ignore")
 
-from datetime import datetime, timedelta
-from calendar import monthrange
+from datetime import datetime
+from collections import Counter, OrderedDict
+from io import StringIO
+from urllib.parse import urlsplit
 import time
 
 from abc import ABC, abstractmethod
 
+from StructureMonitor import fingerprint
+
 from typing import Dict, List, Set, Callable, Union
 
+class FetchError(Exception):
+    # источник недоступен после всех попыток подключения
+    pass
+
+
+class LayoutDrift(Exception):
+    # отпечаток структуры страницы известен как нерабочий для парсера (см. StructureMonitor)
+    pass
+
+
+def is_network_error(e: Exception) -> bool:
+    # сетевые ошибки и временные ошибки сервера (5xx, 429) имеет смысл повторять, ошибки разбора страницы
+    # и остальные ответы с ошибкой (404, 403, ...) - нет
+    if isinstance(e, requests.HTTPError):
+        status = e.response.status_code if e.response is not None else None
+        return status is None or status >= 500 or status == 429
+    return isinstance(e, (requests.RequestException, ConnectionError, TimeoutError)) or \
+           (isinstance(e, OSError) and not isinstance(e, FileNotFoundError))
+
+
+def mirror_url(url: str, mirror: str = None, location: str = None) -> str:
+    # адрес страницы на зеркале источников: <mirror>/<host><path>?<query>&location=<location>
+    if not mirror:
+        return url
+    parts = urlsplit(url)
+    query = '&'.join(q for q in (parts.query, f'location={location}' if location else '') if q)
+    return f"{mirror.rstrip('/')}/{parts.netloc}{parts.path}" + (f'?{query}' if query else '')
+
+
 def reconnect(attempts=5, suspend_time=10) -> Callable:
     '''
-        Декоратор для повторения попыток подключения к источнику
+        Декоратор для повторения попыток подключения к источнику.
+        Повторяются только сетевые ошибки, остальные исключения пробрасываются сразу.
+        Атрибуты attempts и suspend_time объекта, метод которого декорирован, заменяют параметры декоратора
+        (Forecast.configure - значения из перечитываемой конфигурации).
 
         timeout_cnt - счетчик неудачных подключений
         attempts - количество попыток подключения
@@ -26,15 +67,23 @@ def reconnect(attempts=5, suspend_time=10) -> Callable:
     def _reconnect(func: Callable):
     
         def wrapper(*args, **kwargs):
+            owner = args[0] if args else None
+            limit = getattr(owner, 'attempts', None)
+            limit = attempts if limit is None else limit
+            pause = getattr(owner, 'suspend_time', None)
+            pause = suspend_time if pause is None else pause
+
             attempt = 0
-            while attempt < min(attempts, 30):
+            while attempt < min(limit, 30):
                 try:
                     return func(*args, **kwargs)
                 
                 except Exception as e:
+                    if not is_network_error(e):
+                        raise
                     attempt += 1
-                    print(f"Failed to connect. Attempt: {attempt}, error: {e}. Waiting {suspend_time}s and repeat...")
-                    time.sleep(suspend_time)
+                    print(f"Failed to connect. Attempt: {attempt}, error: {e}. Waiting {pause}s and repeat...")
+                    time.sleep(pause)
                     continue
 
             else:
@@ -53,13 +102,29 @@ class Forecast(ABC):
         get_data - получение обработанного прогноза погоды от источника
         save_data - сохранение обработанного прогноза в виде csv файла
     Дополнительные методы:
-        __get_forecast_raw - получение сырых данных от источника + повторные попытки 
+        _get_soup - загрузка страниц источника (_fetch) и построение дерева html
+        _fetch - загрузка страницы + повторные попытки при сетевых ошибках
+        configure - применение настроек провайдера (RuntimeConfig) во время работы
+        _field - извлечение одного поля прогноза с изоляцией ошибок
     Методы, которые нужно определить в дочерних классах:
         _get_data_from_source - получение сырых данных от источника 
-        _extract_data_from_forecast - извлечение из сырых данных информацию о прогнозе        
+        _extract_data_from_forecast - извлечение из сырых данных информацию о прогнозе
 
+    Провайдеры описываются спецификациями и выполняются дочерним классом ProviderRegistry.SpecForecast.
     '''
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36'}
+
+    archive = None  # архив сырых страниц (RawArchive/SegmentArchive); None - страницы не сохраняются
+    location = 'ekaterinburg'  # населенный пункт прогноза (ключ записей архива сырых страниц)
+    mirror = None  # адрес зеркала источников (например, стенд SyntheticPages); None - запросы к самим источникам
+    release_pages = False  # освобождать дерево разбора и страницы сразу после извлечения прогноза (режим демона)
+    max_page_size = None  # максимальный размер страницы, байт (дерево html5lib в разы больше страницы); None - без ограничения
+    monitor = None  # контроль структуры страниц (StructureMonitor); None - смена верстки не отслеживается
+    region = None  # целевой элемент страницы для отпечатка структуры: (tag, attrs), как в BeautifulSoup.find
+    limiter = None  # ограничение запросов к хостам (RuntimeConfig.HostLimiter); None - без ограничений
+    timeout = None  # время ожидания ответа источника, с; None - без ограничения
+    attempts = 5  # попыток подключения и пауза между ними, с (см. reconnect)
+    suspend_time = 10
     
     def __init__(self, provider: str, URL:str = None, **kwargs) -> None:
         """
@@ -69,15 +134,34 @@ class Forecast(ABC):
             get_and_save    - получение и сохранение данных без вызова дополнительных функций (по умолчанию False)
             data            - обработанный прогноз погоды (pandas dataframe)
             _log_prefix     - префикс для логгирования
-            soup            - содержимое ответа на запрос к URL (если указан URL)
+            soup            - содержимое ответа на запрос к URL (заполняется в get_data)
+            field_errors    - счетчик ошибок извлечения отдельных полей прогноза
+            issue_time      - время получения прогноза (опорное время для временных меток прогноза)
+            changed         - последний вызов get_data получил новый прогноз (а не тот же самый)
+
+        Создание объекта не выполняет сетевых запросов, страница запрашивается при вызове get_data.
         """
         self.URL = URL
         self.provider = provider
-        self.data = pd.DataFrame()
+        self.data = None
 
         self._log_prefix: str = provider.ljust(10) + '|'
         
-        self.soup = self._get_soup()
+        self.soup = None
+        self.field_errors: Counter = Counter()
+        self.issue_time: datetime = None
+
+        self._pages: List[tuple] = []                   # загруженные в текущем цикле страницы (url, content)
+        self._content_hash: str = None                  # хэш загруженных страниц
+        self._parse_failures: OrderedDict = OrderedDict()  # хэши страниц, которые не удалось разобрать
+        self._replay: Dict[str, bytes] = None           # сохраненные страницы для повторного разбора
+        self._fingerprints: List[str] = []              # отпечатки структуры загруженных страниц (при заданном monitor)
+
+        self.changed: bool = False
+        self._data_hash: str = None                     # хэш последнего полученного прогноза
+        self._validators: Dict[str, tuple] = {}         # url -> (ETag, Last-Modified, content) для условных запросов
+        self._not_modified: Set[str] = set()            # страницы текущего цикла, не изменившиеся на сервере (304)
+        self._defaults: Dict[str, object] = None         # значения настроек до первого configure
             
         if kwargs.get('get_and_save', None):
             self.get_data()
@@ -87,15 +171,197 @@ class Forecast(ABC):
         self.get_data()
         self.save_data()
 
-    def get_data(self) -> Union[None, pd.DataFrame]:
-        self.soup = self._get_soup()
-        forecast_raw = self._get_data_from_source()
-        self.data = self._extract_data_from_forecast(forecast_raw) if forecast_raw is not None else None
+    def get_data(self, pages: List[tuple] = None, issue_time: datetime = None) -> Union[None, pd.DataFrame]:
+        '''
+        pages       - ранее сохраненные страницы [(url, content)] для повторного разбора без сетевых запросов
+        issue_time  - время получения страниц (по умолчанию - текущее время)
+        '''
+        try:
+            return self._get_data(pages, issue_time)
+        finally:
+            if self.release_pages:
+                self._release_pages()
+
+    def _release_pages(self) -> None:
+        # дерево BeautifulSoup состоит из циклических ссылок и без decompose освобождается только сборщиком мусора
+        if self.soup is not None and hasattr(self.soup, 'decompose'):
+            self.soup.decompose()
+        self.soup = None
+        self._pages = [(url, None) for url, _ in self._pages]
+        self._replay = None
+
+    def _get_data(self, pages: List[tuple] = None, issue_time: datetime = None) -> Union[None, pd.DataFrame]:
+        previous = (self.data, self.issue_time, self._content_hash)
+
+        self.data = None
+        self.changed = False
+        self._pages = []
+        self._fingerprints = []
+        self._content_hash = None
+        self._not_modified = set()
+        self._replay = dict(pages) if pages is not None else None
+        self.issue_time = issue_time or datetime.now()
+
+        if self._monitored and self.monitor.blocked(self.provider):
+            print(f"{self._log_prefix} Page structure has changed, fetching paused until the parser is fixed")
+            return None
+
+        try:
+            self.soup = self._get_soup()
+        except FetchError as e:
+            print(f"{self._log_prefix} Failed to fetch {e}, no more trying")
+            return None
+        except LayoutDrift as e:
+            # страница сохраняется в архив для отладки и повторного разбора исправленным парсером
+            self._archive_pages()
+            print(f"{self._log_prefix} Page structure {e} is known to break the parser, skipping")
+            self._report_structure(False)
+            return None
+
+        if self._replay is None and self._pages and previous[0] is not None and \
+           (self._not_modified.issuperset(url for url, _ in self._pages) or self._content_hash == previous[2]):
+            # страницы не изменились - прогноз тот же, вместе с временем его получения
+            self.data, self.issue_time = previous[:2]
+            self._report_structure(True)
+            return self.data
+
+        self._archive_pages()
+
+        if self._content_hash in self._parse_failures:
+            # та же страница уже не разобралась - повторный разбор ничего не даст
+            print(f"{self._log_prefix} Page has not changed since failed parsing ({self._parse_failures[self._content_hash]}), skipping")
+            self._report_structure(False)
+            return None
+
+        field_errors = Counter(self.field_errors)
+        try:
+            forecast_raw = self._get_data_from_source()
+            self.data = self._extract_data_from_forecast(forecast_raw) if forecast_raw is not None else None
+        except Exception as e:
+            print(f"{self._log_prefix} Error while parsing forecast: {e}")
+            self._remember_parse_failure(e)
+
+        self._report_structure(self.data is not None, sorted(self.field_errors - field_errors))
+
+        if self.data is not None:
+            data_hash = hashlib.sha1(pd.util.hash_pandas_object(self.data.astype(str)).values.tobytes()).hexdigest()
+            self.changed = data_hash != self._data_hash
+            self._data_hash = data_hash
+
         return self.data
-    
+
+    @property
+    def _monitored(self) -> bool:
+        # отпечатки структуры снимаются только для загружаемых из сети страниц
+        return self.monitor is not None and self.region is not None and self._replay is None
+
+    def _report_structure(self, parsed: bool, field_errors: List[str] = None) -> None:
+        # результат разбора страниц для контроля структуры (см. StructureMonitor.report)
+        if self._fingerprints:
+            self.monitor.report(self.provider, self._fingerprints, parsed, field_errors)
+
+    def _archive_pages(self) -> None:
+        if self.archive is not None and self._replay is None and self._pages:
+            try:
+                self.archive.record(self.provider, self.issue_time, self._pages, location=self.location)
+            except Exception as e:
+                print(f"{self._log_prefix} Failed to archive raw pages: {e}")
+
+    def _remember_parse_failure(self, e: Exception, max_size: int = 32) -> None:
+        if self._content_hash is None:
+            return
+        self._parse_failures[self._content_hash] = f'{type(e).__name__}: {e}'
+        while len(self._parse_failures) > max_size:
+            self._parse_failures.popitem(last=False)
+
     @reconnect()
+    def _request(self, url: str) -> bytes:
+        # условный запрос: если сервер поддерживает ETag/Last-Modified, неизменившаяся страница не передается (304)
+        headers = dict(self.headers)
+        etag, last_modified, cached = self._validators.get(url, (None, None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        if self.limiter is not None:
+            with self.limiter.slot(url):
+                response = requests.get(mirror_url(url, self.mirror, self.location), headers=headers, timeout=self.timeout)
+        else:
+            response = requests.get(mirror_url(url, self.mirror, self.location), headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached is not None:
+            self._not_modified.add(url)
+            return cached
+        # ответ с ошибкой - не страница: 5xx и 429 повторяются (reconnect), остальные прерывают загрузку (FetchError)
+        response.raise_for_status()
+
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self._validators[url] = (etag, last_modified, response.content)
+        return response.content
+
+    def _fetch(self, url: str) -> bytes:
+        # загрузка страницы; все загруженные за цикл страницы учитываются в хэше ответа
+        if self._replay is not None:
+            content = self._replay.get(url)
+        else:
+            try:
+                content = self._request(url)
+            except requests.HTTPError as e:
+                raise FetchError(f'{url}: {e}')
+
+        if content is None:
+            raise FetchError(url)
+        if self.max_page_size and len(content) > self.max_page_size:
+            raise FetchError(f'{url}: page size {len(content)} exceeds {self.max_page_size} bytes')
+
+        self._pages.append((url, content))
+        self._content_hash = hashlib.sha1(b''.join(c for _, c in self._pages)).hexdigest()
+
+        if self._monitored:
+            # отпечаток снимается до построения дерева html: нерабочая верстка не разбирается
+            fp = fingerprint(content, self.region)
+            self._fingerprints.append(fp)
+            if self.monitor.known_bad(self.provider, fp):
+                raise LayoutDrift(fp)
+        return content
+
+    def configure(self, settings: dict) -> None:
+        # настройки провайдера из RuntimeConfig.provider; применяются между циклами, неизвестные ключи пропускаются;
+        # каждое применение начинается со значений по умолчанию: настройка, удаленная из файла, перестает действовать
+        if self._defaults is None:
+            self._defaults = {'URL': self.URL, 'region': self.region, 'headers': self.headers}
+        for name, value in self._defaults.items():
+            setattr(self, name, value)
+
+        if settings.get('url'):
+            self.URL = settings['url']
+        if settings.get('region'):
+            tag, attrs = settings['region']
+            self.region = (tag, attrs)
+        if settings.get('user_agent'):
+            self.headers = dict(self.headers, **{'User-Agent': settings['user_agent']})
+        for name in ('timeout', 'attempts', 'suspend_time'):
+            if name in settings:
+                setattr(self, name, settings[name])
+
+    def _html(self, number: int = 0) -> StringIO:
+        # загруженная страница для pandas.read_html (без повторного запроса к источнику)
+        return StringIO(self._pages[number][1].decode('utf-8', errors='replace'))
+
     def _get_soup(self):
-        return BeautifulSoup(requests.get(self.URL, headers=self.headers).content, 'html5lib') if self.URL else None
+        if not self.URL:
+            return None
+        return bs4.BeautifulSoup(self._fetch(self.URL), 'html5lib')
+
+    def _field(self, name: str, func: Callable, default=None):
+        # извлечение одного поля прогноза; ошибка дает пустое поле, остальные поля разбираются
+        try:
+            return func()
+        except Exception as e:
+            self.field_errors[name] += 1
+            print(f"{self._log_prefix} Error while parsing {name} (errors: {self.field_errors[name]}): {e}")
+            return default
     
     @abstractmethod
     def _get_data_from_source(self):
@@ -106,331 +372,88 @@ class Forecast(ABC):
         raise NotImplementedError()
     
         
-    def save_data(self) -> None:
-        now = datetime.now()
+    def save_data(self, root: str = '.') -> Union[None, str]:
+        # root - корневая директория хранилища прогнозов; возвращает имя сохраненного файла
+        # файл записывается во временный и заменяется целиком: после падения не остается недописанных прогнозов
+        now = self.issue_time or datetime.now()
+        directory = os.path.join(root, self.provider) if root != '.' else self.provider
         
         if platform.system()=='Windows':
-            filename = f'{self.provider}\\{now.strftime("%d%m%Y_%H%M")}.csv'
+            filename = f'{directory}\\{now.strftime("%d%m%Y_%H%M")}.csv'
         else:
-            filename = f'{self.provider}/{now.strftime("%d%m%Y_%H%M")}.csv'
+            filename = f'{directory}/{now.strftime("%d%m%Y_%H%M")}.csv'
         
-        if not os.path.exists(self.provider):
-            os.makedirs(self.provider)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
 
         if self.data is not None:
-            self.data.to_csv(filename)
+            self.data.to_csv(filename + '.tmp')
+            os.replace(filename + '.tmp', filename)
             print(f"{self._log_prefix} {str(now)} Data successfully saved to {filename}")
+            return filename
         else:
             print(f"{self._log_prefix} {str(now)} There are no forecast data to save")
-            
-class ForecastYandex(Forecast):
-    
-    def __init__(self, **kwargs) -> None:   
-        super().__init__('yandex', URL = "https://yandex.ru/pogoda/?lat=56.813158&lon=60.643738", **kwargs)
-
-    @reconnect()    
-    def _get_data_from_source(self) -> list:
-        forecast_raw = self.soup.find_all('ul', {'class': 'swiper-wrapper'})[0].text
-        return re.findall("(\d{1,2}:\d{2})((\+|\-)\d+)([^\,]*)", forecast_raw)
-    
-            
-    def _extract_data_from_forecast(self, forecast_raw: list) -> None:
-        forecast_raw = self.__check_time(forecast_raw)
-
-        forecast_list = [{'time': f[0], 
-                      'temperature': float(f[1]), 
-                      'conditions': re.search('([час]\S*\s)(.*)', f[-1])[2], 
-                      'message_debug': f[-1][1:]} for f in forecast_raw]
-
-        data = pd.DataFrame(forecast_list)
-        data.index = data.pop('time')
-
-        return data
-
-            
-    @staticmethod
-    def __trim_hour(forecast_string: str) -> tuple:
-        # обрезка часа до одной значащей цифры
-        wrong_item = list(forecast_string)
-        wrong_item[0] = wrong_item[0][-4:]
-        
-        return tuple(wrong_item)
-    
-    
-    @staticmethod
-    def __is_it_correct_delta(delta: timedelta) -> bool:
-        # проверка, что разница во времени корректна
-        allowed_values = (timedelta(days=0, hours=1), 
-                          timedelta(days=-1, hours=1))
-        
-        return delta in allowed_values
-
-
-    def __get_timedelta(self, value2: list, value1: list) -> timedelta:
-        # получение разницы во времени (формат '%H:%M') между двумя индексами
-        return datetime.strptime(value2[0], '%H:%M') - \
-                datetime.strptime(value1[0], '%H:%M')
-                
-                
-    def __check_time(self, forecast_list: list) -> list:
-        # Проверка, что все временные метки идут с разницей в 1 час + преобразование в формат datetime
-        date = datetime.now().date()
-        idxs = [datetime.strptime(forecast_list[0][0], '%H:%M').replace(date.year, date.month, date.day)] # первый индекс
-        
-        for i in range(len(forecast_list)-1):
+            return None
+
+
+def collect_forecasts(guard=None) -> None:
+    # сбор прогнозов всех провайдеров; guard - MemoryGuard режима демона (см. Daemon.py)
+    from RawArchive import open_archive
+    Forecast.archive = open_archive('raw')
+    from StructureMonitor import StructureMonitor
+    Forecast.monitor = StructureMonitor('structure/fingerprints.json')
+    # адреса, тайм-ауты, интервалы опроса и ограничения хостов перечитываются из config.json во время работы
+    from RuntimeConfig import RuntimeConfig, HostLimiter
+    config = RuntimeConfig('config.json')
+    Forecast.limiter = HostLimiter(config.hosts())
+    if guard is not None:
+        Forecast.release_pages = True
+        Forecast.max_page_size = Forecast.max_page_size or 10 * 2 ** 20
+
+    # провайдеры - спецификации реестра (встроенные и подключенные через entry points, см. ProviderRegistry.py)
+    from ProviderRegistry import available_providers, get_provider
+    forecasts = [get_provider(name) for name in available_providers()]
+
+    from ForecastEnsemble import EnsembleForecast
+    ensemble = EnsembleForecast()
+
+    # лента прогнозов для внешних потребителей (ForecastFeed.py), если установлен pyarrow
+    try:
+        from ForecastFeed import ForecastFeed
+        feed = ForecastFeed('feed', socket_path='feed/feed.sock' if platform.system() != 'Windows' else None)
+    except ImportError as e:
+        print(f"Forecast feed is disabled: {e}")
+        feed = None
+
+    def publish(forecast: Forecast) -> None:
+        if feed is not None:
             try:
-                delta = self.__get_timedelta(forecast_list[i+1], forecast_list[i])
-
-            except: # если неправильно распознались границы времени
-                forecast_list[i+1] = self.__trim_hour(forecast_list[i+1])
-                delta = self.__get_timedelta(forecast_list[i+1], forecast_list[i])
-                
-            if not self.__is_it_correct_delta(delta):
-                # если неправильно распознались границы времени 
-                forecast_list[i+1] = self.__trim_hour(forecast_list[i+1]) 
-                delta = self.__get_timedelta(forecast_list[i+1], forecast_list[i])
-                
-                if not self.__is_it_correct_delta(delta): # если обрезка не помогла
-                    raise AttributeError(f"Wrong time sequence: {forecast_list[i][0]}, {forecast_list[i+1][0]}")
-                    
-            # переход на следующий день
-            if delta == timedelta(days=-1, hours=1):
-                date += timedelta(days=1)
-            
-            idxs.append(datetime.strptime(forecast_list[i+1][0], '%H:%M').replace(date.year, date.month, date.day))
-                        
-        return [(str(dt), *forecast[1:]) for forecast, dt in zip(forecast_list, idxs)]
-            
-            
-class ForecastRumeteo(Forecast):
-    
-    def __init__(self, **kwargs) -> None:
-        super().__init__('rumeteo', URL = "https://ru-meteo.ru/ekaterinburg/hour", **kwargs)
-
-    @reconnect()    
-    def _get_data_from_source(self) -> pd.DataFrame:
-        forecast_table = pd.read_html(self.URL, encoding="UTF-8", header=0)
-        forecast = self.__forecast_from_table(forecast_table[0])
-            
-        for i, table in enumerate(forecast_table[1:]):
-            # данные по разным дням находятся в разных таблицах
-            next_forecast = self.__forecast_from_table(table, i)
-            forecast = pd.concat([forecast, next_forecast])  
-
-        return forecast
-        
-    @staticmethod
-    def _extract_data_from_forecast(forecast_raw: pd.DataFrame) -> pd.DataFrame:
-        data = pd.DataFrame()
-        data['temperature'] = forecast_raw['column0'].apply(lambda x: re.search('(\+|\-)\d+\.?\d?', x)[0])
-        data['conditions'] = forecast_raw['column1'].apply(lambda x: x.replace(',', ''))
-        data['precipitation'] = forecast_raw['Осадки']
-
-        try:
-            data['wind_speed'] = forecast_raw['Ветер'].apply(lambda x: int(re.search('\d{1,2}', x)[0]))
-            data['wind_direction'] = forecast_raw['Ветер'].apply(lambda x: x.split(', ')[1])
-        except TypeError:
-            print(f"Exception while parsing wind info from forecast: {forecast_raw}")
-            data['wind_speed'] = 0
-            data['wind_direction'] = None
-
-        data['pressure'] = forecast_raw['Давление']
-        data['humidity'] = forecast_raw['Влажность'].apply(lambda x: int(re.search('\d{2,3}', x)[0]))  
-
-        return data
-          
-      
-    @staticmethod
-    def __forecast_from_table(forecast: pd.DataFrame, add_day: int =-1) -> pd.DataFrame:
-        # Получение данных из таблицы за определенный день
-        out = forecast.drop(forecast.shape[0]-1).dropna(how='all', axis=1)
-        out.index = out[out.columns[0]].apply(lambda x: pd.to_datetime(re.search('\d{2}\:\d{2}', x)[0]) + pd.to_timedelta(f'{add_day+1}D'))
-        out.index.name = 'time'
-        out.columns = ['column0', 'column1', 'Осадки', 'Ветер', 'Давление', 'Влажность']
-    
-        return out    
-            
-
-class ForecastRp5(Forecast):
-    
-    def __init__(self, **kwargs) -> None: 
-        self._forecast_table = 'forecastTable_1_3'
-        super().__init__(
-            'rp5', 
-            URL = "https://rp5.ru/%D0%9F%D0%BE%D0%B3%D0%BE%D0%B4%D0%B0_%D0%B2_%D0%95%D0%BA%D0%B0%D1%82%D0%B5%D1%80%D0%B8%D0%BD%D0%B1%D1%83%D1%80%D0%B3%D0%B5", 
-            **kwargs
-            )                
-    
-    def _extract_data_from_forecast(self, forecast_raw: pd.DataFrame) -> None:
-        data = pd.DataFrame()
-        data['temperature'] = forecast_raw['Температура, °C']
-        data['wind_speed'] = forecast_raw['Ветер: скорость, м/с']
-        data['wind_direction'] = forecast_raw['направление']
-        data['pressure'] = forecast_raw['Давление, мм рт. ст.']
-
-        data_len = data.shape[0] # Для контроля равенства длин основого и дополнительного прогнозов
-
-        conditions, cloudiness = self.__get_cloudiness()
-        data['conditions'] = conditions[-data_len:]
-        data['cloudiness'] = cloudiness[-data_len:]
-
-        precipitation, precipitation_info = self.__get_precipitation()
-        data['precipitation'] = precipitation[-data_len:]
-        data['precipitation_info'] = precipitation_info[-data_len:]
-        data['humidity'] = self.__get_humidity()[-data_len:]
-
-
-        data.index = self.__get_datetime_indexes(forecast_raw.index, forecast_raw['Местное время'])
-        data.index.name = 'time'    
-
-        return data
-        
-    @reconnect()    
-    def _get_data_from_source(self) -> None:        
-        forecast = pd.read_html(self.URL, encoding="UTF-8", header = 0, attrs = {'id': self._forecast_table})[0]
-        forecast.index = forecast.iloc[:, 0]
-        forecast = forecast.iloc[:, 1:-1].T 
-            
-        return forecast    
-      
-        
-    def __get_datetime_indexes(self, day_index: list, hour: list) -> list:
-        # преобразование индексов у прогноза в формат datetime
-        days = [re.search('\d{1,2}\s\w+', x)[0] for x in day_index]
-        now = datetime.now()
-
-        days_before_end = monthrange(now.year, now.month)[1] - now.day
-
-        days_diff = [int(day.split()[0]) - now.day if int(day.split()[0]) >= now.day else \
-                     int(day.split()[0]) + days_before_end for day in days]
-
-        index = [datetime.strptime(f"{now.year}-{now.month}-{now.day} {h}:00", '%Y-%m-%d %H:%M') +\
-                 timedelta(days=d) for d, h in zip(days_diff, hour)]
-
-        return index
-    
-    def __get_hours(self, raw_number: int = 1) -> tuple:
-        # извлечение часов в сутках (для отладки)
-        table = self.soup.find('table', {'id': self._forecast_table}).find_all('tr')[raw_number].find_all('td')[1:-1]
-        result = []
-        
-        for i in range(len(table)):
-            try:
-                result.append(table[i].text)       
-
+                feed.publish(forecast)
             except Exception as e:
-                print(f'{self._log_prefix} Error while parsing hours in table column {i}:', e)
-                result.append(None)
-                continue
-                
-        return result
-    
-    def __get_cloudiness(self, raw_number: int = 2) -> tuple:
-        '''
-        Извлечение облачности. 
-        raw_number - номер строки с данными в таблице прогноза
-        '''
-        table = self.soup.find('table', {'id': self._forecast_table}).find_all('tr')[raw_number].find_all('td')[1:-1]
-        result = {'brief': [], 'detailed': []}
-        
-        for i, element in enumerate(table):
-            try:
-                result_raw = element.find('div', {'class': 'cc_0'}).find_all('div')[0]['onmouseover']  
-                result_info = re.search("<b>(.+)</b><br/>\(([^')]+)", result_raw)
-                result['brief'].append(result_info[1] if result_raw else None)
-                result['detailed'].append(result_info[2] if result_raw else None)         
+                print(f"{forecast._log_prefix} Failed to publish forecast to the feed: {e}")
+
+    def on_update(forecast: Forecast) -> None:
+        # новый прогноз провайдера сразу публикуется в ленту и обновляет консенсус
+        publish(forecast)
+        ensemble.add(forecast)
+        ensemble.get_data()
+        # консенсус записывается и публикуется, только если он изменился
+        if ensemble.changed:
+            ensemble.save_data()
+            publish(ensemble)
+
+    # каждый провайдер опрашивается по своему расписанию обновлений (см. Scheduler.py)
+    # журнал заданий: после падения повторяются только прерванные опросы (см. CycleJournal.py)
+    from Scheduler import Scheduler
+    from CycleJournal import CycleJournal
+    try:
+        Scheduler(forecasts, on_update=on_update, config=config,
+                  journal=CycleJournal('journal/forecasts.jsonl')).run(stop=guard.after_cycle if guard else None)
+    finally:
+        if feed is not None:
+            feed.close()
 
-            except Exception as e:
-                print(f'{self._log_prefix} Error while parsing cloudiness in table column {i}:', e)
-                result['brief'].append(None)
-                result['detailed'].append(None)
-                continue
-                
-        return result['brief'], result['detailed']
-    
-    def __get_precipitation(self, raw_number: int = 3) -> tuple:
-        # извлечение осадков. raw_number - номер строки с данными в таблице прогноза
-        table = self.soup.find('table', {'id': self._forecast_table}).find_all('tr')[raw_number].find_all('td')[1:-1] # Осадки
-        result = {'brief': [], 'detailed': []}
-        
-        for i in range(len(table)):
-            try:
-                result_raw = table[i].find('div', {'class': 'pr_0'})['onmouseover']
-                result_info = re.search("((?:\w+\s?)+)(\(.+\))?", result_raw.split(", '")[1])
-                result['brief'].append(result_info[1] if result_raw else None)
-                result['detailed'].append(result_info[2] if result_info[2] else None)       
-
-            except Exception as e:
-                print(f'{self._log_prefix} Error while parsing precipitation in table column {i}:', e)
-                result['brief'].append(None)
-                result['detailed'].append(None)
-                continue
-                
-        return result['brief'], result['detailed']
-    
-    def __find_forecast_row_by_name(self, name: str) -> int: 
-        # поиск в таблице прогноза индекса строки с заданным параметром
-        for row in self.soup.find('table', {'id': self._forecast_table}).find_all('tr'):
-            if row.find_all('td')[0].text.lower().find(name) != -1:
-                return row
-        
-    def __get_humidity(self) -> list:
-        # извлечение влажности
-
-        table = self.__find_forecast_row_by_name('влажность').find_all('td')[1:-1]
-        result = []
-        
-        for i in range(len(table)):
-            try:
-                result.append(table[i].text)       
-
-            except Exception as e:
-                print(f'{self._log_prefix} Error while parsing humidity in table column {i}:', e)
-                result.append(None)
-                continue
-                
-        return result
-        
-        
-class ForecastGoodmeteo(Forecast):    
-    
-    def __init__(self, **kwargs) -> None:
-        super().__init__('goodmeteo', **kwargs)
-        
-    @staticmethod
-    def _extract_data_from_forecast(forecast_raw: pd.DataFrame) -> pd.DataFrame:
-        data = pd.DataFrame()
-        data['temperature'] = forecast_raw['Температура'].apply(lambda x: float(re.search('\-?\d{1,2}(,|.)\d', x)[0].replace(',','.')))
-        data['wind_direction'] = forecast_raw['Ветер'].apply(lambda x: x.split(', ')[1])
-        data['wind_speed'] = forecast_raw['Ветер'].apply(lambda x: float(re.search('\d{1,2}(,|.)?\d?', x)[0].replace(',','.')))
-        data['humidity'] = forecast_raw['Влажность'].apply(lambda x: int(re.search('\d{1,2}', x)[0]))
-        data['pressure'] = forecast_raw['Давление'].apply(lambda x: int(re.search('\d{3}', x)[0]))
-        data['cloudiness'] = forecast_raw['Облачность'].apply(lambda x: int(re.search('\d{1,2}', x)[0]))
-        data['conditions'] = forecast_raw['Осадки']
-        return data
-
-    @reconnect()    
-    def _get_data_from_source(self) -> pd.DataFrame:
-        URL = "https://goodmeteo.ru/pogoda-ekaterinburg/"
-        today = pd.read_html(URL, encoding="UTF-8", header=0, index_col=0, parse_dates=True)[0]
-
-        URL = "https://goodmeteo.ru/pogoda-ekaterinburg/zavtra/"
-        tomorrow = pd.read_html(URL, encoding="UTF-8", header=0, index_col=0, parse_dates=True)[0]
-        tomorrow.index = tomorrow.index + pd.Timedelta('1D') 
-
-        return pd.concat([today, tomorrow])
-        
 
 if __name__ == '__main__':  
-    rp5 = ForecastRp5()
-    yandex = ForecastYandex()
-    goodmeteo = ForecastGoodmeteo()
-    rumeteo = ForecastRumeteo()  
-
-    while True:
-        rp5.get_and_save_data()
-        yandex.get_and_save_data()
-        goodmeteo.get_and_save_data()
-        rumeteo.get_and_save_data()
-
-        time.sleep(3600)
\ No newline at end of file
+    from Daemon import main
+    main(collect_forecasts)
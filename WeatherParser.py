@@ -1,15 +1,73 @@
-from bs4 import BeautifulSoup
-import requests
+from __future__ import annotations
+
+from LazyImport import lazy_import
+
+# тяжелые модули импортируются при первом использовании (см. LazyImport)
+bs4 = lazy_import('bs4')
+requests = lazy_import('requests')
+pd = lazy_import('pandas')
 
-import pandas as pd
 import re
 import os
+from io import BytesIO
 
 from datetime import datetime
 import time   
 
 from typing import Dict, List, Set, Callable
+
+from WeatherForecastParser import mirror_url
+from FieldTokenizer import FieldTokenizer, find_blocks, labelled, number, integer
+
+# адрес зеркала источников (например, стенд SyntheticPages); None - запросы к самим источникам
+MIRROR: str = None
+
+# адреса страниц фактических данных и параметры запросов (заменяются настройками RuntimeConfig, см. configure)
+URLS: Dict[str, str] = {
+    'goodmeteo': "https://goodmeteo.ru/pogoda-ekaterinburg/",
+    'rumeteo': "https://ru-meteo.ru/ekaterinburg/hour",
+    'yandex': "https://yandex.ru/pogoda/?lat=56.813158&lon=60.643738",
+}
+DEFAULT_URLS = dict(URLS)  # адреса, действующие, когда в конфигурации адрес не задан
+TIMEOUT: float = None
+HEADERS: Dict[str, str] = {}
+LOCATION = 'ekaterinburg'  # населенный пункт (ключ заданий журнала CycleJournal)
         
+# поля фактических данных в порядке колонок actual_report.csv
+FIELDS = ['time', 'provider', 'temperature', 'conditions', 'wind_speed', 'wind_direction', 'humidity', 'pressure', 'visibility']
+
+# каталог шаблонов: компилируются один раз при импорте, все поля блока извлекаются за один проход (см. FieldTokenizer)
+TYPES = {'temperature': integer, 'wind_speed': number, 'humidity': integer, 'pressure': integer}
+
+GOODMETEO = FieldTokenizer({
+    'temp': r'^температура:\s*(?P<temperature>[+\-−]?\d{1,2})',
+    'desc': r'^описание:[^а-яё\n]*(?P<conditions>[а-яё ]+)',
+    'wind': r'^ветер[^:\n]*:\s*(?P<wind_speed>\d{1,2}(?:[,.]\d)?)[^,\n]*(?:,\s*(?P<wind_direction>[^\n]+))?',
+    'humidity': r'^влажность[^:\n]*:\D*(?P<humidity>\d{2,3})',
+    'pressure': r'^давление[^:\n]*:\D*(?P<pressure>\d{3})',
+}, TYPES, re.I | re.M)
+
+RUMETEO = FieldTokenizer({
+    'temp': r'^температура:\s*(?P<temperature>[+\-−]?\d{1,2})',
+    'desc': r'^описание:\s*(?P<conditions>[^\n]*)',
+    'wind': r'^ветер:\s*(?:ветер:?\s*)?(?:(?P<wind_speed>\d+)\s*м/с,\s*)?(?P<wind_direction>[- а-яё,]*)',
+    'pressure': r'давление:\s*(?P<pressure>\d{3})',
+    'humidity': r'влажность\s[а-яё]+:\s*(?P<humidity>\d{2,3})',
+    'visibility': r'^видимость:\s*(?P<visibility>[^\n]+)',
+}, dict(TYPES, wind_direction=str.lower), re.I | re.M)
+
+RUMETEO_WIND = re.compile('Ветер.*')
+
+YANDEX = FieldTokenizer({
+    # 'Сейчас +5°, ощущается как +2°, Пасмурно.' - одно совпадение на строку, поэтому один токен
+    'now': r'^сейчас:\D*?(?P<temperature>[+\-−]?\d+)°(?:[^,\n]*,[^,\n]*,\s*(?P<conditions>[^\n]*?)\.?$)?',
+    'wind': r'^ветер:\s*(?P<wind_speed>\d+(?:[,.]\d+)?)',
+    'direction': r'^направление:\s*(?P<wind_direction>[^\n]+)',
+    'humidity': r'^влажность:\D*(?P<humidity>\d{2,3})',
+    'pressure': r'^давление:\D*(?P<pressure>\d{3})',
+}, dict(TYPES, conditions=str.lower), re.I | re.M)
+
+
 def get_data(func: Callable) -> Callable:
     # Декоратор для повторения попыток подключения к источнику
     def wrapper(timeout_cnt=0, attempts=5, suspend_time=10):
@@ -32,216 +90,249 @@ def get_data(func: Callable) -> Callable:
             print(f"{func} failed to connect. Attempt: {timeout_cnt}, error: {e}. Waiting {suspend_time}s and repeat...")
             time.sleep(suspend_time)
                 
-            wrapper(timeout_cnt=timeout_cnt)
+            return wrapper(timeout_cnt=timeout_cnt, attempts=attempts, suspend_time=suspend_time)
         
     return wrapper
-        
-        
-@get_data        
-def get_fact_weather_goodmeteo() -> dict:
-    result = {}
-    log_prefix = 'goodmeteo'
-    URL = "https://goodmeteo.ru/pogoda-ekaterinburg/"
-    soup = BeautifulSoup(requests.get(URL).content, 'html5lib')
-    data = soup.find_all('div', {'class': 'b_pogoda'})
-    
-    
+
+
+def _soup(url: str):
+    response = requests.get(mirror_url(url, MIRROR), headers=HEADERS, timeout=TIMEOUT)
+    response.raise_for_status()  # страница с ошибкой не разбирается, попытка повторяется (get_data)
+    return bs4.BeautifulSoup(response.content, 'html5lib')
+
+
+def configure(config) -> List[str]:
+    # настройки сбора фактических данных из RuntimeConfig; возвращает включенных провайдеров
+    global TIMEOUT, HEADERS
+    defaults = config.data['defaults']
+    TIMEOUT = defaults.get('timeout')
+    HEADERS = {'User-Agent': defaults['user_agent']} if defaults.get('user_agent') else {}
+    for provider in URLS:
+        # адрес, удаленный из файла конфигурации, возвращается к адресу по умолчанию
+        URLS[provider] = config.actual(provider).get('url') or DEFAULT_URLS[provider]
+    return [provider for provider in URLS if config.actual(provider)['enabled']]
+
+
+def _result(provider: str, fields: dict) -> dict:
+    # все поля в порядке колонок файла, отсутствующие - None
+    fields = dict(fields, time=str(datetime.now()), provider=provider)
+    return {name: fields.get(name) for name in FIELDS}
+
+
+def _text(element) -> str:
+    return element.get_text() if element is not None else None
+
+
+def extract_goodmeteo(soup) -> dict:
+    data = find_blocks(soup, 'div', 'b_pogoda')
+
     if len(data)==0:
         raise Exception('There are no data received from URL')
 
+    fields = {}
     for element in data:
-        result['time'] = str(datetime.now())
-        result['provider'] = 'goodmeteo'
-        
+        # текст каждого узла вычисляется один раз, все поля блока - за один проход
+        items = []
         det_pog_b1 = element.find('div', {'class': 'det_pog_b1'})
-        
         if det_pog_b1:
-            det_pog_temp = det_pog_b1.find('div', {'class': 'det_pog_temp'})
-            if det_pog_temp:
-                result['temperature'] = re.search('(\+|\-)?\d{1,2}', det_pog_temp.text)[0]
-                
-            det_pog_desc = det_pog_b1.find('div', {'class': 'det_pog_desc'})
-            if det_pog_desc:
-                result['conditions'] = re.search('([а-яА-Я ])+', det_pog_desc.text)[0].strip()
-                
+            items.append(('температура', _text(det_pog_b1.find('div', {'class': 'det_pog_temp'}))))
+            items.append(('описание', _text(det_pog_b1.find('div', {'class': 'det_pog_desc'}))))
+
         det_pog_b2 = element.find('div', {'class': 'det_pog_b2'})
-        
         if det_pog_b2:
-            for element in det_pog_b2.find_all('div'):
-                if element.span.text.lower().find('ветер') != -1:
-                    try:
-                        text = element.b.text.split(', ')
-                        result['wind_speed'] = re.search('\d{1,2}(\,|\.)?\d?', text[0])[0]
-                        result['wind_direction'] = text[1] if len(text) > 1 else None
-                        
-                    except Exception as e:
-                        print(f'{log_prefix} Error parsing wind, string: {element.b.text}')
-                        print(f'{log_prefix} {e}')
-                        result['wind_speed'] = None
-                        result['wind_direction'] = None
-                        
-                    continue
-
-                elif element.span.text.lower().find('влажность') != -1:
-                    try:
-                        result['humidity'] = re.search('\d{2}', element.b.text)[0]
-                        
-                    except Exception as e:
-                        print(f'{log_prefix} Error parsing humidity, string: {element.b.text}')
-                        print(f'{log_prefix} {e}')
-                        result['humidity'] = None
-                    
-                    continue
-
-                elif element.span.text.lower().find('давление') != -1:
-                    try:
-                        result['pressure'] = re.search('\d{3}', element.b.text)[0]
-                    except Exception as e:
-                        print(f'{log_prefix} Error parsing pressure, string: {element.b.text}')
-                        print(f'{log_prefix} {e}')
-                        result['pressure'] = None
-                        
-                    continue 
-
-    return result
+            items.extend((div.span.get_text(), div.b.get_text()) for div in det_pog_b2.find_all('div')
+                         if div.span is not None and div.b is not None)
+
+        fields.update(GOODMETEO(labelled(items)))
+
+    return _result('goodmeteo', fields)
+
+
+def extract_rumeteo(soup) -> dict:
+    data = find_blocks(soup, 'div', 'content')
 
-@get_data
-def get_fact_weather_rumeteo() -> dict:
-    result = {}
-    log_prefix = 'rumeteo'
-    URL = "https://ru-meteo.ru/ekaterinburg/hour"
-    soup = BeautifulSoup(requests.get(URL).content, 'html5lib')
-    data = soup.find_all('div', {'class': 'content'})
-    
     if len(data)==0:
-        raise Exception(f'{log_prefix} There are no data received from URL')
+        raise Exception('rumeteo There are no data received from URL')
 
+    fields = {}
     for element in data:
-        result['time'] = str(datetime.now())
-        result['provider'] = 'rumeteo'
-        
-        last_report = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'last-report'})
-        
+        wrap_content = element.find('div', {'class': 'wrap_content'})
+        if wrap_content is None:
+            continue
+
+        items = []
+        last_report = wrap_content.find('div', {'class': 'last-report'})
         if last_report:
-            temp = last_report.find('div', {'class': 'current-temp'})      
-            result['temperature'] = re.search('(\+|\-)?\d{1,2}', temp.text)[0] if temp else None
-                
-        conditions = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'conditions'})
-        
-        if conditions:
-            result['conditions'] = conditions.find('li', {'class': 'condition-descr'}).text
+            items.append(('температура', _text(last_report.find('div', {'class': 'current-temp'}))))
 
-            wind = conditions.find('li', {'title': re.compile('Ветер.*')}).text
-            
-            if re.search('\d+', wind) == None:
-                result['wind_speed'] = 0
-                result['wind_direction'] = wind
-            
-            else:
-                wind = re.search('(\d+)\s\м\/\с\,\s([- а-я,]*)', wind.lower())
+        conditions = wrap_content.find('div', {'class': 'conditions'})
+        if conditions:
+            descr = conditions.find('li', {'class': 'condition-descr'})
+            wind = conditions.find('li', {'title': RUMETEO_WIND})
+            items.append(('описание', _text(descr)))
+            items.append(('ветер', _text(wind)))
+            items.extend(('', li.get_text()) for li in conditions.find_all('li') if li is not descr and li is not wind)
 
-            try:
-                result['wind_speed'] = wind[1]
-                result['wind_direction'] = wind[2]
-                
-            except Exception as e:
-                print(f'{log_prefix} Error parsing wind, string: {conditions.text}')
-                print(log_prefix, e)
-                result['wind_speed'] = None
-                result['wind_direction'] = None
-                
-            try:
-                result['pressure'] = re.search('давление:\s(\d{3})', conditions.text.lower())[1]
-                
-            except Exception as e:
-                print(f'{log_prefix} Error parsing pressure, string: {conditions.text}')
-                print(log_prefix, e)
-                result['pressure'] = None
-                
-            try:
-                result['humidity'] = re.search('влажность\s[а-я]+\:\s*(\d{2,3})', conditions.text.lower())[1]
-                
-            except Exception as e:
-                print(f'{log_prefix }Error parsing humidity, string: {conditions.text}')
-                print(log_prefix, e)
-                result['humidity'] = None
-                            
-        
-        ext = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'ext'})
+        ext = wrap_content.find('div', {'class': 'ext'})
         if ext:
-            try:
-                for s in ext.find_all('li'):
-                    if s.text.lower().find('видимость'):
-                        result['visibility'] = s.span.text
-                        break
+            for li in ext.find_all('li'):
+                text = li.get_text()
+                if 'видимость' in text.lower() and li.span is not None:
+                    items.append(('видимость', li.span.get_text()))
+                    break
 
-            except Exception as e:
-                print(f'{log_prefix} Error parsing visibility, string: {ext.text}')
-                print(log_prefix, e)
-                result['visibility'] = None
+        found = RUMETEO(labelled(items))
+        if 'wind_direction' in found and 'wind_speed' not in found:
+            found['wind_speed'] = 0  # штиль: скорость не указана
+        fields.update(found)
 
-    return result
+    return _result('rumeteo', fields)
+
+
+def extract_yandex(soup) -> dict:
+    data = find_blocks(soup, 'div', 'card_size_big')
 
-@get_data
-def get_fact_weather_yandex() -> dict:
-    result = {}
-    log_prefix = 'yandex'
-    URL = "https://yandex.ru/pogoda/?lat=56.813158&lon=60.643738"
-    soup = BeautifulSoup(requests.get(URL).content, 'html5lib')
-    data = soup.find_all('div', {'class': 'card_size_big'})
-    
     if len(data)==0:
-        raise Exception(f'{log_prefix} There are no data received from URL')
+        raise Exception('yandex There are no data received from URL')
 
+    fields = {}
     for element in data:
-        result['time'] = str(datetime.now())
-        result['provider'] = 'yandex'
-        
+        items = []
         fact_temp = element.find('div', {'class': 'fact__temp-wrap'})
-
-        if fact_temp:
-            x = fact_temp.find('a')['aria-label'].split(',')
-            result['temperature'] = re.search('(\+|\-)?\d+', x[0])[0]
-            result['conditions'] = x[2][:-1].lower()
-        else:
-            result['temperature'] = None
-            result['conditions'] = None
+        link = fact_temp.find('a') if fact_temp else None
+        if link is not None:
+            items.append(('сейчас', link.get('aria-label')))
 
         fact_wind = element.find('div', {'class': 'fact__wind-speed'})
-        result['wind_speed'] = fact_wind.find('span', {'class': 'wind-speed'}).text.replace(',', '.') if fact_wind else None
-        result['wind_direction'] = fact_wind.find('abbr').text if fact_wind else None
+        if fact_wind:
+            items.append(('ветер', _text(fact_wind.find('span', {'class': 'wind-speed'}))))
+            items.append(('направление', _text(fact_wind.find('abbr'))))
 
-        fact_humidity = element.find('div', {'class': 'fact__humidity'})
-        result['humidity'] = re.search('\d{2,3}',fact_humidity.text)[0] if fact_humidity else None
+        items.append(('влажность', _text(element.find('div', {'class': 'fact__humidity'}))))
+        items.append(('давление', _text(element.find('div', {'class': 'fact__pressure'}))))
 
-        fact_pressure = element.find('div', {'class': 'fact__pressure'})
-        result['pressure'] = re.search('\d{3}',fact_pressure.text)[0] if fact_pressure else None
+        fields.update(YANDEX(labelled(items)))
 
+    return _result('yandex', fields)
 
-    return result
 
+@get_data        
+def get_fact_weather_goodmeteo() -> dict:
+    return extract_goodmeteo(_soup(URLS['goodmeteo']))
 
+@get_data
+def get_fact_weather_rumeteo() -> dict:
+    return extract_rumeteo(_soup(URLS['rumeteo']))
+
+@get_data
+def get_fact_weather_yandex() -> dict:
+    return extract_yandex(_soup(URLS['yandex']))
+
+
+COLLECTORS = {'goodmeteo': get_fact_weather_goodmeteo, 'rumeteo': get_fact_weather_rumeteo, 'yandex': get_fact_weather_yandex}
 
 
-if __name__ == '__main__':    
+def _append_csv(data: pd.DataFrame, filename: str) -> None:
+    # дописывание строк со сбросом на диск: отметка о выполнении задания в журнале пишется только после записи
+    header = not os.path.exists(filename)
+    with open(filename, 'a', encoding='utf-8', newline='') as f:
+        data.to_csv(f, header=header)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def collect_actuals(guard=None) -> None:
+    # сбор фактических данных раз в час; guard - MemoryGuard режима демона (см. Daemon.py)
     filename = 'actual_report.csv'
+
+    from ObservationAggregates import ObservationAggregates
+    from ObservationReconciliation import reconcile
+    aggregates = ObservationAggregates.load('aggregates/actual.npz')
+    from ErrorIndex import LeadTimeErrorIndex
+    error_index = LeadTimeErrorIndex.load('ensemble/error_index.json')
+    reconciled_filename = 'actual_reconciled.csv'
+
+    # период сбора, провайдеры, адреса и попытки подключения перечитываются из config.json во время работы
+    from RuntimeConfig import RuntimeConfig
+    config = RuntimeConfig('config.json')
+
+    # журнал заданий (provider, location, период сбора): после падения строки прерванного цикла удаляются
+    # из файлов, и повторяются только невыполненные задания текущего периода (см. CycleJournal.py)
+    from CycleJournal import CycleJournal, DONE, FAILED, SAVED, file_size, rollback
+    from FileTail import FileTail
+    journal = CycleJournal('journal/actual.jsonl')
+    journal.recover([filename, reconciled_filename])
     
     while True:
-        reports = [get_fact_weather_goodmeteo(), 
-                   get_fact_weather_rumeteo(), 
-                   get_fact_weather_yandex()]
+        window = journal.window(time.time(), config.data['actual']['interval'])
+        providers = journal.pending(configure(config), LOCATION, window)
+
+        # строка согласованной оценки периода одна: при повторном опросе в том же периоде (перезапуск, не все
+        # провайдеры ответили) она заменяется оценкой по всем строкам периода, а не дописывается вторая;
+        # в журнале - размеры файлов (байт) в начале периода: начало строк периода в обоих файлах
+        period = journal.jobs.get(('reconciled', LOCATION, window))
+        if period is None:
+            period = journal.record('reconciled', LOCATION, window, SAVED, actual_offset=file_size(filename),
+                                    reconciled_offset=file_size(reconciled_filename))
 
-        data = pd.DataFrame([x for x in reports if x is not None])
+        for provider in providers:
+            journal.start(provider, LOCATION, window, files=[filename, reconciled_filename])
+
+        defaults = config.data['defaults']
+        reports = {provider: COLLECTORS[provider](attempts=defaults['attempts'], suspend_time=defaults['suspend_time'])
+                   for provider in providers}
+
+        data = pd.DataFrame([x for x in reports.values() if x is not None])
         try:
             data.time = data.time.apply(pd.to_datetime)
             data.index = data.pop('time')
 
-
-            if not os.path.exists(filename):
-                data.to_csv(filename)
-            else:
-                data.to_csv(filename, mode='a', header=False)
+            _append_csv(data, filename)
         except:
             print(f'There are no data to save, empty Dataframe, shape {data.shape}')
 
-        time.sleep(3600)
\ No newline at end of file
+        # согласованная оценка фактической погоды по всем провайдерам за этот период
+        header, chunk = FileTail(period['actual_offset']).read(filename) if providers else (b'', b'')
+        if chunk:
+            try:
+                estimate, outliers = reconcile(pd.read_csv(BytesIO(header + chunk)))
+                for row in outliers.itertuples():
+                    print(f'{row.provider} {row.variable} outlier: {row.value} (median {row.median})')
+                if rollback(reconciled_filename, period['reconciled_offset']):
+                    print(f'Estimate for {window} is replaced with the estimate over all providers')
+                if not estimate.empty:
+                    _append_csv(estimate, reconciled_filename)
+            except Exception as e:
+                print(f'Failed to reconcile observations: {e}')
+
+        for provider, report in reports.items():
+            journal.record(provider, LOCATION, window, DONE if report is not None else FAILED)
+        if not providers:
+            print(f'Observations for {window} are already collected')
+
+        # агрегаты дочитывают только новые строки файла (после перезапуска - все пропущенные)
+        try:
+            aggregates.sync(filename)
+            aggregates.save()
+        except Exception as e:
+            print(f'Failed to update aggregates: {e}')
+
+        # ошибки прогнозов на прошедшие часы - в накопители индекса (новые прогнозы ждут своего часа)
+        try:
+            error_index.sync()
+            error_index.save()
+        except Exception as e:
+            print(f'Failed to update error index: {e}')
+
+        # перезапуск обработчика - после паузы до следующего периода сбора
+        recycle = guard is not None and guard.after_cycle()
+        window_end = lambda: journal.window_start(window) + config.data['actual']['interval']
+        while config.wait(window_end() - time.time()):
+            pass  # новая версия конфигурации - пауза до конца нового периода
+        if recycle:
+            return
+
+
+if __name__ == '__main__':
+    from Daemon import main
+    main(collect_actuals)
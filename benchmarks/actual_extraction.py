@@ -0,0 +1,257 @@
+import os, re, sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+'''
+    Сравнение извлечения фактических данных (WeatherParser.extract_*: каталог предкомпилированных шаблонов,
+    текст каждого узла вычисляется один раз, все поля блока - за один проход FieldTokenizer) с прежними
+    функциями get_fact_weather_* (шаблоны-строки в re.search, повторные .text.lower() одних и тех же узлов).
+
+    Страницы: записанные в архив сырых страниц (--raw, страницы прогнозов yandex/rumeteo/goodmeteo - те же адреса,
+    что и у фактических данных) или синтетические (SyntheticPages). Дерево html5lib строится один раз на страницу,
+    время его построения выводится отдельно - оно одинаково для обоих вариантов.
+    Проверяется совпадение значений: прежние строки ('+5', '3,4') приводятся к числам.
+
+    Запуск: python benchmarks/actual_extraction.py [--raw raw] [--pages 50] [--repeat 20]
+'''
+
+PROVIDERS = ['goodmeteo', 'rumeteo', 'yandex']
+
+
+# прежние функции извлечения (до FieldTokenizer) - без сетевого запроса, дерево передается готовым
+
+def legacy_goodmeteo(soup) -> dict:
+    result = {}
+    log_prefix = 'goodmeteo'
+    data = soup.find_all('div', {'class': 'b_pogoda'})
+
+    if len(data)==0:
+        raise Exception('There are no data received from URL')
+
+    for element in data:
+        result['time'] = str(datetime.now())
+        result['provider'] = 'goodmeteo'
+
+        det_pog_b1 = element.find('div', {'class': 'det_pog_b1'})
+
+        if det_pog_b1:
+            det_pog_temp = det_pog_b1.find('div', {'class': 'det_pog_temp'})
+            if det_pog_temp:
+                result['temperature'] = re.search(r'(\+|\-)?\d{1,2}', det_pog_temp.text)[0]
+
+            det_pog_desc = det_pog_b1.find('div', {'class': 'det_pog_desc'})
+            if det_pog_desc:
+                result['conditions'] = re.search(r'([а-яА-Я ])+', det_pog_desc.text)[0].strip()
+
+        det_pog_b2 = element.find('div', {'class': 'det_pog_b2'})
+
+        if det_pog_b2:
+            for element in det_pog_b2.find_all('div'):
+                if element.span.text.lower().find('ветер') != -1:
+                    try:
+                        text = element.b.text.split(', ')
+                        result['wind_speed'] = re.search(r'\d{1,2}(\,|\.)?\d?', text[0])[0]
+                        result['wind_direction'] = text[1] if len(text) > 1 else None
+                    except Exception as e:
+                        print(f'{log_prefix} Error parsing wind, string: {element.b.text}')
+                        result['wind_speed'] = None
+                        result['wind_direction'] = None
+                    continue
+
+                elif element.span.text.lower().find('влажность') != -1:
+                    try:
+                        result['humidity'] = re.search(r'\d{2}', element.b.text)[0]
+                    except Exception as e:
+                        print(f'{log_prefix} Error parsing humidity, string: {element.b.text}')
+                        result['humidity'] = None
+                    continue
+
+                elif element.span.text.lower().find('давление') != -1:
+                    try:
+                        result['pressure'] = re.search(r'\d{3}', element.b.text)[0]
+                    except Exception as e:
+                        print(f'{log_prefix} Error parsing pressure, string: {element.b.text}')
+                        result['pressure'] = None
+                    continue
+
+    return result
+
+
+def legacy_rumeteo(soup) -> dict:
+    result = {}
+    log_prefix = 'rumeteo'
+    data = soup.find_all('div', {'class': 'content'})
+
+    if len(data)==0:
+        raise Exception(f'{log_prefix} There are no data received from URL')
+
+    for element in data:
+        result['time'] = str(datetime.now())
+        result['provider'] = 'rumeteo'
+
+        last_report = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'last-report'})
+
+        if last_report:
+            temp = last_report.find('div', {'class': 'current-temp'})
+            result['temperature'] = re.search(r'(\+|\-)?\d{1,2}', temp.text)[0] if temp else None
+
+        conditions = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'conditions'})
+
+        if conditions:
+            result['conditions'] = conditions.find('li', {'class': 'condition-descr'}).text
+
+            wind = conditions.find('li', {'title': re.compile(r'Ветер.*')}).text
+
+            if re.search(r'\d+', wind) == None:
+                result['wind_speed'] = 0
+                result['wind_direction'] = wind
+            else:
+                wind = re.search(r'(\d+)\s\м\/\с\,\s([- а-я,]*)', wind.lower())
+
+            try:
+                result['wind_speed'] = wind[1]
+                result['wind_direction'] = wind[2]
+            except Exception as e:
+                result['wind_speed'] = None
+                result['wind_direction'] = None
+
+            try:
+                result['pressure'] = re.search(r'давление:\s(\d{3})', conditions.text.lower())[1]
+            except Exception as e:
+                result['pressure'] = None
+
+            try:
+                result['humidity'] = re.search(r'влажность\s[а-я]+\:\s*(\d{2,3})', conditions.text.lower())[1]
+            except Exception as e:
+                result['humidity'] = None
+
+        ext = element.find('div', {'class': 'wrap_content'}).find('div', {'class': 'ext'})
+        if ext:
+            try:
+                for s in ext.find_all('li'):
+                    if s.text.lower().find('видимость'):
+                        result['visibility'] = s.span.text
+                        break
+            except Exception as e:
+                result['visibility'] = None
+
+    return result
+
+
+def legacy_yandex(soup) -> dict:
+    result = {}
+    log_prefix = 'yandex'
+    data = soup.find_all('div', {'class': 'card_size_big'})
+
+    if len(data)==0:
+        raise Exception(f'{log_prefix} There are no data received from URL')
+
+    for element in data:
+        result['time'] = str(datetime.now())
+        result['provider'] = 'yandex'
+
+        fact_temp = element.find('div', {'class': 'fact__temp-wrap'})
+
+        if fact_temp:
+            x = fact_temp.find('a')['aria-label'].split(',')
+            result['temperature'] = re.search(r'(\+|\-)?\d+', x[0])[0]
+            result['conditions'] = x[2][:-1].lower()
+        else:
+            result['temperature'] = None
+            result['conditions'] = None
+
+        fact_wind = element.find('div', {'class': 'fact__wind-speed'})
+        result['wind_speed'] = fact_wind.find('span', {'class': 'wind-speed'}).text.replace(',', '.') if fact_wind else None
+        result['wind_direction'] = fact_wind.find('abbr').text if fact_wind else None
+
+        fact_humidity = element.find('div', {'class': 'fact__humidity'})
+        result['humidity'] = re.search(r'\d{2,3}',fact_humidity.text)[0] if fact_humidity else None
+
+        fact_pressure = element.find('div', {'class': 'fact__pressure'})
+        result['pressure'] = re.search(r'\d{3}',fact_pressure.text)[0] if fact_pressure else None
+
+    return result
+
+
+LEGACY = {'goodmeteo': legacy_goodmeteo, 'rumeteo': legacy_rumeteo, 'yandex': legacy_yandex}
+
+
+def recorded_pages(raw: str, limit: int) -> dict:
+    # первые страницы записей архива сырых страниц по провайдерам
+    from RawArchive import open_archive
+    archive = open_archive(raw)
+    pages = {provider: [] for provider in PROVIDERS}
+    for entry in archive.records(providers=PROVIDERS):
+        if len(pages[entry['provider']]) < limit:
+            pages[entry['provider']].append(archive.pages(entry)[0][1])
+        if all(len(p) >= limit for p in pages.values()):
+            break
+    return pages
+
+
+def synthetic_pages(limit: int) -> dict:
+    from SyntheticPages import PageGenerator
+    generator = PageGenerator()
+    now = datetime.now()
+    return {provider: [generator.page(provider, f'location{i:04d}', 1, now) for i in range(limit)]
+            for provider in PROVIDERS}
+
+
+def same(legacy, value) -> bool:
+    # прежние строковые значения в сравнении с типизированными
+    if legacy is None or value is None:
+        return legacy is value
+    if isinstance(value, (int, float)):
+        try:
+            return abs(float(str(legacy).replace(',', '.')) - value) < 1e-9
+        except ValueError:
+            return False
+    return str(legacy).strip() == value
+
+
+def benchmark(pages: dict, repeat: int = 20) -> dict:
+    import bs4
+    import WeatherParser
+
+    report = {}
+    print(f"{'provider':<10} {'pages':>5} {'html5lib, ms':>12} {'legacy, us':>10} {'engine, us':>10} {'speedup':>7}  mismatches")
+    for provider, contents in pages.items():
+        if not contents:
+            continue
+        start = time.perf_counter()
+        soups = [bs4.BeautifulSoup(content, 'html5lib') for content in contents]
+        parse = (time.perf_counter() - start) / len(soups)
+
+        legacy, engine = LEGACY[provider], getattr(WeatherParser, f'extract_{provider}')
+        timings = {}
+        for name, func in (('legacy', legacy), ('engine', engine)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for soup in soups:
+                    func(soup)
+            timings[name] = (time.perf_counter() - start) / repeat / len(soups)
+
+        mismatches = set()
+        for soup in soups:
+            old, new = legacy(soup), engine(soup)
+            mismatches.update(f for f in old if f != 'time' and not same(old[f], new.get(f)))
+
+        report[provider] = {'parse': parse, **timings, 'mismatches': sorted(mismatches)}
+        print(f"{provider:<10} {len(soups):>5} {parse * 1000:>12.1f} {timings['legacy'] * 1e6:>10.0f} "
+              f"{timings['engine'] * 1e6:>10.0f} {timings['legacy'] / timings['engine']:>6.1f}x  "
+              f"{', '.join(sorted(mismatches)) or '-'}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark actual weather extraction against the legacy extractors')
+    parser.add_argument('--raw', help='raw page archive (default: synthetic pages)')
+    parser.add_argument('--pages', type=int, default=50, help='pages per provider')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = recorded_pages(args.raw, args.pages) if args.raw else synthetic_pages(args.pages)
+    benchmark(pages, args.repeat)
@@ -0,0 +1,155 @@
+import os, sys
+import time
+import argparse
+import resource
+import statistics
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+'''
+    Нагрузочный тест сборщика на локальном стенде (SyntheticPages.StandInServer) без обращения к источникам.
+
+    Стенд запускается в отдельном процессе и отдает синтетические страницы N населенных пунктов.
+    Клиенты выполняют полный цикл провайдера - get_data (загрузка и разбор) и save_data во временное
+    хранилище - для каждой пары (населенный пункт, провайдер) в пуле потоков или процессов.
+    Первый проход загружает страницы целиком, следующие - условными запросами (304), если ревизия
+    прогноза на стенде не сменилась; фактические данные (WeatherParser) опрашиваются в каждом проходе.
+
+    Результат: пропускная способность (страниц/с), перцентили задержки цикла по провайдерам и
+    пиковая резидентная память клиентов.
+
+    Запуск: python benchmarks/load_test.py --locations 50 --workers 8 --rounds 2 [--processes]
+'''
+
+PROVIDERS = ['yandex', 'rumeteo', 'rp5', 'goodmeteo']
+ACTUAL = ['goodmeteo', 'rumeteo', 'yandex']
+
+_worker = {}
+
+
+def serve(port_queue, horizon: int, noise: float, padding: int, latency: float) -> None:
+    from SyntheticPages import StandInServer, PageGenerator
+    server = StandInServer(PageGenerator(horizon=horizon, noise=noise, padding=padding), latency=latency)
+    port_queue.put(server.url)
+    server.serve_forever()
+
+
+def _init_worker(mirror: str, root: str) -> None:
+    sys.stdout = open(os.devnull, 'w')
+    _worker['mirror'] = mirror
+    _worker['root'] = root
+    _worker.setdefault('forecasts', {})  # в пуле потоков инициализация выполняется в каждом потоке
+
+    import WeatherParser
+    WeatherParser.MIRROR = mirror
+
+
+def _forecast_cycle(task: tuple) -> tuple:
+    # цикл провайдера прогноза: (провайдер, населенный пункт) -> (провайдер, секунды, страниц, успех)
+    from ProviderRegistry import get_provider
+    provider, location = task
+    forecasts = _worker['forecasts']
+    if task not in forecasts:
+        forecast = get_provider(provider)
+        forecast.mirror, forecast.location = _worker['mirror'], location
+        forecasts[task] = forecast
+    forecast = forecasts[task]
+
+    start = time.perf_counter()
+    data = forecast.get_data()
+    forecast.save_data(root=os.path.join(_worker['root'], location))
+    return provider, time.perf_counter() - start, len(forecast._pages), data is not None
+
+
+def _actual_cycle(provider: str) -> tuple:
+    import WeatherParser
+    start = time.perf_counter()
+    result = getattr(WeatherParser, f'get_fact_weather_{provider}')(attempts=1)
+    return f'actual:{provider}', time.perf_counter() - start, 1, bool(result)
+
+
+def _run(task) -> tuple:
+    return _actual_cycle(task) if isinstance(task, str) else _forecast_cycle(task)
+
+
+def _peak_rss(_=None) -> float:
+    # пиковая резидентная память процесса, МБ (в Linux ru_maxrss - в КБ)
+    time.sleep(0.05)  # при опросе пула задача должна попасть в каждый процесс
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def load_test(locations: int = 50, workers: int = 8, rounds: int = 2, processes: bool = False, horizon: int = 72,
+              noise: float = 1.5, padding: int = 100_000, latency: float = 0.0) -> dict:
+    context = multiprocessing.get_context('spawn')
+    port_queue = context.Queue()
+    server = context.Process(target=serve, args=(port_queue, horizon, noise, padding, latency), daemon=True)
+    server.start()
+    mirror = port_queue.get(timeout=30)
+
+    tasks = [(provider, f'location{i:04d}') for i in range(locations) for provider in PROVIDERS] + ACTUAL * locations
+    results = []
+
+    with tempfile.TemporaryDirectory() as root:
+        pool = ProcessPoolExecutor(workers, context, _init_worker, (mirror, root)) if processes else \
+               ThreadPoolExecutor(workers, initializer=_init_worker, initargs=(mirror, root))
+        stdout = sys.stdout
+        with pool:
+            try:
+                for number in range(rounds):
+                    start = time.perf_counter()
+                    cycles = list(pool.map(_run, tasks, **({'chunksize': 4} if processes else {})))
+                    elapsed = time.perf_counter() - start
+                    results.append((number, elapsed, cycles))
+                worker_rss = list(pool.map(_peak_rss, range(workers))) if processes else []
+            finally:
+                sys.stdout = stdout
+
+    server.terminate()
+
+    report = {'rounds': []}
+    for number, elapsed, cycles in results:
+        pages = sum(c[2] for c in cycles)
+        by_provider = {}
+        for provider, seconds, _, ok in cycles:
+            by_provider.setdefault(provider, []).append((seconds, ok))
+
+        print(f"round {number + 1}: {len(cycles)} cycles, {pages} pages in {elapsed:.1f}s, "
+              f"{pages / elapsed:.1f} pages/s, {len(cycles) / elapsed:.1f} cycles/s")
+        print(f"  {'provider':<18} {'cycles':>6} {'failed':>6} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} {'max, ms':>8}")
+        for provider, values in sorted(by_provider.items()):
+            seconds = [s for s, _ in values]
+            print(f"  {provider:<18} {len(values):>6} {sum(not ok for _, ok in values):>6} "
+                  f"{percentile(seconds, 0.5) * 1000:>8.1f} {percentile(seconds, 0.95) * 1000:>8.1f} "
+                  f"{percentile(seconds, 0.99) * 1000:>8.1f} {max(seconds) * 1000:>8.1f}")
+
+        report['rounds'].append({'seconds': elapsed, 'pages': pages, 'pages_per_second': pages / elapsed,
+                                 'latency': {p: statistics.median(s for s, _ in v) for p, v in by_provider.items()}})
+
+    own = _peak_rss()
+    report['peak_rss_mb'] = max([own] + worker_rss)
+    print(f"peak RSS: client {own:.0f} MB" + (f", workers max {max(worker_rss):.0f} MB" if worker_rss else ''))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test collectors against the synthetic stand-in server')
+    parser.add_argument('--locations', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--processes', action='store_true', help='process pool instead of threads (parsing is CPU bound)')
+    parser.add_argument('--horizon', type=int, default=72, help='forecast length, hours')
+    parser.add_argument('--noise', type=float, default=1.5)
+    parser.add_argument('--padding', type=int, default=100_000, help='markup around data, bytes')
+    parser.add_argument('--latency', type=float, default=0.0, help='server response delay, seconds')
+    args = parser.parse_args()
+
+    load_test(args.locations, args.workers, args.rounds, args.processes, args.horizon, args.noise, args.padding,
+              args.latency)
@@ -0,0 +1,68 @@
+import os, sys
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scheduler import AdaptiveSchedule
+
+'''
+    Моделирование опроса провайдеров: фиксированный интервал (time.sleep(3600)) против AdaptiveSchedule.
+
+    У каждого модельного провайдера свой период обновления, сдвиг и случайная задержка публикации.
+    Обновление считается пойманным, если провайдер был опрошен после него и до следующего обновления;
+    задержка - время от публикации до опроса.
+
+    Запуск: python benchmarks/polling.py [дней]
+'''
+
+HOUR = 3600
+
+# период обновления, сдвиг, разброс момента публикации (с)
+PROVIDERS = {
+    'yandex': (HOUR / 2, 600, 120),
+    'rumeteo': (HOUR, 900, 300),
+    'rp5': (3 * HOUR, 1800, 300),
+    'goodmeteo': (6 * HOUR, 4 * HOUR, 600),
+}
+
+
+def update_times(period: float, offset: float, jitter: float, duration: float) -> list:
+    random.seed(int(period + offset))
+    return [n * period + offset + random.uniform(0, jitter) for n in range(int(duration / period))]
+
+
+def simulate(updates: list, duration: float, next_poll) -> dict:
+    polls, captured, latencies = 0, 0, []
+    now, seen = 0.0, -1
+    while now < duration:
+        polls += 1
+        published = [i for i, t in enumerate(updates) if t <= now]
+        latest = published[-1] if published else -1
+        changed = latest > seen
+        if changed:
+            captured += 1
+            latencies.append(now - updates[latest])
+            seen = latest
+        now = next_poll(now, changed)
+    return {'polls': polls, 'captured': captured, 'latency': statistics.mean(latencies) / 60 if latencies else 0.0}
+
+
+if __name__ == '__main__':
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 14
+    duration = days * 24 * HOUR
+
+    print(f"{'provider':<10} {'updates':>8} | {'fixed: polls':>12} {'captured':>8} {'latency':>9} | "
+          f"{'adaptive: polls':>15} {'captured':>8} {'latency':>9}")
+    totals = [0, 0, 0, 0, 0]
+    for provider, (period, offset, jitter) in PROVIDERS.items():
+        updates = update_times(period, offset, jitter, duration)
+        fixed = simulate(updates, duration, lambda now, changed: now + HOUR)
+        adaptive = simulate(updates, duration, AdaptiveSchedule().next_poll)
+
+        print(f"{provider:<10} {len(updates):>8} | {fixed['polls']:>12} {fixed['captured']:>8} {fixed['latency']:>7.1f}m | "
+              f"{adaptive['polls']:>15} {adaptive['captured']:>8} {adaptive['latency']:>7.1f}m")
+        for i, value in enumerate((len(updates), fixed['polls'], fixed['captured'], adaptive['polls'], adaptive['captured'])):
+            totals[i] += value
+
+    print(f"{'total':<10} {totals[0]:>8} | {totals[1]:>12} {totals[2]:>8} {'':>9} | {totals[3]:>15} {totals[4]:>8}")
@@ -0,0 +1,82 @@
+import os, sys
+import time
+import random
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RawArchive import RawArchive, SegmentArchive, open_archive
+
+'''
+    Бенчмарк архивов сырых страниц: размер на страницу и время получения случайной страницы
+    для RawArchive (gzip, файл на страницу) и SegmentArchive (zstd со словарем провайдера, сегменты).
+
+    Запуск:
+        python benchmarks/raw_archive.py [архив]
+    Если архив не указан, используются синтетические страницы с таблицей прогноза.
+'''
+
+
+def synthetic_records(providers: int = 4, cycles: int = 300) -> list:
+    # страницы одного провайдера отличаются только значениями в таблице, как настоящие
+    random.seed(0)
+    records = []
+    start = datetime(2023, 5, 1)
+    for cycle in range(cycles):
+        issue_time = start + timedelta(hours=cycle)
+        for p in range(providers):
+            rows = ''.join(f'<tr><td>{h:02d}:00</td><td>{random.randint(-10, 30)}</td><td>{random.randint(0, 15)}</td>'
+                           f'<td>{random.randint(730, 770)}</td><td>{random.randint(20, 100)}%</td></tr>' for h in range(48))
+            page = (f'<html><head><title>Провайдер {p}</title><meta charset="utf-8"><script src="/static/app.{p}.js"></script>'
+                    f'</head><body><div class="menu">{"<a href=/city>город</a>" * 40}</div>'
+                    f'<table id="forecast_{p}">{rows}</table><footer>{"©" * 100}</footer></body></html>')
+            records.append((f'provider{p}', issue_time, [(f'https://example.com/{p}', page.encode())]))
+    return records
+
+
+def archive_records(root: str) -> list:
+    archive = open_archive(root)
+    return [(e['provider'], datetime.fromisoformat(e['issue_time']), archive.pages(e)) for e in archive.records()]
+
+
+def directory_size(root: str, exclude: str = None) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files
+               if not (exclude and f.endswith(exclude)))
+
+
+def measure(name: str, archive, root: str, records: list, lookups: int = 1000) -> None:
+    start = time.perf_counter()
+    entries = [archive.record(provider, issue_time, pages) for provider, issue_time, pages in records]
+    write = time.perf_counter() - start
+
+    pages = sum(len(p) for _, _, p in records)
+    raw = sum(len(content) for _, _, p in records for _, content in p)
+    size = directory_size(root)
+    dictionaries = size - directory_size(root, exclude='.zdict')
+
+    timings = []
+    for entry in random.choices(entries, k=lookups):
+        start = time.perf_counter()
+        archive.pages(entry)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{name:<15} {size / pages:9.0f} B/page   ratio {raw / size:6.1f}   "
+          f"write {write / pages * 1000:6.2f} ms/page   "
+          f"read median {statistics.median(timings) * 1000:6.3f} ms   p99 {sorted(timings)[int(lookups * 0.99)] * 1000:6.3f} ms")
+    if dictionaries:
+        print(f"{'':<15} {(size - dictionaries) / pages:9.0f} B/page without dictionaries ({dictionaries} B)")
+
+
+if __name__ == '__main__':
+    records = archive_records(sys.argv[1]) if len(sys.argv) > 1 else synthetic_records()
+    pages = sum(len(p) for _, _, p in records)
+    print(f"{len(records)} records, {pages} pages, {sum(len(c) for _, _, p in records for _, c in p) / pages:.0f} B/page raw")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gzip_root = os.path.join(tmp, 'gzip')
+        measure('RawArchive', RawArchive(gzip_root), gzip_root, records)
+
+        zstd_root = os.path.join(tmp, 'zstd')
+        measure('SegmentArchive', SegmentArchive(zstd_root), zstd_root, records)
@@ -0,0 +1,85 @@
+import subprocess
+import statistics
+import sys
+import os
+import time
+
+'''
+    Бенчмарк времени запуска сборщиков.
+
+    Для каждого замера запускается отдельный процесс python, который:
+        - импортирует WeatherForecastParser, ProviderRegistry и WeatherParser,
+        - создает четыре провайдера и ансамбль,
+        - вызывает get_data первого провайдера до первого исходящего соединения.
+    Соединение перехватывается (socket.getaddrinfo/connect), поэтому сеть не нужна.
+
+    Отдельно замеряется стоимость импорта тяжелых модулей (pandas, bs4, html5lib, requests).
+
+    Запуск: python benchmarks/startup.py [количество повторов]
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, time, socket
+start = float(sys.argv[1])
+
+class FirstRequest(Exception):
+    pass
+
+def first_request(*args, **kwargs):
+    print(f"first_request {time.time() - start:.4f}")
+    raise FirstRequest()
+
+# первое обращение к сети - разрешение имени хоста
+socket.getaddrinfo = first_request
+socket.socket.connect = first_request
+
+import WeatherForecastParser, ProviderRegistry, WeatherParser
+from ForecastEnsemble import EnsembleForecast
+imported = time.time()
+
+forecasts = [ProviderRegistry.get_provider(name) for name in ('rp5', 'yandex', 'goodmeteo', 'rumeteo')] + [EnsembleForecast()]
+constructed = time.time()
+print(f"import {imported - start:.4f}")
+print(f"construct {constructed - imported:.4f}")
+
+# первая попытка подключения прерывается, ошибка не сетевая - повторных попыток нет
+try:
+    forecasts[0].get_data()
+except FirstRequest:
+    pass
+'''
+
+
+def run_child(code: str, *args: str) -> dict:
+    start = time.time()
+    result = subprocess.run([sys.executable, '-c', code, str(start), *args], cwd=ROOT, capture_output=True, text=True)
+    measures = {}
+    for line in result.stdout.splitlines():
+        name, _, value = line.partition(' ')
+        try:
+            measures[name] = float(value)
+        except ValueError:
+            continue
+    return measures
+
+
+def module_import_time(module: str) -> float:
+    code = f'import sys, time; start = float(sys.argv[1]); import {module}; print(f"import {{time.time() - start:.4f}}")'
+    baseline = run_child('import sys, time; start = float(sys.argv[1]); print(f"import {time.time() - start:.4f}")')
+    return run_child(code)['import'] - baseline['import']
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    runs = [run_child(CHILD) for _ in range(repeats)]
+    for name in ('import', 'construct', 'first_request'):
+        values = [run[name] for run in runs if name in run]
+        if values:
+            print(f"{name:<15} median {statistics.median(values)*1000:8.1f} ms   max {max(values)*1000:8.1f} ms")
+
+    print()
+    for module in ('requests', 'bs4', 'html5lib', 'pandas'):
+        print(f"import {module:<10} {module_import_time(module)*1000:8.1f} ms")
@@ -0,0 +1,38 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+'''
+    Общие фикстуры тестов: локальный стенд синтетических страниц (SyntheticPages.StandInServer).
+'''
+
+
+@pytest.fixture
+def stand():
+    # фабрика стендов: stand(error_rate=1.0) -> запущенный StandInServer; стенды останавливаются после теста
+    from SyntheticPages import StandInServer, PageGenerator
+    servers = []
+
+    def start(**kwargs):
+        server = StandInServer(PageGenerator(padding=0), **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_forecast(monkeypatch):
+    # провайдеры реестра без пауз между попытками и без состояния, общего для тестов (архив, контроль структуры):
+    # make_forecast('rp5') -> SpecForecast
+    import WeatherForecastParser as W
+    from ProviderRegistry import get_provider
+    monkeypatch.setattr(W.Forecast, 'suspend_time', 0)
+    monkeypatch.setattr(W.Forecast, 'monitor', None)
+    monkeypatch.setattr(W.Forecast, 'archive', None)
+    monkeypatch.setattr(W.Forecast, 'limiter', None)
+    return get_provider
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from ObservationAggregates import ObservationAggregates, RingBuffer
+
+
+def test_ring_buffer_aggregates_and_evicts_old_periods():
+    buffer = RingBuffer(4)
+    buffer.update(np.array([0, 0, 1, 3]), np.array([1.0, 3.0, 5.0, -2.0]))
+
+    assert buffer.count[[0, 1, 3]].tolist() == [2, 1, 1]
+    assert (buffer.total[0], buffer.min[0], buffer.max[0]) == (4.0, 1.0, 3.0)
+
+    # период 4 занимает ячейку периода 0; более старые наблюдения, чем хранимое окно, не учитываются
+    buffer.update(np.array([4, 0]), np.array([7.0, 100.0]))
+    assert buffer.periods.tolist() == [4, 1, -1, 3]
+    assert (buffer.count[0], buffer.total[0]) == (1, 7.0)
+
+
+def test_ring_buffer_round_trip():
+    buffer = RingBuffer(3)
+    buffer.update(np.array([5, 6]), np.array([1.0, 2.0]))
+    restored = RingBuffer.from_array(buffer.to_array())
+
+    for name in RingBuffer.__slots__:
+        assert np.array_equal(getattr(restored, name), getattr(buffer, name))
+
+
+def test_aggregates_by_resolution(tmp_path):
+    aggregates = ObservationAggregates(str(tmp_path / 'actual.npz'), variables=['temperature'])
+    rows = aggregates.update(pd.DataFrame({
+        'time': ['2024-05-12 10:00', '2024-05-12 10:30', '2024-05-12 11:00', '2024-05-13 00:00', 'not a time'],
+        'provider': ['rp5', 'rp5', 'rp5', 'rp5', 'rp5'],
+        'temperature': ['+1', '3', '5', '-1', '0'],
+    }))
+    assert rows == 4
+
+    hourly = aggregates.frame('hour', 'rp5', 'temperature')
+    assert hourly['count'].tolist() == [2, 1, 1]
+    assert hourly['mean'].tolist() == [2.0, 5.0, -1.0]
+
+    daily = aggregates.frame('day')
+    assert daily['period'].tolist() == [pd.Timestamp('2024-05-12'), pd.Timestamp('2024-05-13')]
+    assert (daily['min'].tolist(), daily['max'].tolist()) == ([1.0, -1.0], [5.0, -1.0])
+
+    assert aggregates.frame('month')['count'].tolist() == [4]
+
+
+def test_snapshot_keeps_aggregates_and_read_position(tmp_path):
+    report = tmp_path / 'actual_report.csv'
+    report.write_text('time,provider,temperature\n2024-05-12 10:00,rp5,1\n2024-05-12 11:00,rp5,2\n')
+    aggregates = ObservationAggregates(str(tmp_path / 'actual.npz'))
+    assert aggregates.sync(str(report)) == 2
+    aggregates.save()
+
+    with open(report, 'a') as f:
+        f.write('2024-05-12 12:00,rp5,3\n')
+    restored = ObservationAggregates.load(str(tmp_path / 'actual.npz'))
+    assert restored.sync(str(report)) == 1
+    assert restored.frame('day', variable='temperature')['count'].tolist() == [3]
@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+
+from Backfill import backfill, load_checkpoint
+from RawArchive import RawArchive
+
+ISSUE = datetime(2024, 5, 12, 10)
+
+
+def test_locations_are_reparsed_separately(tmp_path, stand, make_forecast):
+    server = stand()
+    archive = RawArchive(str(tmp_path / 'raw'))
+    for location in ('ekaterinburg', 'perm'):
+        forecast = make_forecast('rp5')
+        forecast.mirror, forecast.location, forecast.archive = server.url, location, archive
+        assert forecast.get_data(issue_time=ISSUE) is not None
+
+    out = str(tmp_path / 'reparsed')
+    stats = backfill(str(tmp_path / 'raw'), out, workers=1)
+
+    assert (stats['records'], stats['failed']) == (2, 0)
+    for location in ('ekaterinburg', 'perm'):
+        assert os.path.exists(os.path.join(out, location, 'rp5', '12052024_1000.csv'))
+    assert load_checkpoint(out) == {'rp5|ekaterinburg|2024-05-12T10:00:00', 'rp5|perm|2024-05-12T10:00:00'}
+
+    # повторный запуск ничего не разбирает
+    assert backfill(str(tmp_path / 'raw'), out, workers=1)['records'] == 0
+
+
+def test_pages_are_replayed_by_archived_urls(tmp_path, stand, make_forecast):
+    server = stand()
+    archive = RawArchive(str(tmp_path / 'raw'))
+    for issue, settings in ((ISSUE, {}), (datetime(2024, 5, 12, 13), {'url': 'https://rp5.ru/Погода_в_Перми'})):
+        forecast = make_forecast('rp5')
+        forecast.mirror, forecast.archive = server.url, archive
+        forecast.configure(settings)
+        assert forecast.get_data(issue_time=issue) is not None
+
+    # адрес второй записи задан конфигурацией, при повторном разборе ее нет среди адресов спецификации
+    stats = backfill(str(tmp_path / 'raw'), str(tmp_path / 'reparsed'), workers=1)
+    assert (stats['records'], stats['failed']) == (2, 0)
+
+
+def test_failed_records_are_retried(tmp_path):
+    out = tmp_path / 'reparsed'
+    out.mkdir()
+    (out / '.backfill_done').write_text('rp5||a\tok\nrp5||b\tfailed\nrp5||c\tfailed\nrp5||c\tok\nrp5||d\tok')
+    # незаписанная до конца строка (прерванный запуск) не учитывается
+    assert load_checkpoint(str(out)) == {'rp5||a', 'rp5||c'}
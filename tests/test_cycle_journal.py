@@ -0,0 +1,110 @@
+from io import BytesIO
+
+import pandas as pd
+
+from CycleJournal import CycleJournal, DONE, FAILED, STARTED, file_size, truncate_partial_line
+from FileTail import FileTail
+from ObservationAggregates import ObservationAggregates
+
+HEADER = 'time,provider,temperature\n'
+
+
+def rows(*values, provider='rp5', hour=0):
+    return ''.join(f'2024-01-01 {hour + i:02d}:00:00,{provider},{v}\n' for i, v in enumerate(values))
+
+
+def append(path, text):
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def test_crash_rollback_recover_round_trip(tmp_path):
+    report = str(tmp_path / 'report.csv')
+    append(report, HEADER + rows(1, 2))
+    size = file_size(report)
+
+    journal = CycleJournal(str(tmp_path / 'journal.jsonl'))
+    window = journal.window(0, 3600)
+    journal.start('rp5', 'city', window, files=[report])
+    journal.start('yandex', 'city', window, files=[report])
+    journal.record('yandex', 'city', window, DONE)
+    # падение: строка rp5 дописана не полностью, запись done не сделана, последняя запись журнала оборвана
+    append(report, '2024-01-01 02:00:00,rp5,3\n2024-01-01 03:00:00,r')
+    append(journal.path, '{"job": ["rp5", "ci')
+
+    journal = CycleJournal(journal.path)
+    assert journal.state('rp5', 'city', window) == STARTED
+    interrupted = journal.recover([report])
+
+    assert [r['job'][0] for r in interrupted] == ['rp5']
+    assert file_size(report) == size
+    assert journal.state('rp5', 'city', window) == FAILED
+    assert journal.pending(['rp5', 'yandex'], 'city', window) == ['rp5']
+
+    # повторный запуск не откатывает файл снова: прерванное задание закрыто
+    append(report, rows(3, hour=2))
+    assert CycleJournal(journal.path).recover([report]) == []
+    assert file_size(report) > size
+
+
+def test_truncate_partial_line(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'a\nb\nc')
+    assert truncate_partial_line(str(path)) == 1
+    assert path.read_bytes() == b'a\nb\n'
+
+
+def test_file_tail_reads_only_complete_new_lines(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    append(path, HEADER + rows(1) + '2024-01-01 01:00:00,rp')
+    tail = FileTail()
+
+    header, chunk = tail.read(path)
+    assert header == HEADER.encode() and chunk == rows(1).encode()
+
+    append(path, '5,2\n')
+    assert tail.read(path)[1] == rows(2, hour=1).encode()
+    assert tail.read(path)[1] == b''
+
+
+def test_file_tail_resyncs_after_rollback(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    append(path, HEADER + rows(1, 2))
+    keep = file_size(path)
+    append(path, rows(3, 4, hour=2))
+
+    tail = FileTail()
+    tail.read(path)
+    saved = FileTail(tail.offset, tail.check)
+
+    # откат строк прерванного цикла: файл короче позиции
+    with open(path, 'rb+') as f:
+        f.truncate(keep)
+    assert tail.read(path)[1] == b''
+    append(path, rows(5, hour=2))
+    assert tail.read(path)[1] == rows(5, hour=2).encode()
+
+    # откат и новые строки той же или большей длины на месте прочитанных: позиция не попадает в середину строки
+    append(path, rows(60, 70, hour=3))
+    header, chunk = saved.read(path)
+    assert chunk.startswith(b'2024-01-01 ') and chunk.endswith(b'\n')
+    assert pd.read_csv(BytesIO(header + chunk)).shape[1] == 3
+
+
+def test_aggregates_continue_after_rollback(tmp_path):
+    path = str(tmp_path / 'report.csv')
+    append(path, HEADER + rows(1, 2))
+    keep = file_size(path)
+    append(path, rows(10, hour=2))
+
+    aggregates = ObservationAggregates(str(tmp_path / 'actual.npz'))
+    assert aggregates.sync(path) == 3
+
+    with open(path, 'rb+') as f:
+        f.truncate(keep)
+    append(path, rows(3, 4, hour=2))
+    # строка 02:00 на месте уже учтенной не учитывается повторно, чтение продолжается со следующей строки
+    assert aggregates.sync(path) == 1
+
+    frame = aggregates.frame('hour', variable='temperature')
+    assert sorted(frame['count']) == [1, 1, 1, 1]
@@ -0,0 +1,60 @@
+import signal
+import tracemalloc
+
+import pytest
+
+import Daemon
+from Daemon import GROWTH_WINDOW, MemoryGuard
+
+
+@pytest.fixture
+def guard(monkeypatch, tmp_path):
+    # MemoryGuard с подставной памятью процесса; обработчик SIGUSR1 восстанавливается после теста
+    rss = [100.0]
+    monkeypatch.setattr(Daemon, 'current_rss', lambda: rss[0])
+    handler = signal.getsignal(signal.SIGUSR1)
+
+    def make(**options):
+        return MemoryGuard(snapshot_dir=str(tmp_path / 'memory'), **options), rss
+
+    yield make
+    signal.signal(signal.SIGUSR1, handler)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_growth_is_estimated_after_warmup(guard):
+    memory, _ = guard(warmup=5)
+    step = GROWTH_WINDOW / 20
+    # прогрев (импорт, кэши) не учитывается, затем рост 10 МБ за каждые 6 часов
+    memory.samples.extend((i * step, 500.0 if i < 5 else 100 + (i - 5) * step / GROWTH_WINDOW * 10) for i in range(30))
+
+    assert memory.growth() == pytest.approx(40.0)
+
+    short, _ = guard(warmup=0)
+    short.samples.extend((i, 100.0 + i) for i in range(30))
+    assert short.growth() is None
+
+
+def test_worker_is_recycled_by_cycles_and_memory(guard):
+    memory, rss = guard(max_cycles=3, max_rss_mb=200)
+    assert [memory.after_cycle() for _ in range(3)] == [False, False, True]
+
+    memory, rss = guard(max_cycles=100, max_rss_mb=200)
+    assert not memory.after_cycle()
+    rss[0] = 250.0
+    assert memory.after_cycle()
+
+
+def test_snapshot_starts_tracing_then_writes_report(guard):
+    memory, _ = guard()
+    assert memory.snapshot() is None and tracemalloc.is_tracing()
+
+    leak = [bytearray(1024) for _ in range(100)]
+    first = memory.snapshot()
+    leak.extend(bytearray(1024) for _ in range(100))
+    second = memory.snapshot()
+
+    assert first != second
+    with open(second, encoding='utf-8') as f:
+        assert 'Growth since previous snapshot' in f.read()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from ForecastEnsemble import EnsembleBuilder, RunningStats, weighted_median
+
+ISSUE = pd.Timestamp('2024-05-12 00:00')
+
+
+def forecast(start: int, hours: int, temperature: float = 10.0) -> pd.DataFrame:
+    index = pd.date_range(ISSUE + pd.Timedelta(hours=start), periods=hours, freq='h', name='time')
+    return pd.DataFrame({'temperature': temperature + np.arange(hours, dtype=float)}, index=index)
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(1).normal(2.0, 3.0, 500)
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+
+    assert stats.count == 500
+    assert np.isclose(stats.mean, values.mean())
+    assert np.isclose(stats.variance, values.var())
+    assert np.isclose(stats.mse, np.mean(values**2))
+
+
+def test_weighted_median_skips_missing():
+    values = np.array([[1.0, 2.0, 10.0], [np.nan, 5.0, np.nan], [np.nan, np.nan, np.nan]])
+    weights = np.array([[1.0, 1.0, 5.0], [1.0, 1.0, 1.0], [1.0, 1.0, 1.0]])
+    result = weighted_median(values, weights)
+
+    assert result[:2].tolist() == [10.0, 5.0]
+    assert np.isnan(result[2])
+
+
+def test_replaced_forecast_hours_are_pruned(tmp_path):
+    builder = EnsembleBuilder(['temperature'], state_file=str(tmp_path / 'state.json'))
+    builder.add('rp5', forecast(0, 10), ISSUE)
+    builder.add('yandex', forecast(0, 4), ISSUE)
+    builder.add('rp5', forecast(6, 10), ISSUE)
+
+    # часы 4-5 были только в прежнем прогнозе rp5; часы 0-3 остаются в прогнозе yandex
+    expected = forecast(0, 4).index.union(forecast(6, 10).index)
+    assert builder._numerator.index.sort_values().equals(expected)
+    assert builder._denominator.index.sort_values().equals(expected)
+
+    consensus = builder.consensus(ISSUE)
+    assert consensus.loc[ISSUE + pd.Timedelta(hours=6), 'temperature'] == 10.0
+
+
+def test_pending_forecasts_survive_restart(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    builder = EnsembleBuilder(['temperature'], state_file=state_file)
+    builder.add('rp5', forecast(1, 3), ISSUE)
+    builder.save_state()
+
+    restarted = EnsembleBuilder(['temperature'], state_file=state_file)
+    assert restarted.pending == builder.pending
+
+    restarted.observe(ISSUE + pd.Timedelta(hours=2), {'temperature': 10.0})
+    stats = restarted.stats[('rp5', 'temperature', 2)]
+    assert (stats.count, stats.mean) == (1, 1.0)
+
+
+def test_new_pending_forecasts_are_saved_without_new_actuals(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    builder = EnsembleBuilder(['temperature'], state_file=state_file)
+    builder.add('rp5', forecast(1, 3), ISSUE)
+    assert builder.sync_actuals(str(tmp_path / 'actual_report.csv')) == 0
+
+    assert EnsembleBuilder(['temperature'], state_file=state_file).pending == builder.pending
+
+
+def test_members_survive_restart(tmp_path):
+    # после перезапуска Scheduler не передает неизменившиеся прогнозы: консенсус строится из сохраненных
+    state_file = str(tmp_path / 'state.json')
+    builder = EnsembleBuilder(['temperature', 'pressure'], state_file=state_file)
+    builder.add('rp5', forecast(0, 6), ISSUE)
+    builder.add('yandex', forecast(2, 6, temperature=20.0), ISSUE)
+    assert builder.sync_actuals(str(tmp_path / 'actual_report.csv')) == 0
+
+    restarted = EnsembleBuilder(['temperature', 'pressure'], state_file=state_file)
+    assert sorted(restarted.members) == ['rp5', 'yandex']
+    expected, consensus = builder.consensus(ISSUE), restarted.consensus(ISSUE)
+    assert consensus['members'].tolist() == expected['members'].tolist() == [1, 1, 2, 2, 2, 2, 1, 1]
+    assert np.allclose(consensus['temperature'], expected['temperature'])
+
+    # замена прогноза после перезапуска вычитает сохраненный прогноз провайдера
+    restarted.add('yandex', forecast(2, 2, temperature=30.0), ISSUE)
+    assert restarted.consensus(ISSUE)['members'].tolist() == [1, 1, 2, 2, 1, 1]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from ErrorIndex import ALL, LeadTimeErrorIndex, hour_number
+
+ISSUE = pd.Timestamp('2024-05-12 00:00')
+
+
+def write_forecast(root, provider: str, temperatures: list) -> None:
+    # прогноз на 1..n часов после выпуска в формате архива (<root>/<provider>/ddmmYYYY_HHMM.csv)
+    directory = root / provider
+    directory.mkdir(exist_ok=True)
+    index = pd.date_range(ISSUE + pd.Timedelta(hours=1), periods=len(temperatures), freq='h', name='time')
+    pd.DataFrame({'temperature': temperatures}, index=index).to_csv(directory / ISSUE.strftime('%d%m%Y_%H%M.csv'))
+
+
+def write_actual(root, rows: list, mode: str = 'w') -> None:
+    with open(root / 'actual_report.csv', mode) as f:
+        if mode == 'w':
+            f.write('time,provider,temperature\n')
+        f.writelines(f'{time},{provider},{value}\n' for time, provider, value in rows)
+
+
+def test_ranking_from_archive_and_actuals(tmp_path):
+    write_forecast(tmp_path, 'rp5', [10, 12])
+    write_forecast(tmp_path, 'yandex', [13, 11])
+    # факт часа - среднее провайдеров; час учитывается с приходом наблюдений следующего часа
+    write_actual(tmp_path, [('2024-05-12 01:00', 'rp5', 10), ('2024-05-12 01:30', 'yandex', 12),
+                            ('2024-05-12 02:00', 'rp5', 11)])
+
+    index = LeadTimeErrorIndex(str(tmp_path / 'index.json'), str(tmp_path), variables=['temperature'])
+    assert index.sync() == (1, 4)
+    assert index.ranking('temperature', 1, period=ALL) == [('rp5', 1.0, 1), ('yandex', 2.0, 1)]
+    assert index.ranking('temperature', 2, period=ALL) == []
+    assert index.ranking('temperature', 1, period='2024-05', metric='bias') == [('rp5', 1.0, 1), ('yandex', 2.0, 1)]
+
+    # состояние сохраняется вместе с позицией чтения: после перезапуска дочитываются только новые строки
+    index.save()
+    write_actual(tmp_path, [('2024-05-12 03:00', 'rp5', 0)], mode='a')
+    restored = LeadTimeErrorIndex.load(str(tmp_path / 'index.json'), str(tmp_path))
+    assert restored.sync() == (1, 0)
+
+    stats = restored.stats('temperature', lead_hour=2)
+    assert stats['provider'].tolist() == ['rp5', 'yandex']
+    assert np.allclose(stats['mae'], [1.0, 0.0])
+    assert restored.best('temperature', 2, period=ALL) == 'yandex'
+
+
+def test_late_forecast_uses_observed_hour_and_stale_pending_expire():
+    index = LeadTimeErrorIndex(variables=['temperature'], max_wait_hours=2)
+    hour = int(hour_number([ISSUE + pd.Timedelta(hours=1)])[0])
+    index.observe(hour, {'temperature': 5.0})
+
+    forecasts = pd.DataFrame({'provider': ['rp5', 'rp5'], 'lead_hour': [1, 10], 'temperature': ['+7', '3'],
+                              'valid_time': [ISSUE + pd.Timedelta(hours=1), ISSUE + pd.Timedelta(hours=10)]})
+    assert index.add(forecasts) == 2
+    assert index.accumulators[(ALL, 'rp5', 'temperature', 1)] == [1, 2.0, 2.0, 4.0]
+    assert list(index.pending) == [hour + 9]
+
+    # факт за час 10 не пришел, а более поздние часы уже учтены - прогноз больше не ждет
+    index.observe(hour + 12, {'temperature': 0.0})
+    assert index.pending == {}
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pyarrow = pytest.importorskip('pyarrow')
+
+from ForecastFeed import FeedReader, ForecastFeed, feed_schema, subscribe, to_batch
+
+ISSUE = pd.Timestamp('2024-05-12 00:00')
+
+
+def forecast(provider: str = 'rp5', hours: int = 3, temperature: float = 10.0) -> SimpleNamespace:
+    index = pd.date_range(ISSUE + pd.Timedelta(hours=1), periods=hours, freq='h').strftime('%Y-%m-%d %H:%M')
+    data = pd.DataFrame({'temperature': [f'+{temperature + i:g}' for i in range(hours)],
+                         'wind_direction': ['С'] * hours}, index=index)
+    return SimpleNamespace(data=data, provider=provider, issue_time=ISSUE.to_pydatetime(), location='ekaterinburg')
+
+
+def test_batch_has_feed_schema():
+    batch = to_batch(forecast().data, 'rp5', ISSUE, 'ekaterinburg')
+
+    assert batch.schema.equals(feed_schema())
+    frame = batch.to_pandas()
+    assert frame['lead_hour'].tolist() == [1, 2, 3]
+    assert frame['temperature'].tolist() == [10.0, 11.0, 12.0]
+    # метеопараметры, которых нет у провайдера, - пропуски, а не отсутствующие колонки
+    assert frame['pressure'].isna().all() and frame['conditions'].isna().all()
+
+
+def test_reader_gets_only_new_messages(tmp_path):
+    directory = str(tmp_path / 'feed')
+    feed = ForecastFeed(directory)
+    assert feed.publish(forecast('rp5')) == 3
+
+    reader, late = FeedReader(directory, from_start=True), FeedReader(directory)
+    assert len(reader.poll()) == 1
+    assert late.poll() == []
+
+    feed.publish(forecast('yandex', hours=2))
+    feed.publish(SimpleNamespace(data=None))
+    assert reader.read_all()['provider'].tolist() == ['yandex', 'yandex']
+    assert late.read_all()['provider'].tolist() == ['yandex', 'yandex']
+    assert reader.poll() == []
+    feed.close()
+
+
+def test_segments_are_read_in_order(tmp_path):
+    directory = str(tmp_path / 'feed')
+    # каждое сообщение - в новом сегменте (сегменты именуются по секундам, тест идет ~2 с)
+    feed = ForecastFeed(directory, segment_size=1)
+    reader = FeedReader(directory, from_start=True)
+    for i in range(3):
+        feed.publish(forecast(temperature=10.0 * i, hours=1))
+    feed.close()
+
+    segments = [name for name in os.listdir(directory) if name.endswith('.arrows')]
+    assert len(segments) == 3
+    assert reader.read_all()['temperature'].tolist() == [0.0, 10.0, 20.0]
+
+    # закрытый сегмент - полноценный поток Arrow IPC
+    with pyarrow.ipc.open_stream(os.path.join(directory, sorted(segments)[0])) as stream:
+        assert stream.read_all().num_rows == 1
+
+
+def test_socket_subscriber(tmp_path):
+    socket_path = str(tmp_path / 'feed.sock')
+    feed = ForecastFeed(str(tmp_path / 'feed'), socket_path=socket_path, send_timeout=5)
+    messages = subscribe(socket_path)
+    try:
+        # подписчик подключается при первом чтении, публикация - после регистрации клиента
+        def publish():
+            while not feed._clients:
+                time.sleep(0.01)
+            feed.publish(forecast(hours=2))
+        threading.Thread(target=publish, daemon=True).start()
+
+        batch = next(messages)
+        assert batch.num_rows == 2
+        assert np.allclose(batch.column('temperature').to_numpy(), [10.0, 11.0])
+    finally:
+        messages.close()
+        feed.close()
@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+from WeatherForecastParser import is_network_error, reconnect
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status}', response=response)
+
+
+@pytest.mark.parametrize('status, retry', [(503, True), (500, True), (429, True), (404, False), (403, False)])
+def test_http_errors_retried_only_for_server_errors(status, retry):
+    assert is_network_error(http_error(status)) is retry
+
+
+def test_error_response_is_not_parsed(stand, make_forecast):
+    server = stand(error_rate=1.0)
+    forecast = make_forecast('rp5')
+    forecast.mirror, forecast.attempts = server.url, 3
+
+    assert forecast.get_data() is None
+    assert server.requests == 3                 # 503 повторяется
+    assert forecast._content_hash is None       # тело ответа с ошибкой не считается страницей
+    assert not forecast._parse_failures
+
+
+def test_client_error_is_not_retried(stand, make_forecast):
+    server = stand()
+    forecast = make_forecast('rp5')
+    forecast.mirror = server.url
+    forecast.configure({'url': 'https://unknown.example/page'})
+
+    assert forecast.get_data() is None
+    assert server.requests == 1
+
+
+def test_configured_attempts_are_not_replaced_by_default():
+    calls = []
+
+    class Owner:
+        attempts, suspend_time = 0, 0
+
+        @reconnect(attempts=5)
+        def request(self):
+            calls.append(1)
+            raise ConnectionError('down')
+
+    assert Owner().request() is None
+    assert calls == []
+
+    Owner.attempts = 2
+    Owner().request()
+    assert len(calls) == 2
@@ -0,0 +1,36 @@
+from bs4 import BeautifulSoup
+
+from FieldTokenizer import FieldTokenizer, find_blocks, integer, labelled, number
+
+
+def test_fields_are_typed_and_first_match_wins():
+    tokenizer = FieldTokenizer({
+        'temp': r'температура:\s*(?P<temperature>[+\-−]?\d+)',
+        'wind': r'ветер:\s*(?P<wind_speed>\d+(?:[,.]\d)?)(?:\s*м/с,\s*(?P<wind_direction>\w+))?',
+    }, types={'temperature': integer, 'wind_speed': number})
+
+    fields = tokenizer('Ветер: 3,5 м/с, СЗ\nТемпература: −4\nтемпература: +10')
+    assert fields == {'temperature': -4, 'wind_speed': 3.5, 'wind_direction': 'СЗ'}
+    # необязательная группа без совпадения в результат не попадает
+    assert tokenizer('ветер: 2') == {'wind_speed': 2.0}
+    assert tokenizer('') == {}
+
+
+def test_labelled_text_and_blocks():
+    soup = BeautifulSoup('<div><p class="x y">a</p><span class="x">b</span><p class="z">c</p></div>', 'html.parser')
+    assert [tag.text for tag in find_blocks(soup, 'p', 'x')] == ['a']
+
+    assert labelled([('ветер', ' 3 м/с,\n СЗ '), ('давление', None), ('', 'Облачно')]) == 'ветер: 3 м/с, СЗ\nОблачно'
+
+
+def test_provider_catalogues():
+    from WeatherParser import GOODMETEO, RUMETEO, YANDEX
+
+    assert YANDEX('сейчас: Сейчас +5°, ощущается как +2°, Пасмурно.\nветер: 3,4 м/с\nнаправление: СЗ\n'
+                  'влажность: 81%\nдавление: 745 мм рт. ст.') == \
+        {'temperature': 5, 'conditions': 'пасмурно', 'wind_speed': 3.4, 'wind_direction': 'СЗ',
+         'humidity': 81, 'pressure': 745}
+    assert GOODMETEO('температура: −2\nветер, м/с: 4, северный\nдавление, мм: 751') == \
+        {'temperature': -2, 'wind_speed': 4.0, 'wind_direction': 'северный', 'pressure': 751}
+    assert RUMETEO('ветер: 2 м/с, Северо-Западный\nвлажность воздуха: 64 %') == \
+        {'wind_speed': 2, 'wind_direction': 'северо-западный', 'humidity': 64}
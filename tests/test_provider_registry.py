@@ -0,0 +1,111 @@
+from datetime import date, datetime
+
+import pytest
+
+from ProviderRegistry import (Column, Page, ProviderSpec, Row, SpecForecast, Table, available_providers,
+                              check_time_sequence)
+
+TABLE = '''<html><body><table id="forecast">
+<tr><td>Время</td><td>2024-05-12 10:00</td><td>2024-05-12 11:00</td><td>итог</td></tr>
+<tr><td>Температура</td><td>1</td><td>2</td><td>-</td></tr>
+<tr><td>Примечание</td><td>a</td><td>b</td><td>-</td></tr>
+</table></body></html>'''.encode()
+
+
+def table_spec(cells: slice = slice(1, -1)) -> ProviderSpec:
+    return ProviderSpec('test', pages=[Page('https://example.test/')],
+                        source=Table(attrs={'id': 'forecast'}, transpose=True,
+                                     rows=[Row('примечание', {'note': 0}, cells=cells)]),
+                        columns={'temperature': Column('Температура', dtype='float'), 'note': Column('note')})
+
+
+def test_row_values_follow_forecast_rows():
+    forecast = SpecForecast(table_spec())
+    data = forecast.get_data(pages=[('https://example.test/', TABLE)])
+
+    assert data['temperature'].tolist() == [1.0, 2.0]
+    assert data['note'].tolist() == ['a', 'b']
+    assert not forecast.field_errors
+
+
+def test_row_values_are_aligned_to_the_last_cells():
+    # подпись строки в начале не сдвигает значения относительно времени
+    forecast = SpecForecast(table_spec(cells=slice(0, -1)))
+    data = forecast.get_data(pages=[('https://example.test/', TABLE)])
+
+    assert data['note'].tolist() == ['a', 'b']
+    assert not forecast.field_errors
+
+
+def test_short_row_is_a_field_error():
+    # значений меньше, чем строк прогноза: поле пустое, ошибка учтена, остальные поля разобраны
+    forecast = SpecForecast(table_spec(cells=slice(2, -1)))
+    data = forecast.get_data(pages=[('https://example.test/', TABLE)])
+
+    assert data['temperature'].tolist() == [1.0, 2.0]
+    assert data['note'].isna().all()
+    assert forecast.field_errors['note'] == 1
+
+
+def test_builtin_providers_parse_stand_pages(stand, make_forecast):
+    server = stand()
+    for name in ('yandex', 'rumeteo', 'rp5', 'goodmeteo'):
+        forecast = make_forecast(name)
+        forecast.mirror, forecast.attempts = server.url, 1
+        data = forecast.get_data(issue_time=datetime(2024, 5, 12, 10))
+
+        assert data is not None and not data.empty, name
+        assert data['temperature'].notna().all(), name
+        assert not forecast.field_errors, name
+    assert set(available_providers()) >= {'yandex', 'rumeteo', 'rp5', 'goodmeteo'}
+
+
+def test_configure_overrides_page_urls(make_forecast):
+    forecast = make_forecast('goodmeteo')
+    tomorrow = forecast.pages[1]
+
+    forecast.configure({'url': 'https://example.test/today'})
+    assert [page.url for page in forecast.pages] == ['https://example.test/today', tomorrow.url]
+    assert forecast.pages[1].day_offset == 1
+
+    forecast.configure({'urls': ['https://example.test/a', 'https://example.test/b']})
+    assert [(page.url, page.day_offset) for page in forecast.pages] == [('https://example.test/a', 0),
+                                                                        ('https://example.test/b', 1)]
+    # адреса меняются только у этого объекта
+    assert make_forecast('goodmeteo').pages[0].url != 'https://example.test/a'
+
+
+def test_configure_forecast_table(make_forecast):
+    forecast = make_forecast('rp5')
+    forecast.configure({'forecast_table': 'forecastTable_1_4'})
+
+    assert forecast.region == ('table', {'id': 'forecastTable_1_4'})
+    assert forecast.spec.spec.source.attrs == {'id': 'forecastTable_1_4'}
+    assert make_forecast('rp5').region == ('table', {'id': 'forecastTable_1_3'})
+
+
+def test_time_sequence_crosses_midnight_and_fixes_hours():
+    # к часу прилипла цифра соседнего текста ('09:00' распознано как '109:00'): час обрезается до одной цифры
+    rows = [('08:00', '+1'), ('109:00', '+2'), ('10:00', '+3')]
+    assert check_time_sequence(rows, date(2024, 5, 12)) == [
+        ('2024-05-12 08:00:00', '+1'), ('2024-05-12 09:00:00', '+2'), ('2024-05-12 10:00:00', '+3')]
+
+    rows = [('23:00', '+1'), ('00:00', '+2')]
+    assert check_time_sequence(rows, date(2024, 5, 12))[1] == ('2024-05-13 00:00:00', '+2')
+
+    with pytest.raises(AttributeError):
+        check_time_sequence([('22:00', '+1'), ('05:00', '+2')], date(2024, 5, 12))
+
+
+def test_failed_page_is_not_parsed_again(monkeypatch):
+    forecast = SpecForecast(table_spec())
+    broken = [('https://example.test/', b'<html><body>no forecast</body></html>')]
+    assert forecast.get_data(pages=broken) is None
+
+    calls = []
+    monkeypatch.setattr(forecast, '_get_data_from_source', lambda: calls.append(1))
+    assert forecast.get_data(pages=broken) is None
+    assert not calls
+    # другая страница разбирается
+    forecast.get_data(pages=[('https://example.test/', TABLE)])
+    assert calls
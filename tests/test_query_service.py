@@ -0,0 +1,90 @@
+import json
+import socket
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from ForecastArchive import ForecastArchive
+from ForecastQueryService import ForecastQueryService
+
+
+def archive(tmp_path) -> ForecastArchive:
+    (tmp_path / 'rp5').mkdir()
+    (tmp_path / 'rp5' / '12052024_1000.csv').write_text('time,temperature\n2024-05-12 11:00:00,5\n')
+    (tmp_path / 'yandex').mkdir()
+    (tmp_path / 'yandex' / '12052024_1000.csv').write_text(
+        'time,temperature\n2024-05-12 11:00:00,6\n2024-05-12 12:00:00,7\n')
+    return ForecastArchive(str(tmp_path), actual_file=str(tmp_path / 'actual_report.csv'))
+
+
+def test_latest_forecast_with_single_row(tmp_path):
+    latest = archive(tmp_path).latest_forecast('rp5')
+    assert latest.shape[0] == 1
+    assert latest.loc[0, 'provider'] == 'rp5' and latest.loc[0, 'temperature'] == 5
+
+
+def test_ranking_period_is_part_of_cache_key(tmp_path):
+    service = ForecastQueryService(archive(tmp_path), refresh_interval=None)
+    service.request('/ranking', (('variable', 'temperature'),))
+
+    # запрос без периода кэшируется как запрос текущего месяца
+    hits = service.query.cache_info().hits
+    service.request('/ranking', (('period', datetime.now().strftime('%Y-%m')), ('variable', 'temperature')))
+    assert service.query.cache_info().hits == hits + 1
+
+
+def test_queries_run_concurrently(tmp_path):
+    service = ForecastQueryService(archive(tmp_path), refresh_interval=None)
+    # обработчик завершается, только когда второй запрос выполняется одновременно с ним
+    barrier = threading.Barrier(2, timeout=5)
+    service._routes['/wait'] = lambda name: (barrier.wait(), service._providers())[1]
+
+    results = []
+    threads = [threading.Thread(target=lambda name: results.append(service.request('/wait', (('name', name),))),
+                                args=(name,)) for name in 'ab']
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2 and not barrier.broken
+
+    # дочитывание архива - монопольно и сбрасывает кэш ответов
+    assert json.loads(service.request('/providers', ()))['rp5'] == '2024-05-12 10:00:00'
+    (tmp_path / 'rp5' / '12052024_1300.csv').write_text('time,temperature\n2024-05-12 14:00:00,8\n')
+    assert service.refresh()
+    assert json.loads(service.request('/providers', ()))['rp5'] == '2024-05-12 13:00:00'
+
+
+def serve(service: ForecastQueryService) -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    threading.Thread(target=service.serve, kwargs={'port': port}, daemon=True).start()
+
+    for _ in range(50):
+        try:
+            requests.get(f'http://127.0.0.1:{port}/providers', timeout=5)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    return port
+
+
+def test_unexpected_error_returns_500(tmp_path):
+    service = ForecastQueryService(archive(tmp_path), refresh_interval=None)
+    service._routes['/latest'] = lambda **params: 1 / 0
+    service._routes['/missing'] = lambda **params: {}['column']
+    port = serve(service)
+
+    response = requests.get(f'http://127.0.0.1:{port}/latest', timeout=5)
+    assert response.status_code == 500
+    assert json.loads(response.content)['error'] == 'internal error: ZeroDivisionError'
+
+    response = requests.get(f'http://127.0.0.1:{port}/providers', timeout=5)
+    assert response.status_code == 200 and set(response.json()) == {'rp5', 'yandex'}
+
+    # KeyError обработчика - ошибка сервиса, 404 - только неизвестный путь
+    assert requests.get(f'http://127.0.0.1:{port}/missing', timeout=5).status_code == 500
+    assert requests.get(f'http://127.0.0.1:{port}/unknown', timeout=5).status_code == 404
@@ -0,0 +1,60 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('zstandard')
+
+from RawArchive import SegmentArchive, open_archive
+
+ISSUE = datetime(2024, 5, 12, 10, 0, 5)
+
+
+def test_cycles_in_the_same_second_are_kept(tmp_path):
+    archive = SegmentArchive(str(tmp_path))
+    archive.record('rp5', ISSUE, [('https://rp5.ru/', b'<table>1</table>')], location='ekaterinburg')
+    archive.record('rp5', ISSUE, [('https://rp5.ru/', b'<table>2</table>')], location='ekaterinburg')
+    archive.record('rp5', ISSUE, [('https://rp5.ru/', b'<table>3</table>')], location='perm')
+
+    for reopened in (archive, open_archive(str(tmp_path))):
+        records = list(reopened.records())
+        assert len(records) == 3
+        assert [reopened.pages(r)[0][1] for r in records if r['location'] == 'ekaterinburg'] == \
+               [b'<table>1</table>', b'<table>2</table>']
+        assert reopened.get('rp5', 'ekaterinburg', ISSUE) == [('https://rp5.ru/', b'<table>2</table>')]
+
+
+def test_index_without_cycle_hash_is_readable(tmp_path):
+    archive = SegmentArchive(str(tmp_path))
+    archive.record('rp5', ISSUE, [('https://rp5.ru/', b'page')], location='ekaterinburg')
+
+    # индекс прежнего формата: без последней колонки
+    index = tmp_path / 'rp5' / 'index.tsv'
+    index.write_text(''.join(line.rsplit('\t', 1)[0] + '\n' for line in index.read_text().splitlines()))
+
+    assert SegmentArchive(str(tmp_path)).get('rp5', 'ekaterinburg', ISSUE) == [('https://rp5.ru/', b'page')]
+
+
+def test_training_samples_are_bounded(tmp_path):
+    # на страницах из нескольких байт словарь не обучается: в памяти - выборка из train_samples страниц
+    archive = SegmentArchive(str(tmp_path), train_samples=4)
+    for i in range(100):
+        archive.record('rp5', datetime(2024, 5, 12, 10, i % 60, i // 60), [('https://rp5.ru/', b'%d' % i)])
+        assert len(archive._samples['rp5']) <= 4
+    # попытки обучения - при 4, 8, 16, 32, 64 страницах
+    assert archive._train_at['rp5'] == 128
+
+    assert len(list(archive.records())) == 100
+    assert not any(name.startswith('dict_') for name in os.listdir(tmp_path / 'rp5'))
+
+
+def test_dictionary_is_trained_on_sample(tmp_path):
+    archive = SegmentArchive(str(tmp_path), train_samples=8, dict_size=4096)
+    pages = [b'<table class="forecast">' + b''.join(b'<tr><td>%d</td><td>+%d</td></tr>' % (h, (i * h) % 30)
+                                                     for h in range(60)) + b'</table>' for i in range(20)]
+    for i, page in enumerate(pages):
+        archive.record('rp5', datetime(2024, 5, 12, i), [('https://rp5.ru/', page)])
+
+    # словарь обучен, выборка освобождена; страницы, сжатые до и после обучения, читаются
+    assert archive._current_dict('rp5') == 1 and 'rp5' not in archive._samples
+    assert [archive.pages(r)[0][1] for r in SegmentArchive(str(tmp_path)).records()] == pages
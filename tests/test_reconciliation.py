@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from ObservationReconciliation import outlier_rates, reconcile
+
+
+def observations(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['time', 'provider', 'temperature', 'pressure'])
+
+
+def test_outlier_is_excluded_from_estimate():
+    data = observations([
+        ('2024-05-12 10:05', 'goodmeteo', '+5', '740'),
+        ('2024-05-12 10:10', 'rumeteo', '5,5', '741'),
+        ('2024-05-12 10:20', 'yandex', '15', '742'),
+        ('2024-05-12 10:30', 'rp5', '4,5', '740'),
+    ])
+    estimate, outliers = reconcile(data, variables=['temperature', 'pressure'])
+
+    tick = pd.Timestamp('2024-05-12 10:00')
+    assert estimate.loc[tick, 'temperature'] == 5.0
+    assert estimate.loc[tick, 'temperature_n'] == 3
+    assert estimate.loc[tick, 'temperature_median'] == 5.25
+    assert np.isclose(estimate.loc[tick, 'pressure'], 740.75)
+
+    assert outliers[['provider', 'variable', 'value']].values.tolist() == [['yandex', 'temperature', 15.0]]
+    rates = outlier_rates(outliers, data).set_index(['provider', 'variable'])['rate']
+    assert rates[('yandex', 'temperature')] == 1.0
+    assert rates[('rp5', 'temperature')] == 0.0
+
+
+def test_min_scale_keeps_close_providers():
+    # у двух совпадающих провайдеров MAD равно нулю: небольшое отклонение третьего - не выброс
+    data = observations([
+        ('2024-05-12 10:00', 'goodmeteo', '5', None),
+        ('2024-05-12 10:00', 'rumeteo', '5', None),
+        ('2024-05-12 10:00', 'yandex', '6', None),
+    ])
+    estimate, outliers = reconcile(data, variables=['temperature'])
+
+    assert outliers.empty
+    assert estimate['temperature_n'].tolist() == [3]
+
+
+def test_invalid_values_and_last_observation_in_tick():
+    data = observations([
+        ('2024-05-12 10:00', 'rumeteo', '3', '999'),
+        ('2024-05-12 10:40', 'rumeteo', '4', '745'),
+        ('2024-05-12 11:00', 'rumeteo', '+90', None),
+        ('не время', 'rumeteo', '5', '745'),
+    ])
+    estimate, _ = reconcile(data, variables=['temperature', 'pressure'])
+
+    assert estimate.index.tolist() == [pd.Timestamp('2024-05-12 10:00'), pd.Timestamp('2024-05-12 11:00')]
+    assert estimate['temperature'].tolist()[0] == 4.0
+    assert estimate['pressure'].tolist()[0] == 745.0
+    # +90 вне допустимого диапазона: такт есть, значения нет
+    assert estimate['temperature_n'].tolist()[1] == 0
+    assert np.isnan(estimate['temperature'].tolist()[1])
+
+
+def test_empty_input():
+    estimate, outliers = reconcile(observations([('не время', 'rp5', '1', '740')]))
+    assert estimate.empty and outliers.empty
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from ForecastResampling import resample, wind_degrees
+
+ISSUE = pd.Timestamp('2024-05-11 22:00')
+
+
+def forecast(times, provider='rp5', **columns) -> pd.DataFrame:
+    return pd.DataFrame({'provider': provider, 'issue_time': ISSUE, 'valid_time': pd.to_datetime(times), **columns})
+
+
+def test_precipitation_total_is_preserved():
+    data = forecast(['2024-05-12 00:00', '2024-05-12 03:00', '2024-05-12 06:00'], precipitation=[1.5, 3.0, 0.0])
+    hourly = resample(data, tz=None)
+
+    assert hourly['precipitation'].tolist() == [1.5, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+    assert hourly['precipitation'].sum() == 4.5
+    assert resample(data, freq='3h', tz=None)['precipitation'].tolist() == [1.5, 3.0, 0.0]
+
+
+def test_precipitation_from_text():
+    data = forecast(['2024-05-12 00:00', '2024-05-12 01:00', '2024-05-12 02:00'],
+                    precipitation=['Без осадков', 'Дождь', '0,4 мм'], precipitation_info=[None, '(0.3 мм)', None])
+    assert np.allclose(resample(data, tz=None)['precipitation'], [0.0, 0.3, 0.4])
+
+
+def test_wind_direction_wraps_around_north():
+    data = forecast(['2024-05-12 00:00', '2024-05-12 02:00'], wind_direction=['ССЗ', 'ССВ'])
+    degrees = resample(data, tz=None)['wind_direction'].to_numpy()
+
+    assert np.allclose(degrees[[0, 2]], [337.5, 22.5])
+    assert np.isclose(degrees[1] % 360, 0.0) or np.isclose(degrees[1], 360.0)
+    assert wind_degrees(pd.Series(['Северо-Запад', 'С-З', 'штиль'])).tolist()[:2] == [315.0, 315.0]
+
+
+def test_linear_interpolation_in_utc_without_long_gaps():
+    data = forecast(['2024-05-12 05:00', '2024-05-12 07:00', '2024-05-12 19:00'], temperature=[10, 12, 0])
+    hourly = resample(data, max_gap='6h')
+
+    # местное время Екатеринбурга (UTC+5) переводится в UTC
+    assert hourly['valid_time'].iloc[0] == pd.Timestamp('2024-05-12 00:00', tz='UTC')
+    assert hourly['temperature'].iloc[:3].tolist() == [10.0, 11.0, 12.0]
+    # между 07:00 и 19:00 - 12 часов: узлы внутри пропуска не заполняются
+    assert hourly['temperature'].iloc[3:-1].isna().all()
+    assert hourly['temperature'].iloc[-1] == 0.0
+
+
+def test_issues_are_resampled_separately():
+    data = pd.concat([forecast(['2024-05-12 00:00', '2024-05-12 02:00'], temperature=[0, 2]),
+                      forecast(['2024-05-12 01:00', '2024-05-12 03:00'], provider='yandex', temperature=[10, 30])])
+    hourly = resample(data, tz=None).set_index(['provider', 'valid_time'])['temperature']
+
+    assert hourly['rp5'].tolist() == [0.0, 1.0, 2.0]
+    assert hourly['yandex'].tolist() == [10.0, 20.0, 30.0]
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+
+import pytest
+
+from RuntimeConfig import HostLimiter, RuntimeConfig
+
+
+def write(path, data) -> None:
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+@pytest.mark.parametrize('limits', [{'rate': 0}, {'rate': -1}, {'concurrency': 0}, 'fast'])
+def test_invalid_host_limits_are_not_applied(tmp_path, limits):
+    path = tmp_path / 'config.json'
+    write(path, {'hosts': {'rp5.ru': {'rate': 0.5}}})
+    config = RuntimeConfig(str(path))
+
+    write(path, {'hosts': {'rp5.ru': limits}})
+    path.touch()
+    assert not config.reload()
+    assert config.hosts()['rp5.ru'] == {'rate': 0.5}
+
+
+def test_unset_limits_are_allowed(tmp_path):
+    path = tmp_path / 'config.json'
+    write(path, {'hosts': {'rp5.ru': {'rate': None, 'concurrency': None}}})
+    assert RuntimeConfig(str(path)).hosts()['rp5.ru'] == {'rate': None, 'concurrency': None}
+
+
+def test_provider_url_override_is_applied(tmp_path, make_forecast):
+    path = tmp_path / 'config.json'
+    write(path, {'providers': {'goodmeteo': {'url': 'https://example.test/today'}}})
+    forecast = make_forecast('goodmeteo')
+
+    forecast.configure(RuntimeConfig(str(path)).provider('goodmeteo'))
+    assert forecast.pages[0].url == 'https://example.test/today'
+    assert forecast.pages[1].url == 'https://goodmeteo.ru/pogoda-ekaterinburg/zavtra/'
+
+
+def test_host_rate_spaces_requests():
+    limiter = HostLimiter({'*': {'rate': 20}})
+    starts = []
+    for _ in range(3):
+        with limiter.slot('https://rp5.ru/page'):
+            starts.append(time.monotonic())
+    assert starts[2] - starts[0] >= 0.09
+
+
+def peak_concurrency(limiter: HostLimiter, url: str, threads: int = 4) -> int:
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def request():
+        with limiter.slot(url):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    workers = [threading.Thread(target=request) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return peak[0]
+
+
+def test_host_limits_are_merged_over_defaults():
+    limiter = HostLimiter({'*': {'concurrency': 2, 'rate': None}, 'rp5.ru': {'rate': 1000}, 'yandex.ru': {'concurrency': None}})
+
+    # хост с одним rate сохраняет общий concurrency, null - без ограничения
+    assert peak_concurrency(limiter, 'https://rp5.ru/page') == 2
+    assert peak_concurrency(limiter, 'https://yandex.ru/pogoda/') == 4
+    assert peak_concurrency(HostLimiter({'*': {}}), 'https://goodmeteo.ru/') == 4
+
+
+def test_removed_overrides_return_to_defaults(tmp_path, make_forecast, monkeypatch):
+    import WeatherParser
+    monkeypatch.setattr(WeatherParser, 'URLS', dict(WeatherParser.DEFAULT_URLS))
+    monkeypatch.setattr(WeatherParser, 'HEADERS', {})
+    monkeypatch.setattr(WeatherParser, 'TIMEOUT', None)
+
+    path = tmp_path / 'config.json'
+    write(path, {'defaults': {'user_agent': 'collector/2'},
+                 'providers': {'rp5': {'url': 'https://rp5.ru/other', 'forecast_table': 'forecastTable_1_4',
+                                       'region': ['div', {'id': 'other'}]}},
+                 'actual': {'providers': {'yandex': {'url': 'https://example.test/now'}}}})
+    config = RuntimeConfig(str(path))
+    forecast, default = make_forecast('rp5'), make_forecast('rp5')
+
+    forecast.configure(config.provider('rp5'))
+    WeatherParser.configure(config)
+    assert (forecast.URL, forecast.region) == ('https://rp5.ru/other', ('div', {'id': 'other'}))
+    assert forecast.headers['User-Agent'] == 'collector/2'
+    assert WeatherParser.URLS['yandex'] == 'https://example.test/now'
+
+    # настройки удалены из файла: после перечитывания действуют значения по умолчанию
+    write(path, {})
+    path.touch()
+    assert config.reload()
+    forecast.configure(config.provider('rp5'))
+    WeatherParser.configure(config)
+
+    assert [page.url for page in forecast.pages] == [page.url for page in default.pages]
+    assert forecast.spec is default.spec
+    assert forecast.region == default.region == ('table', {'id': 'forecastTable_1_3'})
+    assert forecast.headers['User-Agent'] == RuntimeConfig(str(tmp_path / 'missing.json')).provider('rp5')['user_agent']
+    assert WeatherParser.URLS == WeatherParser.DEFAULT_URLS
@@ -0,0 +1,72 @@
+from Scheduler import AdaptiveSchedule, Scheduler
+
+DAY = 86400
+
+
+def simulate(schedule: AdaptiveSchedule, period: float, offset: float, start: float, end: float,
+             last: float = 0.0) -> tuple:
+    # провайдер обновляет прогноз в моменты offset + n * period; опросы по расписанию schedule
+    # -> (время следующего опроса, последнее обнаруженное обновление, задержки обнаружения, количество опросов)
+    now, delays, polls = start, [], 0
+    while now < end:
+        latest = (now - offset) // period * period + offset
+        changed = last < latest <= now
+        if changed:
+            delays.append(now - latest)
+            last = latest
+        now = schedule.next_poll(now, changed)
+        polls += 1
+    return now, last, delays, polls
+
+
+def test_schedule_learns_update_period():
+    schedule = AdaptiveSchedule(min_interval=300)
+    _, _, delays, polls = simulate(schedule, 3 * 3600, 1000, 0, 4 * DAY)
+
+    assert schedule.period == 3 * 3600
+    # обновление находится не позже, чем при постоянном частом опросе, а опросов в разы меньше
+    assert max(delays) <= 300
+    assert polls < 4 * DAY / 300 / 5
+
+
+def test_schedule_relearns_changed_period():
+    schedule = AdaptiveSchedule(min_interval=300)
+    now, last, _, _ = simulate(schedule, 3 * 3600, 1000, 0, 2 * DAY)
+    _, _, delays, _ = simulate(schedule, 6 * 3600, 5000, now, 6 * DAY, last)
+
+    assert schedule.period == 6 * 3600
+    assert max(delays[-8:]) <= 300
+
+
+def test_schedule_state_round_trip():
+    schedule = AdaptiveSchedule(min_interval=300)
+    simulate(schedule, 3600, 0, 0, DAY)
+    restored = AdaptiveSchedule(min_interval=300)
+    restored.load(schedule.to_dict())
+
+    assert restored.to_dict() == schedule.to_dict()
+
+
+def test_unchanged_pages_are_requested_conditionally(stand, make_forecast, tmp_path, monkeypatch):
+    server = stand(update_intervals={'rp5': 10**9})
+    forecast = make_forecast('rp5')
+    forecast.mirror = server.url
+    monkeypatch.chdir(tmp_path)  # прогнозы сохраняются в директорию провайдера
+
+    updates = []
+    scheduler = Scheduler([forecast], on_update=updates.append, state_file=str(tmp_path / 'state.json'))
+    scheduler.poll('rp5', now=1000.0)
+    assert forecast.changed and updates == [forecast]
+
+    # страница не изменилась: сервер отвечает 304, прогноз не считается новым и не передается обработчику
+    scheduler.poll('rp5', now=2000.0)
+    assert not forecast.changed and len(updates) == 1
+    assert forecast._not_modified
+
+    # хэш последнего прогноза сохраняется: после перезапуска тот же прогноз не считается обновлением
+    scheduler.save_state()
+    forecast = make_forecast('rp5')
+    forecast.mirror = server.url
+    restarted = Scheduler([forecast], on_update=updates.append, state_file=str(tmp_path / 'state.json'))
+    restarted.poll('rp5', now=3000.0)
+    assert not forecast.changed and len(updates) == 1
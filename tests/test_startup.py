@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module', ['WeatherForecastParser', 'WeatherParser', 'ProviderRegistry', 'Scheduler'])
+def test_collector_modules_import_without_heavy_dependencies(module):
+    # модули сборщиков импортируют pandas/numpy/bs4/requests при первом обращении, а не при импорте
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in ('pandas', 'numpy', 'bs4', 'requests') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_providers_are_created_without_network(make_forecast):
+    # создание провайдера не загружает страницу: данные появляются только в get_data
+    forecast = make_forecast('rp5')
+    assert forecast.soup is None and forecast.data is None
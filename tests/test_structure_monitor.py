@@ -0,0 +1,68 @@
+from StructureMonitor import MISSING, StructureMonitor, fingerprint
+
+REGION = ('table', {'id': 'forecast'})
+PAGE = b'<html><body><table id="forecast"><tr><td>1</td><td>2</td></tr></table></body></html>'
+DRIFTED = b'<html><body><table id="forecast"><tr><th>1</th></tr><tr><td>2</td></tr></table></body></html>'
+
+
+def monitor() -> StructureMonitor:
+    return StructureMonitor(state_file=None, recheck=3600)
+
+
+def test_fingerprint_of_empty_or_unrelated_page_is_missing():
+    assert fingerprint(b'', REGION) == MISSING
+    assert fingerprint(b'  \n', REGION) == MISSING
+    assert fingerprint(b'<html>Service Unavailable</html>', REGION) == MISSING
+    assert fingerprint(PAGE, REGION) != fingerprint(DRIFTED, REGION)
+
+
+def test_missing_region_is_never_a_new_structure():
+    m = monitor()
+    m.report('rp5', [fingerprint(PAGE, REGION)], parsed=True)
+    m.report('rp5', [MISSING], parsed=False)
+
+    state = m.state['rp5']
+    assert state['bad'] == {} and state['drift_since'] is None
+    assert state['good'] == [fingerprint(PAGE, REGION)]
+    assert not m.blocked('rp5')
+    assert not m.known_bad('rp5', MISSING)
+
+    # успешный разбор страницы без фрагмента не делает MISSING эталоном
+    m.report('rp5', [MISSING], parsed=True)
+    assert m.state['rp5']['good'] == [fingerprint(PAGE, REGION)]
+
+
+def test_layout_drift_blocks_until_page_parses_again():
+    m, alerts = monitor(), []
+    m.alert = lambda provider, message: alerts.append(provider)
+    good, drifted = fingerprint(PAGE, REGION), fingerprint(DRIFTED, REGION)
+
+    m.report('rp5', [good], parsed=True)
+    m.report('rp5', [drifted], parsed=False)
+    assert alerts == ['rp5']
+    assert m.known_bad('rp5', drifted)
+    assert m.blocked('rp5')
+
+    # повторная ошибка той же верстки не дает повторного оповещения
+    m.report('rp5', [drifted], parsed=False)
+    assert alerts == ['rp5']
+
+    m.report('rp5', [good], parsed=True)
+    assert m.state['rp5']['drift_since'] is None
+    assert not m.blocked('rp5')
+
+
+def test_error_responses_do_not_pause_provider(stand, make_forecast):
+    server = stand()
+    forecast = make_forecast('rp5')
+    forecast.mirror, forecast.attempts = server.url, 1
+    forecast.monitor = monitor()
+
+    assert forecast.get_data() is not None
+    server.error_rate = 1.0
+    for _ in range(3):
+        assert forecast.get_data() is None
+
+    state = forecast.monitor.state['rp5']
+    assert state['bad'] == {} and state['drift_since'] is None
+    assert not forecast.monitor.blocked('rp5')